@@ -0,0 +1,102 @@
+"""
+Carregamento e codificação do houses.csv compartilhados pelos scripts de
+análise (index.py, kmeans_analysis.py e model_training.py), com cache em disco.
+
+`memo` guarda o resultado de uma etapa em `.cache/analysis/<nome>-<chave>.pkl`,
+onde a chave é o hash das entradas (`chave`): com as mesmas entradas, o
+resultado é lido do disco em vez de recalculado. O dataset codificado usa a
+mesma ideia, com a chave derivada do conteúdo do CSV e de `VERSAO_CODIFICACAO`.
+
+Executado diretamente, aquece o cache do dataset (etapa `dados` de pipeline.py).
+"""
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+CSV_PATH = './houses.csv'
+CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', '.cache/analysis')
+
+COLUNAS_BINARIAS = ['mainroad', 'guestroom', 'basement', 'hotwaterheating',
+                    'airconditioning', 'prefarea']
+
+TRADUCAO_MOBILIA = {
+    'unfurnished': 'vazio',
+    'semi-furnished': 'semi-mobiliado',
+    'furnished': 'mobiliado'
+}
+
+# Incrementar ao mudar a codificação abaixo, invalidando o cache do dataset
+VERSAO_CODIFICACAO = 1
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def chave(*partes):
+    """Hash das entradas de uma etapa: DataFrames, arrays e valores serializáveis em JSON."""
+    h = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, pd.DataFrame):
+            h.update(json.dumps([str(c) for c in parte.columns]).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(parte, index=True).to_numpy().tobytes())
+        elif isinstance(parte, np.ndarray):
+            h.update(f"{parte.dtype}{parte.shape}".encode('utf-8'))
+            h.update(np.ascontiguousarray(parte).tobytes())
+        else:
+            h.update(json.dumps(parte, sort_keys=True, default=str).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+
+def memo(nome, chave_entradas, calcular):
+    """Resultado de `calcular()` guardado em disco sob `nome` e `chave_entradas`."""
+    caminho = os.path.join(CACHE_DIR, f"{nome}-{chave_entradas}.pkl")
+    try:
+        return joblib.load(caminho)
+    except FileNotFoundError:
+        pass
+    resultado = calcular()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Grava em arquivo temporário e renomeia: etapas em paralelo nunca leem um cache pela metade
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    joblib.dump(resultado, temporario)
+    os.replace(temporario, caminho)
+    return resultado
+
+
+def _codificar(caminho):
+    df = pd.read_csv(caminho)
+    # Converter colunas yes/no para 1/0
+    for col in COLUNAS_BINARIAS:
+        df[col] = df[col].map({'yes': 1, 'no': 0})
+    return df
+
+
+def carregar(caminho=CSV_PATH, traduzir_mobilia=True):
+    """
+    houses.csv com as colunas binárias em 1/0 e, com `traduzir_mobilia`,
+    `furnishingstatus` traduzido (vazio, semi-mobiliado, mobiliado).
+
+    Retorna uma cópia: os scripts podem alterar o DataFrame à vontade.
+    """
+    df = memo('houses', chave(hash_arquivo(caminho), VERSAO_CODIFICACAO),
+              lambda: _codificar(caminho)).copy()
+    if traduzir_mobilia:
+        df['furnishingstatus'] = df['furnishingstatus'].map(TRADUCAO_MOBILIA)
+    return df
+
+
+if __name__ == "__main__":
+    df = carregar()
+    print(f"✓ Dataset codificado em cache: {df.shape[0]} linhas, {df.shape[1]} colunas "
+          f"(chave {chave(hash_arquivo(CSV_PATH), VERSAO_CODIFICACAO)})")
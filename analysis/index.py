@@ -5,6 +5,8 @@ import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
+import dados
+
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
@@ -16,7 +18,8 @@ print("=" * 70)
 print("CARREGANDO DATASET: houses.csv")
 print("=" * 70)
 
-df = pd.read_csv('./houses.csv')
+# Lido do cache de dados.py quando o houses.csv não mudou
+df = dados.carregar()
 print("✓ Dataset carregado com sucesso!")
 
 # ====================================================
@@ -26,21 +29,10 @@ print("\n" + "=" * 70)
 print("APLICANDO TRANSFORMAÇÕES NOS DADOS")
 print("=" * 70)
 
-# Converter colunas yes/no para 1/0
-colunas_binarias = ['mainroad', 'guestroom', 'basement', 'hotwaterheating', 
-                    'airconditioning', 'prefarea']
-
-for col in colunas_binarias:
-    df[col] = df[col].map({'yes': 1, 'no': 0})
+# Colunas yes/no convertidas para 1/0 e furnishingstatus traduzido em dados.carregar()
+for col in dados.COLUNAS_BINARIAS:
     print(f"✓ Coluna '{col}' convertida: yes → 1, no → 0")
 
-# Traduzir coluna furnishingstatus
-traducao_mobilia = {
-    'unfurnished': 'vazio',
-    'semi-furnished': 'semi-mobiliado',
-    'furnished': 'mobiliado'
-}
-df['furnishingstatus'] = df['furnishingstatus'].map(traducao_mobilia)
 print(f"✓ Coluna 'furnishingstatus' traduzida")
 print(f"  - unfurnished → vazio")
 print(f"  - semi-furnished → semi-mobiliado")
@@ -1,14 +1,27 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
 import warnings
 warnings.filterwarnings('ignore')
 
+# Módulos compartilhados com a API ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import memory  # noqa: E402
+
+import dados  # noqa: E402
+
+# Memória por seção (memory.py): orçamentos em MEMORY_BUDGETS, ex.: "cotovelo=300,pca=800"
+memoria = memory.MemoryTracker.from_env()
+memoria.record_since_start('imports')
+
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
@@ -20,21 +33,15 @@ print("=" * 70)
 # ====================================================
 # 1. CARREGAMENTO E PREPARAÇÃO DOS DADOS
 # ====================================================
+memoria.start('dados')
 print("\n" + "=" * 70)
 print("1. CARREGAMENTO E PREPARAÇÃO DOS DADOS")
 print("=" * 70)
 
-# Carregar dataset
-df = pd.read_csv('./houses.csv')
+# Carregar dataset (colunas yes/no já convertidas para 1/0; ver dados.py)
+df = dados.carregar(traduzir_mobilia=False)
 print(f"✓ Dataset carregado: {df.shape[0]} linhas, {df.shape[1]} colunas")
 
-# Converter colunas yes/no para 1/0
-colunas_binarias = ['mainroad', 'guestroom', 'basement', 'hotwaterheating', 
-                    'airconditioning', 'prefarea']
-
-for col in colunas_binarias:
-    df[col] = df[col].map({'yes': 1, 'no': 0})
-
 # Codificar furnishingstatus
 furnishing_map = {'unfurnished': 0, 'semi-furnished': 1, 'furnished': 2}
 df['furnishingstatus_encoded'] = df['furnishingstatus'].map(furnishing_map)
@@ -51,6 +58,7 @@ print(f"✓ Shape dos dados: {X.shape}")
 # ====================================================
 # 2. NORMALIZAÇÃO DOS DADOS
 # ====================================================
+memoria.start('normalizacao')
 print("\n" + "=" * 70)
 print("2. NORMALIZAÇÃO DOS DADOS (STANDARDSCALER)")
 print("=" * 70)
@@ -63,25 +71,35 @@ print(f"✓ Shape dos dados normalizados: {X_scaled.shape}")
 # ====================================================
 # 3. MÉTODO DO COTOVELO (ELBOW METHOD)
 # ====================================================
+memoria.start('cotovelo')
 print("\n" + "=" * 70)
 print("3. DETERMINAÇÃO DO NÚMERO IDEAL DE CLUSTERS")
 print("=" * 70)
 
 print("\n📊 Calculando Método do Cotovelo...")
 K_range = range(2, 11)
-inertias = []
-silhouette_scores = []
-davies_bouldin_scores = []
-calinski_harabasz_scores = []
-
-for k in K_range:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_scaled)
-    
-    inertias.append(kmeans.inertia_)
-    silhouette_scores.append(silhouette_score(X_scaled, kmeans.labels_))
-    davies_bouldin_scores.append(davies_bouldin_score(X_scaled, kmeans.labels_))
-    calinski_harabasz_scores.append(calinski_harabasz_score(X_scaled, kmeans.labels_))
+
+
+def _metricas_por_k():
+    metricas = {'inertias': [], 'silhouette': [], 'davies_bouldin': [], 'calinski_harabasz': []}
+    for k in K_range:
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        kmeans.fit(X_scaled)
+
+        metricas['inertias'].append(kmeans.inertia_)
+        metricas['silhouette'].append(silhouette_score(X_scaled, kmeans.labels_))
+        metricas['davies_bouldin'].append(davies_bouldin_score(X_scaled, kmeans.labels_))
+        metricas['calinski_harabasz'].append(calinski_harabasz_score(X_scaled, kmeans.labels_))
+    return metricas
+
+
+# Os ajustes para cada k ficam em cache (dados.memo) enquanto os dados
+# normalizados e a configuração não mudarem; mudanças nos gráficos não os refazem
+metricas_k = dados.memo('kmeans_metricas', dados.chave(X_scaled, list(K_range), 42, 10), _metricas_por_k)
+inertias = metricas_k['inertias']
+silhouette_scores = metricas_k['silhouette']
+davies_bouldin_scores = metricas_k['davies_bouldin']
+calinski_harabasz_scores = metricas_k['calinski_harabasz']
 
 # Criar figura com múltiplos gráficos
 fig, axes = plt.subplots(2, 2, figsize=(16, 12))
@@ -136,6 +154,7 @@ print(f"\n✓ K ideal (baseado em Silhouette Score): {k_ideal}")
 # ====================================================
 # 4. TREINAMENTO DO MODELO K-MEANS
 # ====================================================
+memoria.start('kmeans')
 print("\n" + "=" * 70)
 print(f"4. TREINAMENTO DO MODELO K-MEANS (K={k_ideal})")
 print("=" * 70)
@@ -159,6 +178,7 @@ for cluster, count in cluster_counts.items():
 # ====================================================
 # 5. ANÁLISE DOS CLUSTERS
 # ====================================================
+memoria.start('analise')
 print("\n" + "=" * 70)
 print("5. CARACTERÍSTICAS DOS CLUSTERS")
 print("=" * 70)
@@ -201,15 +221,64 @@ print("\n✓ Perfis salvos em 'cluster_profiles.csv'")
 # ====================================================
 # 6. VISUALIZAÇÃO DOS CLUSTERS (PCA)
 # ====================================================
+memoria.start('pca')
 print("\n" + "=" * 70)
 print("6. VISUALIZAÇÃO DOS CLUSTERS (REDUÇÃO DIMENSIONAL PCA)")
 print("=" * 70)
 
-# Aplicar PCA para reduzir a 2 dimensões
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X_scaled)
-
-print(f"✓ PCA aplicado: {X_scaled.shape[1]}D → 2D")
+# Acima deste número de casas, o PCA é ajustado em blocos (IncrementalPCA) e
+# os pontos são desenhados como densidade em uma grade fixa por cluster: o
+# tempo e a memória do gráfico passam a depender da resolução da imagem, não
+# do número de linhas
+MAX_PONTOS_SCATTER = int(os.environ.get('KMEANS_MAX_SCATTER_POINTS', '20000'))
+TAMANHO_BLOCO_PCA = 50000
+RESOLUCAO_DENSIDADE = 400
+
+
+def _blocos(n, tamanho=TAMANHO_BLOCO_PCA):
+    # Blocos de tamanhos iguais: o partial_fit exige ao menos n_components linhas por bloco
+    limites = np.linspace(0, n, max(1, -(-n // tamanho)) + 1).astype(int)
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        yield slice(inicio, fim)
+
+
+def _densidade_por_cluster(pca, X, rotulos, n_clusters, resolucao):
+    """
+    Contagem de casas por cluster em uma grade `resolucao` x `resolucao` do
+    plano PC1 x PC2, projetando `X` bloco a bloco (a projeção completa nunca
+    fica em memória). Retorna (n_clusters, resolucao, resolucao) e os limites
+    da grade no formato `extent` do imshow.
+    """
+    # Limites pelos percentis de uma amostra; pontos fora vão para a borda
+    rng = np.random.default_rng(42)
+    amostra = np.sort(rng.choice(len(X), min(len(X), 100000), replace=False))
+    minimos, maximos = np.percentile(pca.transform(X[amostra]), [0.5, 99.5], axis=0)
+    margem = (maximos - minimos) * 0.05
+    minimos, maximos = minimos - margem, maximos + margem
+
+    contagens = np.zeros(n_clusters * resolucao * resolucao, dtype=np.int64)
+    for bloco in _blocos(len(X)):
+        celulas = ((pca.transform(X[bloco]) - minimos) / (maximos - minimos) * resolucao).astype(np.int64)
+        np.clip(celulas, 0, resolucao - 1, out=celulas)
+        # Índice linear (cluster, linha = PC2, coluna = PC1): uma única contagem por bloco
+        indices = (rotulos[bloco] * resolucao + celulas[:, 1]) * resolucao + celulas[:, 0]
+        contagens += np.bincount(indices, minlength=len(contagens))
+    extent = (minimos[0], maximos[0], minimos[1], maximos[1])
+    return contagens.reshape(n_clusters, resolucao, resolucao), extent
+
+
+modo_densidade = len(X_scaled) > MAX_PONTOS_SCATTER
+if modo_densidade:
+    # PCA incremental: ajuste por blocos, sem a SVD da matriz inteira
+    pca = IncrementalPCA(n_components=2, batch_size=TAMANHO_BLOCO_PCA)
+    for bloco in _blocos(len(X_scaled)):
+        pca.partial_fit(X_scaled[bloco])
+else:
+    # Aplicar PCA para reduzir a 2 dimensões
+    pca = PCA(n_components=2)
+    X_pca = pca.fit_transform(X_scaled)
+
+print(f"✓ PCA{' incremental' if modo_densidade else ''} aplicado: {X_scaled.shape[1]}D → 2D")
 print(f"✓ Variância explicada PC1: {pca.explained_variance_ratio_[0]*100:.2f}%")
 print(f"✓ Variância explicada PC2: {pca.explained_variance_ratio_[1]*100:.2f}%")
 print(f"✓ Variância total explicada: {sum(pca.explained_variance_ratio_)*100:.2f}%")
@@ -217,14 +286,28 @@ print(f"✓ Variância total explicada: {sum(pca.explained_variance_ratio_)*100:
 # Criar visualização
 fig, axes = plt.subplots(1, 2, figsize=(18, 7))
 
-# Gráfico 1: Scatter plot dos clusters
-scatter = axes[0].scatter(X_pca[:, 0], X_pca[:, 1], 
-                         c=df['cluster'], 
-                         cmap='viridis', 
-                         s=50, 
-                         alpha=0.6,
-                         edgecolors='k',
-                         linewidth=0.5)
+if modo_densidade:
+    # Gráfico 1: densidade dos clusters - cada pixel tem a cor do cluster
+    # predominante e opacidade pelo log da quantidade de casas
+    densidade, extent = _densidade_por_cluster(pca, X_scaled, df['cluster'].to_numpy(),
+                                               k_ideal, RESOLUCAO_DENSIDADE)
+    total = densidade.sum(axis=0)
+    cores = plt.get_cmap('viridis')(np.linspace(0, 1, k_ideal))
+    imagem = cores[densidade.argmax(axis=0)]
+    imagem[..., 3] = np.where(total > 0, 0.25 + 0.75 * np.log1p(total) / np.log1p(total.max()), 0)
+    axes[0].imshow(imagem, origin='lower', extent=extent, aspect='auto', interpolation='nearest')
+    scatter = plt.cm.ScalarMappable(cmap='viridis', norm=plt.Normalize(0, k_ideal - 1))
+    print(f"✓ Densidade em grade {RESOLUCAO_DENSIDADE}x{RESOLUCAO_DENSIDADE} "
+          f"({len(X_scaled):,} casas > {MAX_PONTOS_SCATTER:,}; scatter desativado)")
+else:
+    # Gráfico 1: Scatter plot dos clusters
+    scatter = axes[0].scatter(X_pca[:, 0], X_pca[:, 1], 
+                             c=df['cluster'], 
+                             cmap='viridis', 
+                             s=50, 
+                             alpha=0.6,
+                             edgecolors='k',
+                             linewidth=0.5)
 
 # Plotar centroides
 centroids_pca = pca.transform(kmeans_final.cluster_centers_)
@@ -259,6 +342,7 @@ print("\n✓ Visualização salva: 'kmeans_clusters_visualization.png'")
 # ====================================================
 # 7. HEATMAP DE CARACTERÍSTICAS DOS CLUSTERS
 # ====================================================
+memoria.start('heatmap')
 print("\n" + "=" * 70)
 print("7. HEATMAP DE CARACTERÍSTICAS")
 print("=" * 70)
@@ -286,6 +370,7 @@ print("✓ Heatmap salvo: 'kmeans_features_heatmap.png'")
 # ====================================================
 # 8. INTERPRETAÇÃO DOS CLUSTERS
 # ====================================================
+memoria.start('interpretacao')
 print("\n" + "=" * 70)
 print("8. INTERPRETAÇÃO DOS CLUSTERS")
 print("=" * 70)
@@ -331,6 +416,7 @@ print(df_interpretations.to_string(index=False))
 # ====================================================
 # 9. SALVAR DATASET COM CLUSTERS
 # ====================================================
+memoria.start('salvamento')
 print("\n" + "=" * 70)
 print("9. SALVANDO RESULTADOS")
 print("=" * 70)
@@ -373,3 +459,5 @@ print(f"""
 """)
 
 print("=" * 70)
+
+memoria.finish()
@@ -1,12 +1,32 @@
+import copy
+import os
+import shutil
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import StandardScaler
+from sklearn.neighbors import KDTree
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import joblib
+from joblib import Parallel, delayed
+
+# Módulos compartilhados com a API ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import drift  # noqa: E402
+import engines  # noqa: E402
+import memory  # noqa: E402
+import model_registry  # noqa: E402
+import sharded_forest  # noqa: E402
+
+import dados  # noqa: E402
+
+# Memória por seção (memory.py): orçamentos em MEMORY_BUDGETS, ex.: "dados=200,treino=1500"
+memoria = memory.MemoryTracker.from_env()
+memoria.record_since_start('imports')
 
 # Configurações de visualização
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -19,29 +39,15 @@ print("=" * 70)
 # ====================================================
 # 1. CARREGAMENTO E TRATAMENTO DOS DADOS
 # ====================================================
+memoria.start('dados')
 print("\n" + "=" * 70)
 print("1. CARREGAMENTO E PREPARAÇÃO DOS DADOS")
 print("=" * 70)
 
-# Carregar dataset
-df = pd.read_csv('./houses.csv')
+# Carregar dataset (lido do cache de dados.py quando o houses.csv não mudou)
+df = dados.carregar()
 print(f"✓ Dataset carregado: {df.shape[0]} linhas, {df.shape[1]} colunas")
-
-# Converter colunas yes/no para 1/0
-colunas_binarias = ['mainroad', 'guestroom', 'basement', 'hotwaterheating', 
-                    'airconditioning', 'prefarea']
-
-for col in colunas_binarias:
-    df[col] = df[col].map({'yes': 1, 'no': 0})
-print(f"✓ Convertidas {len(colunas_binarias)} colunas binárias (yes/no → 1/0)")
-
-# Traduzir e codificar furnishingstatus
-traducao_mobilia = {
-    'unfurnished': 'vazio',
-    'semi-furnished': 'semi-mobiliado',
-    'furnished': 'mobiliado'
-}
-df['furnishingstatus'] = df['furnishingstatus'].map(traducao_mobilia)
+print(f"✓ Convertidas {len(dados.COLUNAS_BINARIAS)} colunas binárias (yes/no → 1/0)")
 print("✓ Coluna 'furnishingstatus' traduzida")
 
 # One-hot encoding para furnishingstatus
@@ -58,6 +64,7 @@ else:
 # ====================================================
 # 2. SEPARAÇÃO DE FEATURES E TARGET
 # ====================================================
+memoria.start('features')
 print("\n" + "=" * 70)
 print("2. SEPARAÇÃO DE FEATURES E VARIÁVEL ALVO")
 print("=" * 70)
@@ -75,48 +82,88 @@ for i, col in enumerate(X.columns, 1):
 # ====================================================
 # 3. DIVISÃO TREINO/TESTE
 # ====================================================
+memoria.start('divisao')
 print("\n" + "=" * 70)
 print("3. DIVISÃO DOS DADOS (TREINO/TESTE)")
 print("=" * 70)
 
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+N_FOLDS_CV = 5
+N_REPETICOES_PERMUTACAO = 10
+
 X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
+    X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
 )
 
 print(f"✓ Conjunto de treino: {X_train.shape[0]} amostras ({(X_train.shape[0]/len(X))*100:.1f}%)")
 print(f"✓ Conjunto de teste: {X_test.shape[0]} amostras ({(X_test.shape[0]/len(X))*100:.1f}%)")
 
 # ====================================================
-# 4. TREINAMENTO DO MODELO RANDOM FOREST
+# 4. TREINAMENTO DO MODELO
 # ====================================================
+memoria.start('treino')
+# Motor escolhido pela variável MODEL_ENGINE (ver engines.py); padrão: random_forest
+motor = engines.get(os.environ.get('MODEL_ENGINE', engines.DEFAULT_ENGINE))
 print("\n" + "=" * 70)
-print("4. TREINAMENTO DO MODELO RANDOM FOREST")
+print(f"4. TREINAMENTO DO MODELO: {motor.descricao}")
 print("=" * 70)
 
-# Criar e treinar modelo
-rf_model = RandomForestRegressor(
-    n_estimators=100,
-    max_depth=10,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
+# Registro de modelos (model_registry.py): a versão é a impressão digital dos
+# dados codificados, do motor, dos parâmetros e da configuração do treino.
+# Se já existe, o modelo, a validação cruzada e a importância por permutação
+# vêm do registro, e os relatórios abaixo são gerados a partir deles
+registro = model_registry.ModelRegistry(os.environ.get('MODEL_REGISTRY_DIR', model_registry.REGISTRY_DIR))
+versao = model_registry.fingerprint(
+    X, y, motor.nome, motor.criar().get_params(),
+    test_size=TEST_SIZE, random_state=RANDOM_STATE, cv=N_FOLDS_CV,
+    repeticoes_permutacao=N_REPETICOES_PERMUTACAO
 )
+em_cache = registro.exists(versao)
 
-print("Treinando modelo Random Forest...")
-rf_model.fit(X_train, y_train)
-print("✓ Modelo treinado com sucesso!")
+if em_cache:
+    modelo = registro.load(versao)
+    manifesto = registro.manifest(versao)
+    print(f"✓ Versão {versao} já registrada em '{registro.raiz}' "
+          f"(mesmos dados, pré-processamento e parâmetros): treino ignorado")
+else:
+    # Criar e treinar modelo
+    modelo = motor.criar()
+    # Com TRAIN_WORKERS, florestas são treinadas em shards por processos (ou
+    # máquinas) via sharded_forest.py. A floresta é idêntica à de um fit
+    # normal, por isso a versão no registro não muda
+    n_workers = int(os.environ.get('TRAIN_WORKERS', '0'))
+    em_shards = n_workers > 0 and isinstance(modelo, RandomForestRegressor)
+
+    print(f"Treinando modelo '{motor.nome}' (versão {versao})...")
+    if em_shards:
+        diretorio_shards = os.environ.get('TRAIN_SHARDS_DIR', os.path.join('.cache', 'shards', versao))
+        # Só o que um treino em shards anterior gravou é apagado; um diretório
+        # com outros arquivos faz `prepare` recusar o treino
+        if os.path.exists(os.path.join(diretorio_shards, sharded_forest.MANIFEST_FILE)):
+            sharded_forest.remove(diretorio_shards)
+        print(f"  • {n_workers} worker(s) local(is), shards em '{diretorio_shards}' "
+              f"(outras máquinas: python sharded_forest.py work {diretorio_shards})")
+        modelo = sharded_forest.train(X_train, y_train, modelo.get_params(), diretorio_shards, n_workers,
+                                      linhas_por_shard=int(os.environ.get('TRAIN_SHARD_ROWS', '100000')))
+        sharded_forest.remove(diretorio_shards)
+    else:
+        if n_workers > 0:
+            print(f"⚠ TRAIN_WORKERS ignorado: o motor '{motor.nome}' não é uma Random Forest")
+        modelo.fit(X_train, y_train)
+    print("✓ Modelo treinado com sucesso!")
 
 # ====================================================
 # 5. AVALIAÇÃO DO MODELO
 # ====================================================
+memoria.start('avaliacao')
 print("\n" + "=" * 70)
 print("5. AVALIAÇÃO DO MODELO")
 print("=" * 70)
 
 # Predições
-y_train_pred = rf_model.predict(X_train)
-y_test_pred = rf_model.predict(X_test)
+y_train_pred = modelo.predict(X_train)
+y_test_pred = modelo.predict(X_test)
 
 # Métricas de treino
 train_r2 = r2_score(y_train, y_train_pred)
@@ -155,12 +202,17 @@ print(f"✓ O modelo explica {test_r2*100:.2f}% da variação nos preços")
 # ====================================================
 # 6. VALIDAÇÃO CRUZADA
 # ====================================================
+memoria.start('validacao_cruzada')
 print("\n" + "=" * 70)
 print("6. VALIDAÇÃO CRUZADA (5-FOLD)")
 print("=" * 70)
 
-cv_scores = cross_val_score(rf_model, X_train, y_train, cv=5, 
-                            scoring='r2', n_jobs=-1)
+if em_cache:
+    cv_scores = np.array(manifesto['metricas']['cv_r2'])
+    print(f"✓ Scores do registro (versão {versao})")
+else:
+    cv_scores = cross_val_score(modelo, X_train, y_train, cv=N_FOLDS_CV,
+                                scoring='r2', n_jobs=-1)
 
 print(f"✓ Scores R² por fold: {cv_scores}")
 print(f"✓ Média R²: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
@@ -168,15 +220,78 @@ print(f"✓ Média R²: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
 # ====================================================
 # 7. IMPORTÂNCIA DAS FEATURES
 # ====================================================
+memoria.start('importancia')
 print("\n" + "=" * 70)
 print("7. IMPORTÂNCIA DAS FEATURES")
 print("=" * 70)
 
-# Calcular importância
-feature_importance = pd.DataFrame({
-    'feature': X.columns,
-    'importance': rf_model.feature_importances_
-}).sort_values('importance', ascending=False)
+# Importância por permutação no conjunto de teste: queda do R² ao embaralhar
+# cada feature, sem o viés da importância por impureza para features com
+# muitos valores distintos (como area)
+
+def _importancia_por_permutacao(modelo, X_teste, y_teste, r2_base, indices, n_repeticoes, semente):
+    """Queda do R² por repetição para as features em `indices`; cada feature é avaliada em uma única predição."""
+    if 'n_jobs' in modelo.get_params():
+        # Cópia rasa (as árvores são compartilhadas): com um só processo o joblib
+        # roda aqui mesmo, e o modelo treinado não pode ficar com n_jobs=1
+        modelo = copy.copy(modelo).set_params(n_jobs=1)
+    n = len(X_teste)
+    quedas = {}
+    for j in indices:
+        # Todas as repetições da feature empilhadas em uma única matriz
+        X_permutado = np.tile(X_teste, (n_repeticoes, 1))
+        rng = np.random.default_rng([semente, j])
+        for r in range(n_repeticoes):
+            X_permutado[r * n:(r + 1) * n, j] = X_teste[rng.permutation(n), j]
+        predicoes = modelo.predict(
+            pd.DataFrame(X_permutado, columns=modelo.feature_names_in_)).reshape(n_repeticoes, n)
+        quedas[j] = [r2_base - r2_score(y_teste, predicoes[r]) for r in range(n_repeticoes)]
+    return quedas
+
+
+if em_cache:
+    permutation_importance = pd.DataFrame(
+        registro.load(versao, model_registry.FEATURE_INFO_FILE)['permutation_importance'])
+else:
+    # A predição de base (y_test_pred, seção 5) é reaproveitada; as features são
+    # divididas entre os processos e a matriz de teste é compartilhada somente
+    # leitura (memmap do joblib) em vez de copiada para cada tarefa
+    X_teste_matriz = X_test.to_numpy(dtype=np.float32)
+    n_processos = min(os.cpu_count() or 1, X.shape[1])
+    grupos = np.array_split(np.arange(X.shape[1]), n_processos)
+    resultados_permutacao = Parallel(n_jobs=n_processos, max_nbytes='1M', mmap_mode='r')(
+        delayed(_importancia_por_permutacao)(
+            modelo, X_teste_matriz, y_test.to_numpy(), test_r2, grupo, N_REPETICOES_PERMUTACAO, RANDOM_STATE)
+        for grupo in grupos
+    )
+    quedas_r2 = {j: valores for resultado in resultados_permutacao for j, valores in resultado.items()}
+    permutation_importance = pd.DataFrame({
+        'feature': X.columns,
+        'importance_mean': [np.mean(quedas_r2[j]) for j in range(X.shape[1])],
+        'importance_std': [np.std(quedas_r2[j]) for j in range(X.shape[1])],
+    }).sort_values('importance_mean', ascending=False)
+
+print(f"\n🔀 IMPORTÂNCIA POR PERMUTAÇÃO (queda do R² no teste, {N_REPETICOES_PERMUTACAO} repetições):")
+print("-" * 70)
+print(f"{'Feature':<34} {'Permutação':>12} {'Impureza':>12}")
+print("-" * 70)
+impureza = dict(zip(X.columns, getattr(modelo, 'feature_importances_', [None] * X.shape[1])))
+for _, row in permutation_importance.iterrows():
+    valor_impureza = impureza[row['feature']]
+    print(f"{row['feature']:<34} {row['importance_mean']:>8.4f} ± {row['importance_std']:.4f} "
+          + (f"{valor_impureza:>8.4f}" if valor_impureza is not None else f"{'—':>8}"))
+
+# Importância por impureza: só existe nos motores baseados em árvores; nos
+# demais o gráfico usa a importância por permutação
+if hasattr(modelo, 'feature_importances_'):
+    feature_importance = pd.DataFrame({
+        'feature': X.columns,
+        'importance': modelo.feature_importances_
+    }).sort_values('importance', ascending=False)
+else:
+    print("⚠ O motor não fornece importância por impureza; usando a importância por permutação")
+    feature_importance = permutation_importance[['feature', 'importance_mean']].rename(
+        columns={'importance_mean': 'importance'})
 
 print("\n📈 TOP 10 FEATURES MAIS IMPORTANTES:")
 print("-" * 70)
@@ -198,6 +313,7 @@ print("\n✓ Gráfico de importância salvo como 'feature_importance.png'")
 # ====================================================
 # 8. VISUALIZAÇÃO DE PREDIÇÕES
 # ====================================================
+memoria.start('graficos')
 print("\n" + "=" * 70)
 print("8. VISUALIZAÇÃO DAS PREDIÇÕES")
 print("=" * 70)
@@ -232,6 +348,7 @@ print("✓ Gráfico de predições salvo como 'predictions_analysis.png'")
 # ====================================================
 # 9. EXEMPLO DE PREDIÇÃO
 # ====================================================
+memoria.start('exemplo')
 print("\n" + "=" * 70)
 print("9. EXEMPLO DE PREDIÇÃO")
 print("=" * 70)
@@ -239,7 +356,7 @@ print("=" * 70)
 # Pegar primeira amostra do conjunto de teste
 exemplo = X_test.iloc[0:1]
 preco_real = y_test.iloc[0]
-preco_predito = rf_model.predict(exemplo)[0]
+preco_predito = modelo.predict(exemplo)[0]
 erro_percentual = abs(preco_real - preco_predito) / preco_real * 100
 
 print("\n🏠 Características da casa:")
@@ -253,21 +370,69 @@ print(f"📊 Erro: R$ {abs(preco_real - preco_predito):,.2f} ({erro_percentual:.
 # ====================================================
 # 10. SALVANDO O MODELO
 # ====================================================
+memoria.start('salvamento')
 print("\n" + "=" * 70)
 print("10. SALVANDO O MODELO")
 print("=" * 70)
 
-# Salvar modelo
-joblib.dump(rf_model, 'random_forest_model.pkl')
+if not em_cache:
+    # Informações das features
+    feature_info = {
+        'feature_names': X.columns.tolist(),
+        'engine': motor.nome,
+        'feature_importance': feature_importance.to_dict('records'),
+        'permutation_importance': permutation_importance.to_dict('records')
+    }
+
+    # Índice de imóveis comparáveis: KD-tree sobre todas as casas do dataset no
+    # espaço padronizado (StandardScaler, como em kmeans_analysis.py, mas sem o
+    # preço, que é desconhecido na consulta)
+    scaler_comparaveis = StandardScaler()
+    X_comparaveis = scaler_comparaveis.fit_transform(X.to_numpy(dtype=np.float64))
+    indice_comparaveis = {
+        'tree': KDTree(X_comparaveis, leaf_size=40),
+        'scaler': scaler_comparaveis,
+        'feature_names': X.columns.tolist(),
+        'features': X.to_numpy(dtype=np.int64),
+        'precos': y.to_numpy(dtype=np.float64),
+    }
+
+    # Perfil de referência das features de treino para o monitoramento de drift da API
+    referencia_drift = drift.build_reference(X_train.to_numpy(dtype=np.float64), X.columns.tolist())
+
+    registro.register(versao, {
+        model_registry.MODEL_FILE: modelo,
+        model_registry.FEATURE_INFO_FILE: feature_info,
+        model_registry.COMPARABLES_INDEX_FILE: indice_comparaveis,
+        model_registry.DRIFT_REFERENCE_FILE: referencia_drift,
+    }, {
+        'engine': motor.nome,
+        'descricao': motor.descricao,
+        'parametros': {nome: repr(valor) for nome, valor in sorted(modelo.get_params().items())},
+        'dados': {'linhas': len(X), 'treino': len(X_train), 'teste': len(X_test),
+                  'features': X.columns.tolist()},
+        'metricas': {
+            'r2_treino': train_r2, 'rmse_treino': train_rmse, 'mae_treino': train_mae,
+            'r2_teste': test_r2, 'rmse_teste': test_rmse, 'mae_teste': test_mae,
+            'cv_r2': cv_scores.tolist(),
+        },
+    })
+    print(f"✓ Versão {versao} registrada em '{registro.path(versao)}'")
+registro.set_alias('latest', versao)
+print(f"✓ Alias 'latest' → {versao}")
+
+# Cópias na raiz, nos nomes esperados pela API e pela imagem Docker
+for arquivo, destino in [
+    (model_registry.MODEL_FILE, 'random_forest_model.pkl'),
+    (model_registry.FEATURE_INFO_FILE, 'feature_info.pkl'),
+    (model_registry.COMPARABLES_INDEX_FILE, 'comparables_index.pkl'),
+    (model_registry.DRIFT_REFERENCE_FILE, 'drift_reference.pkl'),
+]:
+    shutil.copyfile(registro.path(versao, arquivo), destino)
 print("✓ Modelo salvo como 'random_forest_model.pkl'")
-
-# Salvar informações das features
-feature_info = {
-    'feature_names': X.columns.tolist(),
-    'feature_importance': feature_importance.to_dict('records')
-}
-joblib.dump(feature_info, 'feature_info.pkl')
 print("✓ Informações das features salvas como 'feature_info.pkl'")
+print(f"✓ Índice de comparáveis ({len(X)} imóveis) salvo como 'comparables_index.pkl'")
+print(f"✓ Perfil de referência para drift ({len(X_train)} amostras de treino) salvo como 'drift_reference.pkl'")
 
 # ====================================================
 # RESUMO FINAL
@@ -277,7 +442,8 @@ print("✅ TREINAMENTO CONCLUÍDO COM SUCESSO!")
 print("=" * 70)
 print(f"""
 📋 RESUMO:
-  • Modelo: Random Forest Regressor
+  • Modelo: {motor.descricao} (motor '{motor.nome}')
+  • Versão no registro: {versao}{' (reaproveitada, sem novo treino)' if em_cache else ''}
   • Amostras de treino: {X_train.shape[0]}
   • Amostras de teste: {X_test.shape[0]}
   • Features utilizadas: {X.shape[1]}
@@ -286,10 +452,15 @@ print(f"""
   • MAE (teste): R$ {test_mae:,.2f}
   
 📁 ARQUIVOS GERADOS:
+  • {registro.path(versao)}/ - Versão imutável com manifesto e artefatos
   • random_forest_model.pkl - Modelo treinado
   • feature_info.pkl - Informações das features
+  • comparables_index.pkl - Índice KD-tree de imóveis comparáveis
+  • drift_reference.pkl - Histogramas das features de treino (drift)
   • feature_importance.png - Gráfico de importância
   • predictions_analysis.png - Análise de predições
 """)
 
 print("=" * 70)
+
+memoria.finish()
@@ -0,0 +1,258 @@
+"""
+Executa os scripts de análise como um grafo de etapas, com cache e em paralelo.
+
+    dados ──┬── eda          (index.py)
+            ├── clustering   (kmeans_analysis.py)
+            └── treino       (model_training.py)
+
+A chave de cada etapa é o hash do código que ela executa (o script e os
+módulos que importa), do houses.csv, das variáveis de ambiente que a afetam
+e das chaves das etapas das quais depende. Ao terminar, os arquivos gerados
+pela etapa são copiados para `.cache/pipeline/<etapa>/<chave>/`; se a chave
+não mudou, a etapa não é executada e os arquivos são restaurados do cache.
+
+Etapas independentes rodam em processos separados ao mesmo tempo: o
+clustering não espera a EDA. Dentro das etapas, os cálculos caros têm cache
+próprio (dados.memo e o registro de modelos), então alterar só um gráfico
+reexecuta o script sem retreinar o modelo ou refazer os ajustes do K-means.
+
+A saída de cada etapa fica em `logs/pipeline/<etapa>.log`.
+
+Uso:
+    python analysis/pipeline.py                 # todas as etapas
+    python analysis/pipeline.py treino          # treino e suas dependências
+    python analysis/pipeline.py --forcar eda    # ignora o cache da EDA
+    python analysis/pipeline.py --listar        # etapas, chaves e estado do cache
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join('.cache', 'pipeline')
+LOG_DIR = os.path.join('logs', 'pipeline')
+
+Etapa = namedtuple('Etapa', ['nome', 'script', 'depende', 'fontes', 'variaveis', 'saidas'])
+
+ETAPAS = [
+    Etapa('dados', 'analysis/dados.py', (),
+          ('analysis/dados.py', 'houses.csv'),
+          ('ANALYSIS_CACHE_DIR',),
+          ()),
+    Etapa('eda', 'analysis/index.py', ('dados',),
+          ('analysis/index.py', 'analysis/dados.py', 'houses.csv'),
+          ('ANALYSIS_CACHE_DIR',),
+          ('correlation_heatmap.png', 'sumarizacao_dados.csv', 'metricas_estatisticas.csv',
+           'tabela_metricas_estatisticas.png', 'tabela_sumarizacao_geral.png', 'glossario_metricas.png')),
+    Etapa('clustering', 'analysis/kmeans_analysis.py', ('dados',),
+          ('analysis/kmeans_analysis.py', 'analysis/dados.py', 'houses.csv', 'memory.py', 'metrics.py'),
+          ('ANALYSIS_CACHE_DIR', 'MEMORY_BUDGETS', 'MEMORY_BUDGET_MODE'),
+          ('kmeans_elbow_analysis.png', 'kmeans_clusters_visualization.png', 'kmeans_features_heatmap.png',
+           'houses_with_clusters.csv', 'cluster_profiles.csv', 'cluster_interpretations.csv')),
+    Etapa('treino', 'analysis/model_training.py', ('dados',),
+          ('analysis/model_training.py', 'analysis/dados.py', 'houses.csv',
+           'drift.py', 'engines.py', 'model_registry.py', 'memory.py', 'metrics.py', 'sharded_forest.py'),
+          ('ANALYSIS_CACHE_DIR', 'MODEL_ENGINE', 'MODEL_REGISTRY_DIR', 'MEMORY_BUDGETS', 'MEMORY_BUDGET_MODE',
+           'TRAIN_WORKERS', 'TRAIN_SHARD_ROWS', 'TRAIN_SHARDS_DIR'),
+          ('random_forest_model.pkl', 'feature_info.pkl', 'comparables_index.pkl', 'drift_reference.pkl',
+           'feature_importance.png', 'predictions_analysis.png')),
+]
+ETAPAS_POR_NOME = {etapa.nome: etapa for etapa in ETAPAS}
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def chaves(etapas=ETAPAS):
+    """Chave de cada etapa, calculada na ordem do grafo (as dependências vêm antes)."""
+    resultado = {}
+    for etapa in etapas:
+        h = hashlib.sha256(etapa.nome.encode('utf-8'))
+        for fonte in etapa.fontes:
+            h.update(f"{fonte}:{_hash_arquivo(os.path.join(RAIZ, fonte))}".encode('utf-8'))
+        ambiente = {nome: os.environ.get(nome) for nome in etapa.variaveis}
+        h.update(json.dumps(ambiente, sort_keys=True).encode('utf-8'))
+        for dependencia in etapa.depende:
+            h.update(resultado[dependencia].encode('utf-8'))
+        resultado[etapa.nome] = h.hexdigest()[:16]
+    return resultado
+
+
+def _selecionar(nomes):
+    """Etapas pedidas e suas dependências, na ordem do grafo."""
+    selecionadas = set()
+    pendentes = list(nomes)
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in selecionadas:
+            selecionadas.add(nome)
+            pendentes.extend(ETAPAS_POR_NOME[nome].depende)
+    return [etapa for etapa in ETAPAS if etapa.nome in selecionadas]
+
+
+def _dir_cache(etapa, chave):
+    return os.path.join(RAIZ, CACHE_DIR, etapa.nome, chave)
+
+
+def _em_cache(etapa, chave):
+    pasta = _dir_cache(etapa, chave)
+    return os.path.isdir(pasta) and all(os.path.isfile(os.path.join(pasta, s)) for s in etapa.saidas)
+
+
+def _restaurar(etapa, chave):
+    """Copia do cache os arquivos gerados que faltam ou foram alterados; retorna quantos."""
+    pasta = _dir_cache(etapa, chave)
+    restaurados = 0
+    for saida in etapa.saidas:
+        origem, destino = os.path.join(pasta, saida), os.path.join(RAIZ, saida)
+        if not os.path.isfile(destino) or _hash_arquivo(destino) != _hash_arquivo(origem):
+            shutil.copyfile(origem, destino)
+            restaurados += 1
+    log = os.path.join(pasta, 'saida.log')
+    if os.path.isfile(log):
+        shutil.copyfile(log, os.path.join(RAIZ, LOG_DIR, f"{etapa.nome}.log"))
+    return restaurados
+
+
+def _guardar(etapa, chave):
+    """Copia os arquivos gerados e o log para o cache (diretório temporário renomeado ao final)."""
+    destino = _dir_cache(etapa, chave)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    for saida in etapa.saidas:
+        shutil.copyfile(os.path.join(RAIZ, saida), os.path.join(temporario, saida))
+    shutil.copyfile(os.path.join(RAIZ, LOG_DIR, f"{etapa.nome}.log"), os.path.join(temporario, 'saida.log'))
+    shutil.rmtree(destino, ignore_errors=True)
+    os.rename(temporario, destino)
+
+
+def _iniciar(etapa):
+    ambiente = dict(os.environ, MPLBACKEND='Agg', PYTHONUNBUFFERED='1')
+    log = open(os.path.join(RAIZ, LOG_DIR, f"{etapa.nome}.log"), 'w', encoding='utf-8')
+    processo = subprocess.Popen([sys.executable, os.path.join(RAIZ, etapa.script)], cwd=RAIZ,
+                                env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+    return processo, log, time.perf_counter()
+
+
+def _ultimas_linhas(etapa, n=10):
+    with open(os.path.join(RAIZ, LOG_DIR, f"{etapa.nome}.log"), encoding='utf-8', errors='replace') as f:
+        return f.readlines()[-n:]
+
+
+def executar(etapas, forcar=(), processos=None):
+    """
+    Executa as `etapas` (na ordem do grafo) respeitando as dependências, com
+    até `processos` scripts simultâneos. Etapas em `forcar` ignoram o cache.
+
+    Retorna {nome: (estado, segundos)}, com estado 'executada', 'cache',
+    'falhou' ou 'ignorada' (dependência falhou).
+    """
+    os.makedirs(os.path.join(RAIZ, LOG_DIR), exist_ok=True)
+    processos = processos or len(etapas)
+    chave_por_etapa = chaves(ETAPAS)
+    resultado = {}
+    pendentes = list(etapas)
+    em_execucao = {}
+
+    while pendentes or em_execucao:
+        for etapa in list(pendentes):
+            estados = [resultado.get(d, (None,))[0] for d in etapa.depende]
+            if any(e in ('falhou', 'ignorada') for e in estados):
+                pendentes.remove(etapa)
+                resultado[etapa.nome] = ('ignorada', 0.0)
+                print(f"⚠ {etapa.nome}: ignorada (dependência falhou)")
+                continue
+            if not all(e in ('executada', 'cache') for e in estados) or len(em_execucao) >= processos:
+                continue
+            pendentes.remove(etapa)
+            chave = chave_por_etapa[etapa.nome]
+            if etapa.nome not in forcar and _em_cache(etapa, chave):
+                restaurados = _restaurar(etapa, chave)
+                resultado[etapa.nome] = ('cache', 0.0)
+                print(f"✓ {etapa.nome}: em cache (chave {chave}"
+                      + (f", {restaurados} arquivo(s) restaurado(s))" if restaurados else ")"))
+                continue
+            print(f"… {etapa.nome}: executando {etapa.script}")
+            em_execucao[etapa.nome] = (etapa,) + _iniciar(etapa)
+
+        for nome, (etapa, processo, log, inicio) in list(em_execucao.items()):
+            if processo.poll() is None:
+                continue
+            log.close()
+            del em_execucao[nome]
+            duracao = time.perf_counter() - inicio
+            faltando = [s for s in etapa.saidas if not os.path.isfile(os.path.join(RAIZ, s))]
+            if processo.returncode != 0 or faltando:
+                resultado[nome] = ('falhou', duracao)
+                motivo = f"código {processo.returncode}" if processo.returncode else f"não gerou {', '.join(faltando)}"
+                print(f"✗ {nome}: falhou em {duracao:.1f}s ({motivo}); log em {LOG_DIR}/{nome}.log")
+                for linha in _ultimas_linhas(etapa):
+                    print(f"    {linha.rstrip()}")
+                continue
+            _guardar(etapa, chave_por_etapa[nome])
+            resultado[nome] = ('executada', duracao)
+            print(f"✓ {nome}: concluída em {duracao:.1f}s (log em {LOG_DIR}/{nome}.log)")
+
+        if em_execucao:
+            time.sleep(0.05)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('etapas', nargs='*', help=f"etapas a executar: {', '.join(ETAPAS_POR_NOME)} (padrão: todas)")
+    parser.add_argument('--forcar', nargs='*', choices=list(ETAPAS_POR_NOME), default=None,
+                        help='ignora o cache destas etapas (sem nomes: de todas as selecionadas)')
+    parser.add_argument('--processos', type=int, help='scripts simultâneos (padrão: sem limite)')
+    parser.add_argument('--listar', action='store_true', help='lista as etapas e o estado do cache')
+    args = parser.parse_args()
+
+    desconhecidas = [nome for nome in args.etapas if nome not in ETAPAS_POR_NOME]
+    if desconhecidas:
+        print(f"✗ Etapa(s) desconhecida(s): {', '.join(desconhecidas)}. Disponíveis: {', '.join(ETAPAS_POR_NOME)}")
+        return 1
+    etapas = _selecionar(args.etapas or list(ETAPAS_POR_NOME))
+
+    if args.listar:
+        chave_por_etapa = chaves(ETAPAS)
+        print(f"{'Etapa':<12} {'Depende de':<12} {'Chave':<18} {'Cache':<6} Script")
+        print("-" * 70)
+        for etapa in etapas:
+            chave = chave_por_etapa[etapa.nome]
+            print(f"{etapa.nome:<12} {','.join(etapa.depende) or '—':<12} {chave:<18} "
+                  f"{'sim' if _em_cache(etapa, chave) else 'não':<6} {etapa.script}")
+        return 0
+
+    forcar = {e.nome for e in etapas} if args.forcar == [] else set(args.forcar or ())
+
+    print("=" * 70)
+    print(f"PIPELINE DE ANÁLISE: {', '.join(e.nome for e in etapas)}")
+    print("=" * 70)
+    inicio = time.perf_counter()
+    resultado = executar(etapas, forcar, args.processos)
+    total = time.perf_counter() - inicio
+
+    executadas = sum(1 for estado, _ in resultado.values() if estado == 'executada')
+    em_cache = sum(1 for estado, _ in resultado.values() if estado == 'cache')
+    falhas = [nome for nome, (estado, _) in resultado.items() if estado in ('falhou', 'ignorada')]
+    print("=" * 70)
+    print(f"{'✓' if not falhas else '✗'} {executadas} executada(s), {em_cache} em cache"
+          + (f", falhas: {', '.join(falhas)}" if falhas else "") + f" - {total:.1f}s")
+    print("=" * 70)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
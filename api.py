@@ -1,14 +1,46 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Marco zero para medir as fases de inicialização (imports, carga do modelo, aquecimento)
+_T_INICIO_MODULO = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field, field_validator, ConfigDict, ValidationError
+from contextvars import ContextVar
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import threading
+import tracemalloc
 import joblib
-import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Annotated, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da biblioteca padrão
+    orjson = None
+
+from drift import DriftMonitor
+from metrics import Registry, process_rss_bytes
+import inference
+import memory
+from model_cache import ModelCache
+import model_registry
+import profiling
+from jobs import JobManager, JobStore
+from prediction_log import PredictionLogger
+from shadow import ShadowEvaluator
 
 app = FastAPI(
     title="API de Previsão de Preços de Casas",
-    description="API para prever preços de imóveis usando Random Forest",
+    description="API para prever preços de imóveis com modelos de machine learning",
     version="1.0.0"
 )
 
@@ -21,15 +53,335 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos os headers
 )
 
+MODEL_PATH = 'random_forest_model.pkl'
+FEATURE_INFO_PATH = 'feature_info.pkl'
+COMPARABLES_INDEX_PATH = 'comparables_index.pkl'
+DRIFT_REFERENCE_PATH = 'drift_reference.pkl'
+
+# Versão do registro de modelos (model_registry.py) a servir: id, prefixo do id
+# ou alias (ex.: "production"). Vazio usa os arquivos .pkl da raiz
+MODEL_VERSION = os.environ.get('MODEL_VERSION', '')
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', model_registry.REGISTRY_DIR)
+# Id da versão do registro carregada (None com os arquivos da raiz)
+model_registry_id = None
+if MODEL_VERSION:
+    _registro = model_registry.ModelRegistry(MODEL_REGISTRY_DIR)
+    try:
+        model_registry_id = _registro.resolve(MODEL_VERSION)
+        print(f"✓ Registro de modelos: '{MODEL_VERSION}' → versão {model_registry_id}")
+    except KeyError as e:
+        # Sem fallback para os arquivos da raiz: a API sobe sem modelo e /health responde 503
+        print(f"✗ {e.args[0]}")
+    _versao_registro = model_registry_id or MODEL_VERSION
+    MODEL_PATH = _registro.path(_versao_registro, model_registry.MODEL_FILE)
+    FEATURE_INFO_PATH = _registro.path(_versao_registro, model_registry.FEATURE_INFO_FILE)
+    COMPARABLES_INDEX_PATH = _registro.path(_versao_registro, model_registry.COMPARABLES_INDEX_FILE)
+    DRIFT_REFERENCE_PATH = _registro.path(_versao_registro, model_registry.DRIFT_REFERENCE_FILE)
+
+
+def _versao_modelo(caminho):
+    """Identificador curto do modelo: prefixo do SHA-256 do arquivo serializado."""
+    with open(caminho, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+# Orçamento de tempo de inicialização; acima dele a API apenas avisa no log
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', '5'))
+
+# Duração (s) de cada fase da inicialização, exposta em /health e /metrics
+startup_phases = {'imports': time.perf_counter() - _T_INICIO_MODULO}
+# Memória por fase da inicialização (memory.py). As fases apenas avisam ao
+# exceder o orçamento; com MEMORY_BUDGET_MODE=falhar a API não sobe (ver o fim
+# da inicialização)
+MEMORY_BUDGET_MODE = os.environ.get('MEMORY_BUDGET_MODE', 'avisar')
+memoria = memory.MemoryTracker.from_env(modo='avisar')
+memoria.record_since_start('imports')
+model_load_seconds = None
+model_version = None
+# Motor do modelo (engines.py); artefatos antigos não registram e são Random Forest
+model_engine = None
+# Matrizes de explicação (explain=true) do modelo principal calculadas no
+# aquecimento em vez de na primeira explicação pedida
+EXPLAIN_PRECOMPUTE = os.environ.get('EXPLAIN_PRECOMPUTE', '0') == '1'
+# Carga e aquecimento acontecem na importação, antes de o servidor aceitar
+# conexões: se falharem, `model` fica None e /health responde 503
 try:
-    model = joblib.load('random_forest_model.pkl')
-    feature_info = joblib.load('feature_info.pkl')
-    print("✓ Modelo carregado com sucesso!")
+    _inicio_fase = time.perf_counter()
+    with memoria.stage('model_load'):
+        model = joblib.load(MODEL_PATH)
+    model_load_seconds = startup_phases['model_load'] = time.perf_counter() - _inicio_fase
+
+    _inicio_fase = time.perf_counter()
+    feature_info = joblib.load(FEATURE_INFO_PATH)
+    # _prever monta a matriz na ordem fixa de inference.FEATURE_NAMES
+    if feature_info['feature_names'] != inference.FEATURE_NAMES:
+        raise ValueError(f"features do modelo ({', '.join(feature_info['feature_names'])}) "
+                         f"diferem das features da API ({', '.join(inference.FEATURE_NAMES)})")
+    model_version = model_registry_id or _versao_modelo(MODEL_PATH)
+    model_engine = feature_info.get('engine', 'random_forest')
+    startup_phases['feature_info_load'] = time.perf_counter() - _inicio_fase
+
+    _inicio_fase = time.perf_counter()
+    with memoria.stage('warmup'):
+        inference.warmup(model, explicacao=EXPLAIN_PRECOMPUTE)
+    startup_phases['warmup'] = time.perf_counter() - _inicio_fase
+    print(f"✓ Modelo carregado com sucesso! (versão {model_version}, motor {model_engine}, "
+          f"{model_load_seconds:.3f}s)")
 except Exception as e:
     print(f"✗ Erro ao carregar modelo: {e}")
     model = None
     feature_info = None
 
+# Índice de imóveis comparáveis (opcional, gerado por model_training.py)
+comparables_index = None
+try:
+    _inicio_fase = time.perf_counter()
+    with memoria.stage('comparables_load'):
+        comparables_index = joblib.load(COMPARABLES_INDEX_PATH)
+    startup_phases['comparables_load'] = time.perf_counter() - _inicio_fase
+    print(f"✓ Índice de comparáveis carregado ({len(comparables_index['precos'])} imóveis)")
+except FileNotFoundError:
+    print(f"⚠ Índice de comparáveis não encontrado ({COMPARABLES_INDEX_PATH}). "
+          "Execute model_training.py para habilitar /comparables.")
+except Exception as e:
+    print(f"✗ Erro ao carregar índice de comparáveis: {e}")
+
+# Monitoramento de drift das features recebidas (opcional, referência gerada por model_training.py)
+drift_monitor = None
+try:
+    _referencia_drift = joblib.load(DRIFT_REFERENCE_PATH)
+    if _referencia_drift['feature_names'] != inference.FEATURE_NAMES:
+        raise ValueError("features da referência diferem das features do modelo")
+    drift_monitor = DriftMonitor(_referencia_drift)
+    print(f"✓ Referência de drift carregada ({drift_monitor.observacoes_referencia} amostras de treino)")
+except FileNotFoundError:
+    print(f"⚠ Referência de drift não encontrada ({DRIFT_REFERENCE_PATH}). "
+          "Execute model_training.py para habilitar /drift.")
+except Exception as e:
+    print(f"✗ Erro ao carregar referência de drift: {e}")
+
+# Modelo sombra (opcional): avaliado em segundo plano para comparação com o principal
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH')
+SHADOW_LOG_PATH = os.environ.get('SHADOW_LOG_PATH', 'logs/shadow.jsonl')
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', '1.0'))
+SHADOW_LOG_MAX_MB = float(os.environ.get('SHADOW_LOG_MAX_MB', '100'))
+SHADOW_LOG_MAX_HOURS = float(os.environ.get('SHADOW_LOG_MAX_HOURS', '24'))
+SHADOW_LOG_COMPRESS = os.environ.get('SHADOW_LOG_COMPRESS', '1') == '1'
+shadow = None
+if SHADOW_MODEL_PATH and model is not None:
+    try:
+        _inicio_fase = time.perf_counter()
+        with memoria.stage('shadow_load'):
+            _modelo_sombra = joblib.load(SHADOW_MODEL_PATH)
+            inference.warmup(_modelo_sombra)
+        shadow = ShadowEvaluator(
+            _modelo_sombra, _versao_modelo(SHADOW_MODEL_PATH), model_version,
+            SHADOW_LOG_PATH, taxa=SHADOW_SAMPLE_RATE,
+            max_bytes=int(SHADOW_LOG_MAX_MB * 1024 * 1024),
+            max_segundos=SHADOW_LOG_MAX_HOURS * 3600,
+            comprimir=SHADOW_LOG_COMPRESS,
+        )
+        startup_phases['shadow_load'] = time.perf_counter() - _inicio_fase
+        print(f"✓ Modelo sombra carregado (versão {shadow.versao}, taxa {SHADOW_SAMPLE_RATE:.0%}, "
+              f"log em '{SHADOW_LOG_PATH}')")
+    except Exception as e:
+        print(f"✗ Erro ao carregar modelo sombra: {e}")
+
+# Log de predições para auditoria e retreinamento (PREDICTION_LOG_PATH vazio desabilita)
+PREDICTION_LOG_PATH = os.environ.get('PREDICTION_LOG_PATH', 'logs/requests.jsonl')
+PREDICTION_LOG_MAX_MB = float(os.environ.get('PREDICTION_LOG_MAX_MB', '100'))
+PREDICTION_LOG_MAX_HOURS = float(os.environ.get('PREDICTION_LOG_MAX_HOURS', '24'))
+PREDICTION_LOG_COMPRESS = os.environ.get('PREDICTION_LOG_COMPRESS', '1') == '1'
+PREDICTION_LOG_SAMPLE_RATE = float(os.environ.get('PREDICTION_LOG_SAMPLE_RATE', '1.0'))
+prediction_logger = None
+if PREDICTION_LOG_PATH and model is not None:
+    try:
+        prediction_logger = PredictionLogger(
+            PREDICTION_LOG_PATH, model_version,
+            max_bytes=int(PREDICTION_LOG_MAX_MB * 1024 * 1024),
+            max_segundos=PREDICTION_LOG_MAX_HOURS * 3600,
+            comprimir=PREDICTION_LOG_COMPRESS,
+            taxa=PREDICTION_LOG_SAMPLE_RATE,
+        )
+        print(f"✓ Log de predições em '{PREDICTION_LOG_PATH}' (taxa {PREDICTION_LOG_SAMPLE_RATE:.0%})")
+    except OSError as e:
+        print(f"✗ Erro ao abrir log de predições '{PREDICTION_LOG_PATH}': {e}")
+
+# Jobs de predição em massa: armazenamento local e pool de workers
+JOBS_DIR = os.environ.get('JOBS_DIR', 'jobs')
+JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', '2'))
+JOBS_CHUNK_ROWS = int(os.environ.get('JOBS_CHUNK_ROWS', '50000'))
+JOBS_UPLOAD_BUFFER_BYTES = 1024 * 1024
+job_manager = None
+if model is not None:
+    try:
+        job_manager = JobManager(JobStore(JOBS_DIR), model, JOBS_WORKERS, JOBS_CHUNK_ROWS)
+        _retomados = job_manager.retomar_pendentes()
+        if _retomados:
+            print(f"✓ {_retomados} job(s) interrompido(s) retomado(s) do checkpoint")
+    except OSError as e:
+        print(f"✗ Erro ao inicializar jobs em '{JOBS_DIR}': {e}")
+
+# Modelos por mercado: versões do registro pedidas com ?mercado=<alias ou id>,
+# carregadas na primeira requisição e mantidas em um LRU limitado por memória
+MODEL_CACHE_MAX_MB = float(os.environ.get('MODEL_CACHE_MAX_MB', '2048'))
+MODEL_CACHE_LOAD_WORKERS = int(os.environ.get('MODEL_CACHE_LOAD_WORKERS', '2'))
+
+
+def _carregar_mercado(nome):
+    """Modelo do mercado `nome` no registro: `(modelo, versao, feature_info)`; KeyError se não existe."""
+    registro = model_registry.ModelRegistry(MODEL_REGISTRY_DIR)
+    versao = registro.resolve(nome)
+    info = registro.load(versao, model_registry.FEATURE_INFO_FILE)
+    if info['feature_names'] != inference.FEATURE_NAMES:
+        raise ValueError(f"features da versão {versao} diferem das features da API")
+    return registro.load(versao, model_registry.MODEL_FILE), versao, info
+
+
+model_cache = ModelCache(_carregar_mercado, int(MODEL_CACHE_MAX_MB * 1024 * 1024), MODEL_CACHE_LOAD_WORKERS)
+
+startup_phases['total'] = time.perf_counter() - _T_INICIO_MODULO
+print("✓ Inicialização: " + ", ".join(f"{fase}={duracao:.3f}s" for fase, duracao in startup_phases.items()))
+if startup_phases['total'] > STARTUP_BUDGET_SECONDS:
+    print(f"⚠ Inicialização levou {startup_phases['total']:.2f}s "
+          f"(orçamento: {STARTUP_BUDGET_SECONDS:.2f}s)")
+print(memoria.report())
+if MEMORY_BUDGET_MODE == 'falhar' and memoria.exceeded():
+    raise memory.MemoryBudgetExceeded(
+        "Inicialização acima do orçamento de memória: " + ", ".join(
+            f"{etapa.nome} ({etapa.crescimento / memory.MB:.1f} MB > {etapa.orcamento / memory.MB:.1f} MB)"
+            for etapa in memoria.exceeded()))
+
+# ====================================================
+# MÉTRICAS (formato Prometheus, expostas em /metrics)
+# ====================================================
+metrics = Registry()
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Total de requisições HTTP", labels=("method", "path", "status"))
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Latência total das requisições HTTP", labels=("path",))
+PREDICT_ERRORS = metrics.counter(
+    "predict_errors_total", "Erros em /predict por causa", labels=("cause",))
+PREDICT_STAGE_LATENCY = metrics.histogram(
+    "predict_stage_duration_seconds", "Latência de /predict por etapa", labels=("stage",))
+metrics.gauge("model_load_seconds", "Tempo de carregamento do modelo",
+              funcao=lambda: model_load_seconds)
+MODEL_INFO = metrics.gauge("model_info", "Versão e motor do modelo carregado", labels=("version", "engine"))
+if model_version is not None:
+    MODEL_INFO.set(1, model_version, model_engine)
+metrics.gauge("process_resident_memory_bytes", "Memória residente do processo",
+              funcao=process_rss_bytes)
+STARTUP_PHASES = metrics.gauge(
+    "startup_phase_seconds", "Duração de cada fase da inicialização", labels=("phase",))
+for _fase, _duracao in startup_phases.items():
+    STARTUP_PHASES.set(_duracao, _fase)
+STARTUP_PEAK_RSS = metrics.gauge(
+    "startup_phase_peak_rss_bytes", "Pico de RSS de cada fase da inicialização", labels=("phase",))
+STARTUP_RSS_GROWTH = metrics.gauge(
+    "startup_phase_rss_growth_bytes", "Crescimento do RSS (pico - início) de cada fase da inicialização",
+    labels=("phase",))
+for _etapa in memoria.etapas:
+    STARTUP_PEAK_RSS.set(_etapa.pico_rss, _etapa.nome)
+    STARTUP_RSS_GROWTH.set(_etapa.crescimento, _etapa.nome)
+metrics.gauge("process_peak_resident_memory_bytes", "Pico de RSS do processo desde o fim da inicialização",
+              funcao=memory.peak_rss_bytes)
+# Só com MEMORY_TRACEMALLOC=1: custo de alocação do Python por requisição
+PREDICT_ALLOCATED_BYTES = metrics.histogram(
+    "predict_allocated_bytes", "Pico de memória alocada pelo Python por requisição de predição (tracemalloc)",
+    labels=("path",), buckets=tuple(1024 * 4 ** i for i in range(11)))
+if tracemalloc.is_tracing():
+    metrics.gauge("python_traced_memory_bytes", "Memória alocada pelo Python rastreada pelo tracemalloc",
+                  funcao=lambda: tracemalloc.get_traced_memory()[0])
+DRIFT_PSI = metrics.gauge(
+    "feature_drift_psi", "PSI de cada feature recebida em relação ao treino", labels=("feature",))
+DRIFT_KS = metrics.gauge(
+    "feature_drift_ks", "Distância KS de cada feature recebida em relação ao treino", labels=("feature",))
+if drift_monitor is not None:
+    metrics.counter("feature_drift_observations_total", "Linhas acumuladas no monitoramento de drift",
+                    funcao=lambda: drift_monitor.observacoes)
+if prediction_logger is not None:
+    metrics.counter("prediction_log_written_total", "Predições gravadas no log de predições",
+                    funcao=lambda: prediction_logger.gravados)
+    metrics.counter("prediction_log_dropped_total", "Predições descartadas com a fila do log cheia",
+                    funcao=lambda: prediction_logger.descartados)
+if shadow is not None:
+    metrics.counter("shadow_predictions_total", "Predições avaliadas pelo modelo sombra",
+                    funcao=lambda: shadow.avaliados)
+    metrics.counter("shadow_dropped_total", "Predições descartadas com a fila do modelo sombra cheia",
+                    funcao=lambda: shadow.descartados)
+    metrics.counter("shadow_errors_total", "Predições sem comparação por erro no modelo sombra ou no log",
+                    funcao=lambda: shadow.erros)
+    metrics.counter("shadow_abs_delta_total", "Soma das diferenças absolutas entre sombra e principal",
+                    funcao=lambda: shadow.soma_delta_absoluto)
+MODEL_CACHE_REQUESTS = metrics.counter(
+    "model_cache_requests_total", "Requisições com ?mercado= por modelo e resultado no cache",
+    labels=("model", "result"))
+MODEL_CACHE_BYTES = metrics.gauge(
+    "model_cache_resident_bytes", "Memória estimada de cada modelo carregado no cache", labels=("model",))
+MODEL_CACHE_LOAD = metrics.gauge(
+    "model_cache_load_seconds", "Duração da última carga de cada modelo no cache", labels=("model",))
+metrics.gauge("model_cache_budget_bytes", "Orçamento de memória do cache de modelos",
+              funcao=lambda: model_cache.orcamento_bytes)
+metrics.counter("model_cache_evictions_total", "Modelos descartados do cache",
+                funcao=lambda: model_cache.descartes)
+
+def _json_bytes(conteudo):
+    """Serializa para JSON compacto (orjson quando disponível)."""
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Resposta JSON sem passar pelo `jsonable_encoder` nem pela revalidação do `response_model`."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return _json_bytes(content)
+
+
+# Instante em que a requisição atual chegou, definido pelo middleware de métricas
+_inicio_requisicao: ContextVar[Optional[float]] = ContextVar('_inicio_requisicao', default=None)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro que mede latência e status de cada requisição HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        _inicio_requisicao.set(inicio)
+        status = [500]
+
+        async def send_com_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            rota = getattr(scope.get("route"), "path", "desconhecida")
+            HTTP_REQUESTS.inc(scope["method"], rota, status[0])
+            HTTP_LATENCY.observe(time.perf_counter() - inicio, rota)
+
+
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    if request.url.path == "/predict":
+        PREDICT_ERRORS.inc("validation")
+    return await request_validation_exception_handler(request, exc)
+
 class HouseFeatures(BaseModel):
     area: int = Field(..., description="Área da casa em pés quadrados", ge=1650, le=16200)
     bedrooms: int = Field(..., description="Número de quartos", ge=1, le=6)
@@ -71,14 +423,172 @@ class HouseFeatures(BaseModel):
         }
     )
 
+class PredictionInterval(BaseModel):
+    inferior: float = Field(..., description="Quantil 10% das predições das árvores")
+    superior: float = Field(..., description="Quantil 90% das predições das árvores")
+    desvio_padrao: float = Field(..., description="Desvio padrão das predições das árvores")
+
 class PredictionResponse(BaseModel):
     preco_predito: float = Field(..., description="Preço predito da casa")
     preco_formatado: str = Field(..., description="Preço formatado em reais")
     features_utilizadas: dict = Field(..., description="Features utilizadas na predição")
     confianca: str = Field(..., description="Nível de confiança da predição")
+    intervalo: Optional[PredictionInterval] = Field(None, description="Dispersão da predição entre as árvores da floresta")
+    contribuicoes: Optional[dict[str, float]] = Field(None, description="Contribuição aditiva de cada feature ao preço (explain=true)")
+    valor_base: Optional[float] = Field(None, description="Preço médio de referência do modelo; somado às contribuições resulta no preço predito")
+
+class BatchPrediction(BaseModel):
+    preco_predito: float = Field(..., description="Preço predito da casa")
+    confianca: str = Field(..., description="Nível de confiança da predição")
+    intervalo: Optional[PredictionInterval] = Field(None, description="Dispersão da predição entre as árvores da floresta")
+    contribuicoes: Optional[dict[str, float]] = Field(None, description="Contribuição aditiva de cada feature ao preço (explain=true)")
+    valor_base: Optional[float] = Field(None, description="Preço médio de referência do modelo; somado às contribuições resulta no preço predito")
+
+class BatchPredictionResponse(BaseModel):
+    predicoes: list[BatchPrediction] = Field(..., description="Predições na mesma ordem da entrada")
+
+# Tamanho máximo de um lote em /predict/batch
+MAX_BATCH_SIZE = 10000
+
+METODO_CONFIANCA = Query(
+    "heuristica", pattern="^(heuristica|arvores)$",
+    description="'heuristica' (regras sobre as features) ou 'arvores' (dispersão entre as árvores da floresta)"
+)
+
+EXPLICAR = Query(
+    False, alias="explain",
+    description="Inclui a contribuição de cada feature ao preço, obtida dos caminhos de decisão das árvores"
+)
+
+
+PADRAO_MERCADO = r"^[A-Za-z0-9_.-]+$"
+
+MERCADO = Query(
+    None, pattern=PADRAO_MERCADO,
+    description="Mercado: alias ou id de uma versão do registro de modelos. Sem ele, usa o modelo principal"
+)
+
+
+async def _modelo_da_requisicao(mercado: Optional[str]):
+    """
+    `(modelo, versao)` que responde a requisição: o principal (versao None) ou
+    o do mercado, carregado sob demanda pelo cache de modelos.
+    """
+    if mercado is None:
+        if model is None:
+            raise HTTPException(
+                status_code=500,
+                detail="Modelo não carregado. Execute model_training.py primeiro."
+            )
+        return model, None
+    try:
+        entrada, acerto = await model_cache.get(mercado)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Mercado '{mercado}' não encontrado no registro de modelos")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao carregar o modelo do mercado '{mercado}': {e}")
+    MODEL_CACHE_REQUESTS.inc(mercado, "hit" if acerto else "miss")
+    return entrada.modelo, entrada.versao
+
+
+def _verificar_explicacao(modelo, explicar: bool):
+    if explicar and not inference.is_forest(modelo):
+        raise HTTPException(
+            status_code=400,
+            detail="Explicação disponível apenas para modelos de floresta"
+        )
+
+
+def _explicacoes(predicoes):
+    """Campos `contribuicoes` e `valor_base` de cada linha (vazios sem explain=true)."""
+    if predicoes.contribuicoes is None:
+        return [{}] * len(predicoes.preco)
+    return [
+        {"contribuicoes": contribuicoes, "valor_base": predicoes.valor_base}
+        for contribuicoes in inference.group_contributions(predicoes.contribuicoes)
+    ]
+
+
+def _intervalos(predicoes):
+    """Lista de `intervalo` por linha (ou None para modelos que não são florestas)."""
+    if predicoes.desvio_padrao is None:
+        return [None] * len(predicoes.preco)
+    return [
+        {"inferior": inferior, "superior": superior, "desvio_padrao": desvio}
+        for inferior, superior, desvio in zip(
+            predicoes.inferior.tolist(), predicoes.superior.tolist(), predicoes.desvio_padrao.tolist())
+    ]
+
+
+def _prever(modelo, versao: Optional[str], house: HouseFeatures, t_inicio: float, metodo_confianca: str,
+            compacto: bool = False, explicar: bool = False):
+    """
+    Codifica as features, executa o modelo e monta a resposta de /predict.
+
+    `versao` só é informada para modelos de mercado, que ficam fora do modelo
+    sombra e do monitoramento de drift (a referência é a do modelo principal).
+    """
+    try:
+        input_data = inference.encode_house(house)
+        X = inference.to_matrix([input_data])
+        t_codificacao = time.perf_counter()
+        PREDICT_STAGE_LATENCY.observe(t_codificacao - t_inicio, "encoding")
+        
+        predicoes = inference.predict_distribution(modelo, X, explicar=explicar)
+        prediction = predicoes.preco[0]
+        t_inferencia = time.perf_counter()
+        PREDICT_STAGE_LATENCY.observe(t_inferencia - t_codificacao, "inference")
+        if versao is None:
+            if shadow is not None:
+                shadow.submit(X, predicoes.preco, t_inferencia - t_codificacao)
+            if drift_monitor is not None:
+                drift_monitor.observe(X)
+
+        confiancas = inference.confidence(X, predicoes if metodo_confianca == "arvores" else None)
+        confianca = confiancas[0]
+        t_confianca = time.perf_counter()
+        PREDICT_STAGE_LATENCY.observe(t_confianca - t_inferencia, "confidence")
+        if prediction_logger is not None:
+            prediction_logger.submit("/predict", X, predicoes.preco, confiancas, t_confianca - t_inicio,
+                                     versao=versao)
+        
+        # Os campos já têm os tipos de PredictionResponse; serializamos o
+        # dicionário diretamente em vez de revalidar pelo response_model
+        if compacto:
+            response = FastJSONResponse(
+                {"preco_predito": float(prediction), "confianca": str(confianca), **_explicacoes(predicoes)[0]},
+                headers={"Preference-Applied": "return=minimal"}
+            )
+        else:
+            response = FastJSONResponse({
+                "preco_predito": float(prediction),
+                "preco_formatado": f"R$ {prediction:,.2f}",
+                "features_utilizadas": input_data,
+                "confianca": str(confianca),
+                "intervalo": _intervalos(predicoes)[0],
+                **_explicacoes(predicoes)[0]
+            })
+        PREDICT_STAGE_LATENCY.observe(time.perf_counter() - t_confianca, "serialization")
+        
+        return response
+        
+    except Exception as e:
+        PREDICT_ERRORS.inc("inference")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao fazer predição: {str(e)}"
+        )
+
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_price(house: HouseFeatures):
+async def predict_price(
+    house: HouseFeatures,
+    metodo_confianca: str = METODO_CONFIANCA,
+    compacto: bool = Query(False, description="Retorna apenas preco_predito e confianca"),
+    prefer: Optional[str] = Header(None, description="'return=minimal' equivale a compacto=true"),
+    explicar: bool = EXPLICAR,
+    mercado: Optional[str] = MERCADO,
+):
     """
     Endpoint para prever o preço de uma casa com base nas características fornecidas.
     
@@ -101,74 +611,648 @@ async def predict_price(house: HouseFeatures):
     - Preço formatado em reais
     - Features utilizadas
     - Nível de confiança
+    - Intervalo entre as árvores da floresta (quantis 10%-90% e desvio padrão)
+
+    Com `compacto=true` (ou o header `Prefer: return=minimal`) a resposta
+    contém apenas `preco_predito` e `confianca`.
+
+    Com `explain=true`, inclui `contribuicoes` (quanto cada feature somou ou
+    subtraiu do preço) e `valor_base`; a soma dos dois é o preço predito.
+
+    Com `mercado=<alias>`, a predição usa o modelo daquele mercado no registro
+    de modelos (404 se o alias não existe).
     """
     
-    if model is None:
+    t_inicio = _observar_validacao()
+
+    try:
+        modelo, versao = await _modelo_da_requisicao(mercado)
+    except HTTPException as e:
+        PREDICT_ERRORS.inc("model_not_found" if e.status_code == 404 else "model_not_loaded")
+        raise
+    
+    _verificar_explicacao(modelo, explicar)
+    compacto = compacto or (prefer is not None and "return=minimal" in prefer)
+    return _prever_medido(modelo, versao, house, t_inicio, metodo_confianca, compacto, explicar)
+
+
+def _observar_validacao():
+    """Registra a etapa "validation" da requisição e retorna o início da predição."""
+    t_inicio = time.perf_counter()
+    inicio_requisicao = _inicio_requisicao.get()
+    if inicio_requisicao is not None:
+        # Leitura do corpo ou da query string e validação pelo pydantic
+        PREDICT_STAGE_LATENCY.observe(t_inicio - inicio_requisicao, "validation")
+    return t_inicio
+
+
+def _prever_medido(modelo, versao, house, t_inicio, metodo_confianca, compacto, explicar):
+    """`_prever` com a amostragem do cProfile e a memória alocada, comum a GET e POST /predict."""
+    sessao = profiling.sessao_cprofile
+    with memory.allocation() as alocacao:
+        if sessao is not None and sessao.amostrar():
+            with sessao:
+                resposta = _prever(modelo, versao, house, t_inicio, metodo_confianca, compacto, explicar)
+        else:
+            resposta = _prever(modelo, versao, house, t_inicio, metodo_confianca, compacto, explicar)
+    if alocacao.bytes is not None:
+        PREDICT_ALLOCATED_BYTES.observe(alocacao.bytes, "/predict")
+    return resposta
+
+
+# Validade (s) das respostas de GET /predict em caches HTTP (navegador, proxy reverso)
+PREDICT_CACHE_MAX_AGE = int(os.environ.get('PREDICT_CACHE_MAX_AGE', '3600'))
+
+
+def _etag_predicao(versao: str, input_data: dict, *opcoes):
+    """ETag forte: hash da versão do modelo, das features codificadas e das opções da resposta."""
+    canonico = json.dumps([versao, [input_data[nome] for nome in inference.FEATURE_NAMES], *opcoes],
+                          separators=(",", ":"))
+    return '"' + hashlib.sha256(canonico.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def _etag_corresponde(if_none_match: Optional[str], etag: str):
+    """If-None-Match usa comparação fraca (RFC 9110): W/"x" corresponde a "x"."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(valor.strip().removeprefix("W/") == etag for valor in if_none_match.split(","))
+
+
+class PredictQuery(HouseFeatures):
+    """Query string de GET /predict: as features da casa mais as opções de POST /predict."""
+    metodo_confianca: str = Field("heuristica", pattern="^(heuristica|arvores)$",
+                                  description=METODO_CONFIANCA.description)
+    compacto: bool = Field(False, description="Retorna apenas preco_predito e confianca")
+    explicar: bool = Field(False, alias="explain", description=EXPLICAR.description)
+    mercado: Optional[str] = Field(None, pattern=PADRAO_MERCADO, description=MERCADO.description)
+
+    model_config = ConfigDict(extra="forbid")
+
+
+@app.get("/predict", response_model=PredictionResponse)
+async def predict_price_get(
+    consulta: Annotated[PredictQuery, Query()],
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Mesma predição de `POST /predict`, com as features na query string
+    (`/predict?area=7420&bedrooms=4&...&furnishingstatus=mobiliado`), para
+    que navegadores e proxies reversos possam guardar a resposta.
+
+    A resposta é determinística para a versão do modelo e a entrada: o `ETag`
+    é o hash da versão, das features codificadas (a ordem dos parâmetros e
+    zeros à esquerda não mudam o ETag) e das opções. Com `If-None-Match`
+    igual ao ETag, responde 304 sem executar o modelo. `Cache-Control`
+    permite guardar a resposta por `PREDICT_CACHE_MAX_AGE` segundos.
+    """
+    t_inicio = _observar_validacao()
+    try:
+        modelo, versao = await _modelo_da_requisicao(consulta.mercado)
+    except HTTPException as e:
+        PREDICT_ERRORS.inc("model_not_found" if e.status_code == 404 else "model_not_loaded")
+        raise
+    _verificar_explicacao(modelo, consulta.explicar)
+
+    etag = _etag_predicao(versao or model_version, inference.encode_house(consulta),
+                          consulta.metodo_confianca, consulta.compacto, consulta.explicar)
+    cabecalhos = {"ETag": etag, "Cache-Control": f"public, max-age={PREDICT_CACHE_MAX_AGE}"}
+    if _etag_corresponde(if_none_match, etag):
+        return Response(status_code=304, headers=cabecalhos)
+    resposta = _prever_medido(modelo, versao, consulta, t_inicio, consulta.metodo_confianca,
+                              consulta.compacto, consulta.explicar)
+    resposta.headers.update(cabecalhos)
+    return resposta
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(houses: list[HouseFeatures], metodo_confianca: str = METODO_CONFIANCA,
+                        explicar: bool = EXPLICAR, mercado: Optional[str] = MERCADO):
+    """
+    Prevê o preço de um lote de casas em uma única avaliação vetorizada do modelo.
+
+    Recebe uma lista de objetos no mesmo formato de `/predict` (até 10000 por
+    requisição) e retorna, na mesma ordem, o preço, a confiança e o intervalo
+    entre as árvores de cada casa (e as contribuições das features, com
+    `explain=true`). Com `mercado`, usa o modelo daquele mercado, como em `/predict`.
+    """
+    if len(houses) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(houses)} casas excede o máximo de {MAX_BATCH_SIZE}"
+        )
+    modelo, versao = await _modelo_da_requisicao(mercado)
+    _verificar_explicacao(modelo, explicar)
+    if not houses:
+        return FastJSONResponse({"predicoes": []})
+
+    with memory.allocation() as alocacao:
+        try:
+            X = inference.to_matrix([inference.encode_house(house) for house in houses])
+            t_inferencia = time.perf_counter()
+            predicoes = inference.predict_distribution(modelo, X, explicar=explicar)
+            if versao is None:
+                if shadow is not None:
+                    shadow.submit(X, predicoes.preco, time.perf_counter() - t_inferencia)
+                if drift_monitor is not None:
+                    drift_monitor.observe(X)
+            confiancas = inference.confidence(X, predicoes if metodo_confianca == "arvores" else None)
+            if prediction_logger is not None:
+                prediction_logger.submit("/predict/batch", X, predicoes.preco, confiancas,
+                                         time.perf_counter() - t_inferencia, versao=versao)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erro ao fazer predição: {str(e)}"
+            )
+
+        resposta = FastJSONResponse({"predicoes": [
+            {"preco_predito": preco, "confianca": confianca, "intervalo": intervalo, **explicacao}
+            for preco, confianca, intervalo, explicacao in zip(
+                predicoes.preco.tolist(), confiancas.tolist(), _intervalos(predicoes), _explicacoes(predicoes))
+        ]})
+    if alocacao.bytes is not None:
+        PREDICT_ALLOCATED_BYTES.observe(alocacao.bytes, "/predict/batch")
+    return resposta
+
+
+class SweepRequest(BaseModel):
+    casa: HouseFeatures = Field(..., description="Casa base; as demais features ficam fixas")
+    variar: list[str] = Field(..., min_length=1, max_length=2, description="Uma ou duas features a variar")
+
+    @field_validator('variar')
+    @classmethod
+    def validate_variar(cls, v):
+        invalidas = [nome for nome in v if nome not in inference.RAW_COLUMNS]
+        if invalidas:
+            raise ValueError(f"Features desconhecidas: {', '.join(invalidas)}")
+        if len(set(v)) != len(v):
+            raise ValueError("As features a variar devem ser distintas")
+        return v
+
+class SweepResponse(BaseModel):
+    variar: list[str] = Field(..., description="Features variadas, na ordem dos eixos de precos")
+    valores: dict[str, list] = Field(..., description="Valores avaliados de cada feature")
+    precos: list = Field(..., description="Preços: lista (uma feature) ou matriz [i][j] (duas features)")
+    preco_base: float = Field(..., description="Preço predito da casa base")
+
+
+@app.post("/predict/sweep", response_model=SweepResponse)
+async def predict_sweep(pedido: SweepRequest, mercado: Optional[str] = MERCADO):
+    """
+    Curva (ou grade) de preços variando uma ou duas features da casa base.
+
+    Todas as combinações são avaliadas em uma única chamada vetorizada ao
+    modelo. `area` é avaliada apenas nos pontos em que a predição da floresta
+    muda (o primeiro valor após cada limiar das árvores): o preço de um ponto
+    vale até o próximo ponto da lista. As demais features percorrem toda a
+    faixa aceita por `/predict`.
+    """
+    modelo, _ = await _modelo_da_requisicao(mercado)
+
+    try:
+        base = inference.to_matrix([inference.encode_house(pedido.casa)])[0]
+        grades = {nome: inference.sweep_values(modelo, nome) for nome in pedido.variar}
+        X = np.vstack([base, inference.sweep_matrix(base, grades)])
+        precos = inference.predict(modelo, X)
+    except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail="Modelo não carregado. Execute model_training.py primeiro."
+            detail=f"Erro ao fazer predição: {str(e)}"
         )
-    
+
+    forma = [len(grades[nome]) for nome in pedido.variar]
+    return FastJSONResponse({
+        "variar": pedido.variar,
+        "valores": grades,
+        "precos": precos[1:].reshape(forma).tolist(),
+        "preco_base": float(precos[0]),
+    })
+
+
+# Entrada binária para chamadores em massa: sem objetos Python por linha
+MAX_BINARY_BYTES = int(float(os.environ.get('MAX_BINARY_MB', '256')) * 1024 * 1024)
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Valores aceitos no header X-Dtype da matriz bruta (sempre little-endian)
+DTYPES_BINARIOS = {
+    "float32": "<f4", "float64": "<f8", "int8": "<i1", "int16": "<i2", "int32": "<i4", "int64": "<i8",
+    "uint8": "<u1",
+}
+_pyarrow = None
+
+
+def _importar_pyarrow():
+    """pyarrow é opcional e só é importado na primeira requisição Arrow (a importação leva ~0,2s)."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=415,
+                detail="Entrada Arrow requer o pacote pyarrow; envie a matriz como application/octet-stream"
+            )
+        _pyarrow = pyarrow
+    return _pyarrow
+
+
+def _matriz_bruta(corpo: bytes, esquema: Optional[str], dtype: str):
+    """Matriz (n, n_features) lida diretamente do buffer da requisição (sem cópia)."""
+    if esquema is None:
+        raise HTTPException(status_code=400, detail="Header X-Feature-Schema obrigatório")
+    colunas = [nome.strip() for nome in esquema.split(",")]
+    if colunas != inference.FEATURE_NAMES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"X-Feature-Schema deve listar as features nesta ordem: {','.join(inference.FEATURE_NAMES)}"
+        )
+    if dtype not in DTYPES_BINARIOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"X-Dtype inválido: '{dtype}' (aceitos: {', '.join(DTYPES_BINARIOS)})"
+        )
+    tipo = np.dtype(DTYPES_BINARIOS[dtype])
+    largura = tipo.itemsize * len(colunas)
+    if len(corpo) % largura:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Corpo com {len(corpo)} bytes não é múltiplo do tamanho da linha ({largura} bytes)"
+        )
+    return np.frombuffer(corpo, dtype=tipo).reshape(-1, len(colunas))
+
+
+def _matriz_arrow(corpo: bytes):
+    """Matriz (n, n_features) a partir de um stream Arrow IPC com uma coluna por feature."""
+    pa = _importar_pyarrow()
     try:
-        input_data = {
-            'area': house.area,
-            'bedrooms': house.bedrooms,
-            'bathrooms': house.bathrooms,
-            'stories': house.stories,
-            'mainroad': house.mainroad,
-            'guestroom': house.guestroom,
-            'basement': house.basement,
-            'hotwaterheating': house.hotwaterheating,
-            'airconditioning': house.airconditioning,
-            'parking': house.parking,
-            'prefarea': house.prefarea,
-            'furnishingstatus_semi-mobiliado': 1 if house.furnishingstatus == 'semi-mobiliado' else 0,
-            'furnishingstatus_vazio': 1 if house.furnishingstatus == 'vazio' else 0
-        }
-        
-        df_input = pd.DataFrame([input_data])
-        
-        prediction = model.predict(df_input)[0]
+        tabela = pa.ipc.open_stream(corpo).read_all()
+    except pa.ArrowException as e:
+        raise HTTPException(status_code=400, detail=f"Stream Arrow inválido: {e}")
+    nomes = tabela.column_names
+    faltando = [nome for nome in inference.FEATURE_NAMES if nome not in nomes]
+    extras = [nome for nome in nomes if nome not in inference.FEATURE_NAMES]
+    if faltando or extras or len(set(nomes)) != len(nomes):
+        raise HTTPException(
+            status_code=422,
+            detail=f"O esquema Arrow deve ter exatamente as colunas {','.join(inference.FEATURE_NAMES)} "
+                   f"(ausentes: {', '.join(faltando) or '-'}; desconhecidas: {', '.join(extras) or '-'})"
+        )
+    # Uma cópia por coluna (vetorizada) para a matriz por linhas que as árvores percorrem
+    X = np.empty((tabela.num_rows, len(inference.FEATURE_NAMES)), dtype=inference.DTYPE)
+    for j, nome in enumerate(inference.FEATURE_NAMES):
+        coluna = tabela.column(nome)
+        if not (pa.types.is_integer(coluna.type) or pa.types.is_floating(coluna.type)
+                or pa.types.is_boolean(coluna.type)):
+            raise HTTPException(status_code=422, detail=f"Coluna '{nome}' com tipo não numérico ({coluna.type})")
+        if coluna.null_count:
+            raise HTTPException(status_code=422, detail=f"Coluna '{nome}' com {coluna.null_count} valor(es) nulo(s)")
+        X[:, j] = coluna.to_numpy()
+    return X
 
-        confianca_score = 0
-        if 3000 <= house.area <= 8000:
-            confianca_score += 40
-        elif house.area > 1650:
-            confianca_score += 20
-        
-        if house.bathrooms >= 2:
-            confianca_score += 30
-        else:
-            confianca_score += 15
-        
-        if house.airconditioning == 1:
-            confianca_score += 15
-        
-        if house.parking >= 1:
-            confianca_score += 15
-        
-        if confianca_score >= 80:
-            confianca = "Alta"
-        elif confianca_score >= 60:
-            confianca = "Média"
-        else:
-            confianca = "Baixa"
-        
-        response = PredictionResponse(
-            preco_predito=float(prediction),
-            preco_formatado=f"R$ {prediction:,.2f}",
-            features_utilizadas=input_data,
-            confianca=confianca
+
+def _prever_binario(modelo, versao, X):
+    X = np.asarray(X, dtype=inference.DTYPE)
+    if not len(X):
+        return np.empty(0, dtype="<f8")
+    t_inferencia = time.perf_counter()
+    precos = np.asarray(inference.predict(modelo, X), dtype="<f8")
+    # Sombra e drift só para o modelo principal, como em /predict/batch
+    if versao is None:
+        if shadow is not None:
+            shadow.submit(X, precos, time.perf_counter() - t_inferencia)
+        if drift_monitor is not None:
+            drift_monitor.observe(X)
+    if prediction_logger is not None:
+        prediction_logger.submit("/predict/binary", X, precos, inference.confidence(X),
+                                 time.perf_counter() - t_inferencia, versao=versao)
+    return precos
+
+
+@app.post("/predict/binary")
+async def predict_binary(
+    request: Request,
+    x_feature_schema: Optional[str] = Header(None, description="Features da matriz, separadas por vírgula"),
+    x_dtype: str = Header("float32", description="Dtype little-endian da matriz bruta"),
+    mercado: Optional[str] = MERCADO,
+):
+    """
+    Predição em massa com entrada e saída binárias, sem JSON nem validação por linha.
+
+    - `application/octet-stream`: matriz (n, n_features) em ordem de linhas,
+      little-endian, com o dtype em `X-Dtype` (padrão float32) e as features
+      em `X-Feature-Schema`, na ordem de `feature_info['feature_names']`.
+      Retorna os preços como float64 little-endian (`X-Rows` linhas).
+    - `application/vnd.apache.arrow.stream`: stream Arrow IPC com uma coluna
+      por feature (requer pyarrow). Retorna um stream Arrow com a coluna
+      `preco_predito`.
+
+    As features já vêm codificadas (0/1 e as colunas one-hot de mobília). As
+    faixas são validadas coluna a coluna; qualquer valor inválido rejeita o
+    corpo inteiro com 422.
+    """
+    modelo, versao = await _modelo_da_requisicao(mercado)
+
+    partes = []
+    recebidos = 0
+    async for parte in request.stream():
+        recebidos += len(parte)
+        if recebidos > MAX_BINARY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Corpo excede {MAX_BINARY_BYTES} bytes")
+        partes.append(parte)
+    corpo = b"".join(partes)
+
+    tipo_conteudo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if tipo_conteudo == ARROW_MEDIA_TYPE:
+        X = _matriz_arrow(corpo)
+    elif tipo_conteudo == "application/octet-stream":
+        X = _matriz_bruta(corpo, x_feature_schema, x_dtype)
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type deve ser application/octet-stream ou {ARROW_MEDIA_TYPE}"
         )
-        
-        return response
-        
+
+    erros = inference.validate_matrix(X)
+    if erros:
+        raise HTTPException(status_code=422, detail=erros)
+
+    try:
+        precos = await asyncio.to_thread(_prever_binario, modelo, versao, X)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erro ao fazer predição: {str(e)}"
         )
 
+    if tipo_conteudo == ARROW_MEDIA_TYPE:
+        pa = _pyarrow
+        tabela = pa.table({"preco_predito": precos})
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return Response(saida.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+    return Response(precos.tobytes(), media_type="application/octet-stream",
+                    headers={"X-Dtype": "float64", "X-Rows": str(len(precos))})
+
+
+class Comparable(BaseModel):
+    indice: int = Field(..., description="Linha do imóvel no houses.csv (base 0)")
+    distancia: float = Field(..., description="Distância euclidiana no espaço padronizado")
+    preco: float = Field(..., description="Preço do imóvel")
+    features: dict = Field(..., description="Features codificadas do imóvel")
+
+class ComparablesResponse(BaseModel):
+    comparaveis: list[Comparable] = Field(..., description="Imóveis mais próximos, do mais similar ao menos similar")
+
+class BatchComparablesResponse(BaseModel):
+    resultados: list[list[Comparable]] = Field(..., description="Comparáveis de cada casa, na ordem da entrada")
+
+MAX_COMPARABLES = 50
+
+
+def _buscar_comparaveis(houses: list, k: int):
+    """Consulta o índice KD-tree e monta as listas de comparáveis de cada casa."""
+    if comparables_index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Índice de comparáveis não carregado. Execute model_training.py primeiro."
+        )
+    scaler = comparables_index['scaler']
+    X = inference.to_matrix([inference.encode_house(house) for house in houses]).astype(np.float64)
+    # Mesma transformação do StandardScaler, sem a validação de entrada do scikit-learn
+    Z = (X - scaler.mean_) / scaler.scale_
+    k = min(k, len(comparables_index['precos']))
+    distancias, indices = comparables_index['tree'].query(Z, k=k)
+
+    nomes = comparables_index['feature_names']
+    features = comparables_index['features']
+    precos = comparables_index['precos']
+    return [
+        [
+            {
+                "indice": indice,
+                "distancia": distancia,
+                "preco": float(precos[indice]),
+                "features": dict(zip(nomes, features[indice].tolist())),
+            }
+            for indice, distancia in zip(linha_indices.tolist(), linha_distancias.tolist())
+        ]
+        for linha_indices, linha_distancias in zip(indices, distancias)
+    ]
+
+
+# Micro-lotes de /predict/stream e limite de tamanho de uma linha NDJSON
+STREAM_BATCH_SIZE = 256
+MAX_STREAM_LINE_BYTES = 64 * 1024
+
+
+def _avaliar_micro_lote(itens: list, metodo_confianca: str):
+    """Avalia um micro-lote de /predict/stream e devolve as linhas NDJSON de saída."""
+    validos = [(numero, house) for numero, house, _ in itens if house is not None]
+    resultados = {}
+    if validos:
+        t_inicio = time.perf_counter()
+        X = inference.to_matrix([inference.encode_house(house) for _, house in validos])
+        predicoes = inference.predict_distribution(model, X)
+        if drift_monitor is not None:
+            drift_monitor.observe(X)
+        confiancas = inference.confidence(X, predicoes if metodo_confianca == "arvores" else None)
+        if prediction_logger is not None:
+            prediction_logger.submit("/predict/stream", X, predicoes.preco, confiancas,
+                                     time.perf_counter() - t_inicio)
+        for (numero, _), preco, confianca, intervalo in zip(
+                validos, predicoes.preco.tolist(), confiancas.tolist(), _intervalos(predicoes)):
+            resultados[numero] = {"linha": numero, "preco_predito": preco,
+                                  "confianca": confianca, "intervalo": intervalo}
+    linhas = [
+        resultados[numero] if house is not None else {"linha": numero, "erro": erro}
+        for numero, house, erro in itens
+    ]
+    return b"".join(_json_bytes(linha) + b"\n" for linha in linhas)
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse para geradores que consomem o próprio corpo da requisição.
+
+    O StreamingResponse padrão lê `receive()` em paralelo para detectar
+    desconexão, o que competiria com o gerador pelas mensagens do corpo.
+    Aqui a desconexão aparece como erro ao enviar ou ao ler o corpo.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _validar_linha_stream(numero: int, linha: bytes):
+    """(numero, HouseFeatures ou None, erro ou None) de uma linha NDJSON."""
+    try:
+        return numero, HouseFeatures.model_validate_json(linha), None
+    except ValidationError as e:
+        return numero, None, e.errors(include_url=False, include_context=False, include_input=False)
+
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    tamanho_lote: int = Query(STREAM_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE, description="Linhas por micro-lote"),
+    metodo_confianca: str = METODO_CONFIANCA,
+):
+    """
+    Predição em fluxo: recebe NDJSON (um objeto de `/predict` por linha) e devolve NDJSON.
+
+    O corpo é consumido aos poucos e avaliado em micro-lotes de tamanho fixo;
+    cada lote é enviado assim que fica pronto. Como o próximo trecho do corpo
+    só é lido depois que o lote anterior foi entregue ao cliente, a memória
+    usada fica limitada a um micro-lote, qualquer que seja o tamanho do fluxo.
+
+    Cada linha de saída traz `linha` (posição na entrada, base 0) e o
+    resultado da predição ou o `erro` de validação daquela linha.
+    """
+    if model is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Modelo não carregado. Execute model_training.py primeiro."
+        )
+
+    async def gerar():
+        pendentes = []
+        resto = b""
+        numero = 0
+        async for bloco in request.stream():
+            *linhas, resto = (resto + bloco).split(b"\n")
+            if len(resto) > MAX_STREAM_LINE_BYTES:
+                yield _json_bytes({"linha": numero, "erro": "Linha excede o tamanho máximo"}) + b"\n"
+                return
+            for linha in linhas:
+                if not linha.strip():
+                    continue
+                pendentes.append(_validar_linha_stream(numero, linha))
+                numero += 1
+                if len(pendentes) >= tamanho_lote:
+                    yield await asyncio.to_thread(_avaliar_micro_lote, pendentes, metodo_confianca)
+                    pendentes = []
+        if resto.strip():
+            pendentes.append(_validar_linha_stream(numero, resto))
+        if pendentes:
+            yield await asyncio.to_thread(_avaliar_micro_lote, pendentes, metodo_confianca)
+
+    return RequestStreamingResponse(gerar(), media_type="application/x-ndjson")
+
+
+@app.post("/comparables", response_model=ComparablesResponse)
+async def comparables(house: HouseFeatures, k: int = Query(5, ge=1, le=MAX_COMPARABLES)):
+    """
+    Retorna os `k` imóveis do dataset de treinamento mais parecidos com a casa informada.
+
+    A similaridade é a distância euclidiana entre as features padronizadas
+    (StandardScaler), consultada em um índice KD-tree construído no treinamento.
+    """
+    return FastJSONResponse({"comparaveis": _buscar_comparaveis([house], k)[0]})
+
+
+@app.post("/comparables/batch", response_model=BatchComparablesResponse)
+async def comparables_batch(houses: list[HouseFeatures], k: int = Query(5, ge=1, le=MAX_COMPARABLES)):
+    """Comparáveis de um lote de casas (até 10000) em uma única consulta ao índice."""
+    if len(houses) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(houses)} casas excede o máximo de {MAX_BATCH_SIZE}"
+        )
+    if not houses:
+        return FastJSONResponse({"resultados": []})
+    # Consulta ao KD-tree do lote inteiro fora do event loop, como em /predict/binary
+    return FastJSONResponse({"resultados": await asyncio.to_thread(_buscar_comparaveis, houses, k)})
+
+
+def _job_ou_404(job_id: str):
+    if job_manager is None:
+        raise HTTPException(status_code=503, detail="Jobs indisponíveis: modelo não carregado")
+    estado = job_manager.store.ler(job_id) if job_id.isalnum() else None
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return estado
+
+
+def _resumo_job(estado: dict):
+    progresso = estado['bytes_processados'] / estado['bytes_total'] if estado['bytes_total'] else 0.0
+    return {
+        "id": estado['id'],
+        "status": estado['status'],
+        "progresso": 1.0 if estado['status'] == 'concluido' else round(progresso, 4),
+        "linhas_processadas": estado['linhas_processadas'],
+        "linhas_com_erro": estado['linhas_com_erro'],
+        "erro": estado['erro'],
+        "criado_em": estado['criado_em'],
+        "atualizado_em": estado['atualizado_em'],
+        "resultado": f"/jobs/{estado['id']}/result",
+    }
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    formato: Optional[str] = Query(None, pattern="^(csv|jsonl)$",
+                                   description="Padrão: deduzido do Content-Type (text/csv ou application/x-ndjson)"),
+):
+    """
+    Cria um job de predição em massa a partir de um arquivo CSV ou JSONL no esquema do houses.csv.
+
+    O arquivo é enviado como corpo bruto da requisição. A resposta traz o id
+    do job; o progresso é consultado em `GET /jobs/{id}` e o resultado
+    baixado em `GET /jobs/{id}/result` quando o status for `concluido`.
+    """
+    if job_manager is None:
+        raise HTTPException(status_code=503, detail="Jobs indisponíveis: modelo não carregado")
+    if formato is None:
+        content_type = request.headers.get('content-type', '')
+        formato = 'jsonl' if 'json' in content_type else 'csv'
+
+    estado = await asyncio.to_thread(job_manager.criar, formato)
+    try:
+        # Gravação em disco fora do event loop, em blocos de até JOBS_UPLOAD_BUFFER_BYTES
+        destino = await asyncio.to_thread(open, job_manager.store.entrada(estado), 'wb')
+        try:
+            pendente = bytearray()
+            async for bloco in request.stream():
+                pendente += bloco
+                if len(pendente) >= JOBS_UPLOAD_BUFFER_BYTES:
+                    await asyncio.to_thread(destino.write, bytes(pendente))
+                    pendente.clear()
+            if pendente:
+                await asyncio.to_thread(destino.write, bytes(pendente))
+        finally:
+            await asyncio.to_thread(destino.close)
+        await asyncio.to_thread(job_manager.enfileirar, estado)
+    except BaseException as e:
+        # Cliente desconectado (ClientDisconnect), requisição cancelada ou erro de
+        # disco: o job não fica 'recebendo' para sempre com uma entrada parcial
+        motivo = "Envio interrompido pelo cliente" if isinstance(e, (ClientDisconnect, asyncio.CancelledError)) \
+            else f"Erro ao receber o arquivo: {e}"
+        job_manager.falhar_recebimento(estado, motivo)
+        raise
+    return _resumo_job(estado)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status e progresso de um job de predição em massa"""
+    return _resumo_job(_job_ou_404(job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """CSV com linha, preço, intervalo, confiança e erro de cada linha de entrada"""
+    estado = _job_ou_404(job_id)
+    if estado['status'] != 'concluido':
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status: {estado['status']})")
+    return FileResponse(job_manager.store.resultado(job_id), media_type="text/csv",
+                        filename=f"resultado_{job_id}.csv")
+
 
 @app.get("/")
 async def root():
@@ -177,8 +1261,17 @@ async def root():
         "mensagem": "API de Previsão de Preços de Casas",
         "versao": "1.0.0",
         "endpoints": {
-            "/predict": "POST - Fazer predição de preço",
+            "/predict": "POST - Fazer predição de preço (GET com as features na query string: cacheável)",
+            "/predict/batch": "POST - Predição vetorizada de um lote de casas",
+            "/predict/stream": "POST - Predição em fluxo NDJSON",
+            "/predict/sweep": "POST - Curva de preço variando uma ou duas features",
+            "/predict/binary": "POST - Predição em massa com matriz binária ou Arrow IPC",
+            "/comparables": "POST - Imóveis mais parecidos do dataset de treinamento",
+            "/drift": "GET - Drift das features recebidas em relação ao treino",
+            "/models": "GET - Modelos de mercado em memória e estatísticas do cache",
+            "/jobs": "POST - Job assíncrono de predição em massa (CSV/JSONL)",
             "/health": "GET - Verificar status da API",
+            "/metrics": "GET - Métricas no formato Prometheus",
             "/docs": "GET - Documentação interativa Swagger",
             "/redoc": "GET - Documentação alternativa ReDoc"
         },
@@ -195,10 +1288,168 @@ async def health_check():
     return {
         "status": "healthy",
         "modelo": "carregado",
-        "versao": "1.0.0"
+        "versao": "1.0.0",
+        "versao_modelo": model_version,
+        "motor": model_engine,
+        "inicializacao_segundos": startup_phases
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas de requisições, erros, latência por etapa, modelo, memória e drift (formato Prometheus)"""
+    if drift_monitor is not None:
+        for nome, pontuacao in drift_monitor.scores()["features"].items():
+            DRIFT_PSI.set(pontuacao["psi"], nome)
+            DRIFT_KS.set(pontuacao["ks"], nome)
+    # Só os modelos em memória: os descartados deixam de ser exportados
+    MODEL_CACHE_BYTES.clear()
+    MODEL_CACHE_LOAD.clear()
+    for nome, estatistica in model_cache.stats()["modelos"].items():
+        if estatistica["carregado"]:
+            MODEL_CACHE_BYTES.set(estatistica["bytes"], nome)
+            MODEL_CACHE_LOAD.set(estatistica["segundos_ultima_carga"], nome)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/models")
+async def models_endpoint():
+    """
+    Estado do cache de modelos de mercado: orçamento e memória estimada em uso,
+    modelos carregados (do menos para o mais usado recentemente) e, por modelo,
+    versão, tamanho, acertos, faltas, taxa de acerto, cargas, descartes e
+    tempo de carga.
+    """
+    return model_cache.stats()
+
+
+@app.get("/drift")
+async def drift_endpoint():
+    """
+    Drift das features recebidas desde a inicialização (ou o último reset)
+    em relação à distribuição do treino.
+
+    Para cada feature: PSI, distância KS entre os histogramas e o nível
+    (`estavel` < 0.1 ≤ `moderado` < 0.25 ≤ `significativo`), com as
+    proporções por bin observadas e de referência.
+    """
+    if drift_monitor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Referência de drift não carregada. Execute model_training.py primeiro."
+        )
+    return FastJSONResponse(drift_monitor.scores())
+
+
+# ====================================================
+# ENDPOINTS ADMINISTRATIVOS
+# ====================================================
+# Desabilitados a menos que ADMIN_TOKEN esteja definido; o token deve ser
+# enviado no header X-Admin-Token.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+_perfilamento_em_andamento = False
+
+
+def _verificar_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Endpoints administrativos desabilitados. Defina a variável ADMIN_TOKEN."
+        )
+    if token is None or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido")
+
+
+@app.get("/admin/profile", include_in_schema=False)
+async def profile(
+    segundos: float = Query(10, gt=0, le=300, description="Duração da coleta"),
+    modo: str = Query("amostragem", pattern="^(amostragem|cprofile)$"),
+    intervalo_ms: float = Query(5, ge=1, le=1000, description="Intervalo entre amostras (modo amostragem)"),
+    taxa: float = Query(1.0, gt=0, le=1, description="Fração das requisições perfiladas (modo cprofile)"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Perfila a API em execução durante `segundos` e devolve o resultado.
+
+    - **amostragem**: pilhas da thread do event loop no formato collapsed (flamegraph.pl, speedscope)
+    - **cprofile**: arquivo `.prof` do cProfile sobre uma fração `taxa` das requisições de /predict
+    """
+    global _perfilamento_em_andamento
+    _verificar_admin(x_admin_token)
+    if _perfilamento_em_andamento:
+        raise HTTPException(status_code=409, detail="Já existe um perfilamento em andamento")
+
+    _perfilamento_em_andamento = True
+    try:
+        if modo == "amostragem":
+            sampler = profiling.StackSampler(threading.get_ident(), intervalo_ms / 1000)
+            sampler.start()
+            try:
+                await asyncio.sleep(segundos)
+            finally:
+                sampler.stop()
+            return PlainTextResponse(sampler.collapsed(), headers={
+                "Content-Disposition": 'attachment; filename="profile.collapsed"',
+                "X-Profile-Samples": str(sampler.amostras),
+            })
+
+        sessao = profiling.CProfileSession(taxa)
+        profiling.sessao_cprofile = sessao
+        try:
+            await asyncio.sleep(segundos)
+        finally:
+            profiling.sessao_cprofile = None
+        return Response(sessao.dump(), media_type="application/octet-stream", headers={
+            "Content-Disposition": 'attachment; filename="profile.prof"',
+            "X-Profile-Requests": str(sessao.requisicoes),
+        })
+    finally:
+        _perfilamento_em_andamento = False
+
+
+@app.get("/admin/memory", include_in_schema=False)
+async def memory_report(
+    n: int = Query(20, ge=1, le=200, description="Linhas de código com mais memória alocada"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    RSS atual, pico de RSS desde a inicialização, memória de cada fase da
+    inicialização e, com MEMORY_TRACEMALLOC=1, as `n` linhas de código com
+    mais memória alocada pelo Python.
+    """
+    _verificar_admin(x_admin_token)
+    maiores = memory.top_allocations(n)
+    return {
+        "rss_bytes": process_rss_bytes(),
+        "pico_rss_bytes": memory.peak_rss_bytes(),
+        "inicializacao": [etapa._asdict() for etapa in memoria.etapas],
+        "tracemalloc": None if maiores is None else {
+            "alocado_bytes": tracemalloc.get_traced_memory()[0],
+            "maiores_alocacoes": [{"local": local, "bytes": tamanho, "blocos": blocos}
+                                  for local, tamanho, blocos in maiores],
+        },
+    }
+
+
+@app.post("/admin/drift/reset", include_in_schema=False)
+async def drift_reset(x_admin_token: Optional[str] = Header(None)):
+    """Zera os histogramas de drift, iniciando uma nova janela de observação."""
+    _verificar_admin(x_admin_token)
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Referência de drift não carregada")
+    drift_monitor.reset()
+    return {"status": "ok"}
+
+
+@app.delete("/admin/models/{nome}", include_in_schema=False)
+async def model_evict(nome: str, x_admin_token: Optional[str] = Header(None)):
+    """Descarta o modelo do cache; a próxima requisição recarrega o alias (útil após um promote)."""
+    _verificar_admin(x_admin_token)
+    if not model_cache.evict(nome):
+        raise HTTPException(status_code=404, detail=f"Modelo '{nome}' não está carregado")
+    return {"status": "ok"}
+
+
 if __name__ == "__main__":
     import uvicorn
     import sys
@@ -217,6 +1468,7 @@ if __name__ == "__main__":
     print(f"\n📍 Endpoints disponíveis:")
     print(f"  • http://localhost:{port}/")
     print(f"  • http://localhost:{port}/predict (POST)")
+    print(f"  • http://localhost:{port}/metrics (Métricas Prometheus)")
     print(f"  • http://localhost:{port}/docs (Documentação Swagger)")
     print(f"  • http://localhost:{port}/redoc (Documentação ReDoc)")
     print("\n" + "=" * 70)
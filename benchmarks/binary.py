@@ -0,0 +1,127 @@
+"""
+Benchmark da entrada binária de /predict/binary contra o JSON de /predict/batch.
+
+Compara, para o mesmo lote de casas do houses.csv:
+  • json   - /predict/batch (parsing do JSON + HouseFeatures por linha)
+  • bruta  - /predict/binary com a matriz float32 little-endian
+  • arrow  - /predict/binary com um stream Arrow IPC (se pyarrow estiver instalado)
+
+Mede bytes enviados e CPU por linha da requisição completa pelo app ASGI em
+processo (TestClient, sem rede) e confere que os preços são os mesmos.
+
+Uso:
+    python benchmarks/binary.py [--linhas 10000] [--n 5]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+warnings.filterwarnings('ignore')
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+import inference  # noqa: E402
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+except ImportError:
+    pa = None
+
+MOBILIA = {'furnished': 'mobiliado', 'semi-furnished': 'semi-mobiliado', 'unfurnished': 'vazio'}
+
+
+def _casas(n):
+    """`n` casas do houses.csv (repetidas se necessário) no formato JSON de /predict."""
+    with open('houses.csv', newline='', encoding='utf-8') as f:
+        linhas = list(csv.DictReader(f))
+    casas = []
+    for i in range(n):
+        linha = linhas[i % len(linhas)]
+        casa = {}
+        for nome in inference.RAW_COLUMNS:
+            valor = linha[nome]
+            if nome == 'furnishingstatus':
+                casa[nome] = MOBILIA[valor]
+            elif valor in ('yes', 'no'):
+                casa[nome] = int(valor == 'yes')
+            else:
+                casa[nome] = int(valor)
+        casas.append(casa)
+    return casas
+
+
+def _cpu(funcao, n):
+    funcao()
+    inicio = time.process_time()
+    for _ in range(n):
+        funcao()
+    return (time.process_time() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=10000, help='casas por requisição (máx. 10000 no JSON)')
+    parser.add_argument('--n', type=int, default=5, help='repetições por cenário')
+    args = parser.parse_args()
+
+    casas = _casas(args.linhas)
+    X, erros = inference.encode_raw({nome: [casa[nome] for casa in casas] for nome in inference.RAW_COLUMNS})
+    assert not any(erros)
+    corpo_bruto = np.ascontiguousarray(X, dtype='<f4').tobytes()
+    cabecalhos_brutos = {"Content-Type": "application/octet-stream",
+                         "X-Feature-Schema": ",".join(inference.FEATURE_NAMES), "X-Dtype": "float32"}
+
+    cliente = TestClient(api.app)
+    cenarios = [
+        ("json", lambda: cliente.post("/predict/batch", json=casas),
+         lambda r: np.array([p["preco_predito"] for p in r.json()["predicoes"]]), None),
+        ("bruta", lambda: cliente.post("/predict/binary", content=corpo_bruto, headers=cabecalhos_brutos),
+         lambda r: np.frombuffer(r.content, dtype='<f8'), len(corpo_bruto)),
+    ]
+    if pa is not None:
+        tabela = pa.table({nome: X[:, j].astype(np.int32) for j, nome in enumerate(inference.FEATURE_NAMES)})
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        corpo_arrow = saida.getvalue().to_pybytes()
+        cenarios.append((
+            "arrow",
+            lambda: cliente.post("/predict/binary", content=corpo_arrow,
+                                 headers={"Content-Type": api.ARROW_MEDIA_TYPE}),
+            lambda r: pa.ipc.open_stream(r.content).read_all().column("preco_predito").to_numpy(),
+            len(corpo_arrow),
+        ))
+
+    print("=" * 70)
+    print(f"ENTRADA BINÁRIA vs JSON ({args.linhas} linhas, n={args.n}, "
+          f"pyarrow={'sim' if pa is not None else 'não'})")
+    print("=" * 70)
+    print(f"{'Cenário':<8} {'Bytes enviados':>15} {'CPU total (ms)':>15} {'CPU/linha (µs)':>15}")
+    print("-" * 56)
+    referencia = None
+    for nome, enviar, precos, tamanho in cenarios:
+        resposta = enviar()
+        resposta.raise_for_status()
+        obtidos = precos(resposta)
+        if referencia is None:
+            referencia = obtidos
+        elif not np.allclose(obtidos, referencia, rtol=0, atol=1e-6):
+            print(f"✗ {nome}: preços diferentes de /predict/batch")
+        if tamanho is None:
+            tamanho = len(resposta.request.content)
+        cpu = _cpu(enviar, args.n)
+        print(f"{nome:<8} {tamanho:>15} {cpu * 1e3:>15.1f} {cpu / args.linhas * 1e6:>15.2f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Comparação de precisão e latência entre os motores de modelo (engines.py).
+
+Treina cada motor na mesma divisão treino/teste de model_training.py
+(80/20, random_state=42) e mede:
+  • precisão     - R², RMSE e MAE no conjunto de teste
+  • treino       - tempo de fit
+  • artefato     - tamanho do joblib.dump e tempo de joblib.load em um processo novo
+                   (inclui a importação dos módulos do scikit-learn usados pelo modelo)
+  • latência     - predição de uma linha (mediana) e custo por linha em lote,
+                   pelo mesmo caminho da API (inference.predict)
+
+Uso:
+    python benchmarks/engines.py [--motores random_forest linear] [--lote 10000] [--n 300]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+warnings.filterwarnings('ignore')
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score  # noqa: E402
+from sklearn.model_selection import train_test_split  # noqa: E402
+
+import engines  # noqa: E402
+import inference  # noqa: E402
+
+_CARREGAR = "import sys, time, joblib; t = time.perf_counter(); joblib.load(sys.argv[1]); print(time.perf_counter() - t)"
+
+
+def carregar_dados():
+    """Matriz de features codificada como na API e o preço, a partir de houses.csv."""
+    df = pd.read_csv(os.path.join(RAIZ, 'houses.csv'))
+    X, erros = inference.encode_raw({coluna: df[coluna].to_numpy() for coluna in inference.RAW_COLUMNS})
+    invalidas = [erro for erro in erros if erro]
+    if invalidas:
+        raise ValueError(f"houses.csv com {len(invalidas)} linhas inválidas: {invalidas[:3]}")
+    return pd.DataFrame(X, columns=inference.FEATURE_NAMES), df['price'].to_numpy(dtype=np.float64)
+
+
+def _carregamento_a_frio(caminho):
+    """Tempo de joblib.load em um interpretador novo, sem nada em cache no processo."""
+    saida = subprocess.run([sys.executable, '-c', _CARREGAR, caminho],
+                           capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip())
+
+
+def _latencia_linha(modelo, X, n):
+    tempos = np.empty(n)
+    for i in range(n):
+        linha = X[i % len(X)][None, :]
+        inicio = time.perf_counter()
+        inference.predict(modelo, linha)
+        tempos[i] = time.perf_counter() - inicio
+    return float(np.median(tempos))
+
+
+def _latencia_lote(modelo, X, tamanho):
+    lote = X[np.arange(tamanho) % len(X)]
+    inference.predict(modelo, lote[:64])
+    inicio = time.perf_counter()
+    inference.predict(modelo, lote)
+    return (time.perf_counter() - inicio) / tamanho
+
+
+def avaliar(nome, X_train, X_test, y_train, y_test, args):
+    motor = engines.get(nome)
+    modelo = motor.criar()
+    inicio = time.perf_counter()
+    modelo.fit(X_train, y_train)
+    treino = time.perf_counter() - inicio
+
+    matriz_teste = np.ascontiguousarray(X_test.to_numpy(), dtype=inference.DTYPE)
+    y_pred = inference.predict(modelo, matriz_teste)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'modelo.pkl')
+        joblib.dump(modelo, caminho)
+        tamanho = os.path.getsize(caminho)
+        carga = _carregamento_a_frio(caminho)
+
+    inference.warmup(modelo)
+    return {
+        'motor': nome,
+        'r2': r2_score(y_test, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'treino': treino,
+        'tamanho': tamanho,
+        'carga': carga,
+        'linha': _latencia_linha(modelo, matriz_teste, args.n),
+        'lote': _latencia_lote(modelo, matriz_teste, args.lote),
+        'floresta': inference.is_forest(modelo),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--motores', nargs='*', default=list(engines.ENGINES), help='motores comparados')
+    parser.add_argument('--lote', type=int, default=10000, help='linhas na medição em lote')
+    parser.add_argument('--n', type=int, default=300, help='repetições da predição de uma linha')
+    args = parser.parse_args()
+
+    try:
+        for nome in args.motores:
+            engines.get(nome)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+
+    X, y = carregar_dados()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    print("=" * 70)
+    print(f"COMPARAÇÃO DE MOTORES: {len(X_train):,} imóveis de treino, {len(X_test):,} de teste")
+    print("=" * 70)
+
+    resultados = []
+    for nome in args.motores:
+        print(f"Avaliando '{nome}' ({engines.get(nome).descricao})...")
+        resultados.append(avaliar(nome, X_train, X_test, y_train, y_test, args))
+
+    print(f"\n{'Motor':<24} {'R²':>7} {'RMSE':>12} {'MAE':>12} {'Treino':>8}")
+    print("-" * 70)
+    for r in resultados:
+        print(f"{r['motor']:<24} {r['r2']:>7.4f} {r['rmse']:>12,.0f} {r['mae']:>12,.0f} {r['treino']:>7.2f}s")
+
+    print(f"\n{'Motor':<24} {'Artefato':>10} {'Carga':>9} {'1 linha':>10} {'Lote/linha':>11}")
+    print("-" * 70)
+    for r in resultados:
+        print(f"{r['motor']:<24} {r['tamanho'] / 1024 / 1024:>8.2f}MB {r['carga'] * 1000:>7.1f}ms "
+              f"{r['linha'] * 1000:>8.3f}ms {r['lote'] * 1e6:>9.2f}µs")
+
+    melhor = max(resultados, key=lambda r: r['r2'])
+    rapido = min(resultados, key=lambda r: r['linha'])
+    print(f"\n✓ Maior R²: {melhor['motor']} ({melhor['r2']:.4f})")
+    print(f"✓ Menor latência de uma linha: {rapido['motor']} ({rapido['linha'] * 1000:.3f}ms)")
+    sem_intervalo = [r['motor'] for r in resultados if not r['floresta']]
+    if sem_intervalo:
+        print(f"⚠ Sem intervalo de confiança, explicação e sweep pelos limiares: {', '.join(sem_intervalo)}")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
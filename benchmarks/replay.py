@@ -0,0 +1,257 @@
+"""
+Reprodução de tráfego e gerador de carga a partir do log de predições.
+
+Lê um log no formato de `logs/requests.jsonl` (gerado pela API, inclusive os
+arquivos rotacionados `.jsonl.gz`) ou um JSONL com um corpo de /predict por
+linha e reenvia cada registro para /predict.
+
+Ritmos:
+  • original - respeita os intervalos entre os registros (acelerados por --velocidade)
+  • fixo     - taxa constante de --taxa req/s, em malha aberta: o envio não
+               espera as respostas, como o tráfego real
+  • maximo   - malha fechada: --concorrencia clientes enviando o mais rápido possível
+
+Nos ritmos com agenda (original e fixo), a latência é medida a partir do
+horário agendado, incluindo a espera por uma conexão livre quando o alvo não
+acompanha a taxa; o tempo de serviço (do envio à resposta) é exibido à parte.
+
+O alvo é o app ASGI em processo (padrão, sem rede) ou uma API em execução
+(--url). Diferenças de preço são calculadas em relação ao preço registrado
+no log (versão do modelo que atendeu o tráfego original) e, com --url-b, em
+relação a uma segunda API (ex.: outra versão do modelo).
+
+Uso:
+    python benchmarks/replay.py logs/requests.jsonl --ritmo maximo --concorrencia 16
+    python benchmarks/replay.py logs/requests.jsonl --ritmo fixo --taxa 200 --url http://localhost:8000
+    python benchmarks/replay.py logs/requests.jsonl --url http://localhost:8000 --url-b http://localhost:8001
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import warnings
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+warnings.filterwarnings('ignore')
+
+import numpy as np  # noqa: E402
+
+try:
+    import httpx
+except ImportError:  # httpx também é usado pelo TestClient dos demais benchmarks
+    httpx = None
+
+# Diferenças relativas abaixo disso são tratadas como iguais (arredondamento do JSON)
+TOLERANCIA_RELATIVA = 1e-9
+
+
+def _corpo_predict(registro):
+    """Corpo de /predict a partir de um registro do log (features codificadas) ou de um corpo já pronto."""
+    if 'entrada' not in registro:
+        return registro
+    entrada = dict(registro['entrada'])
+    semi = entrada.pop('furnishingstatus_semi-mobiliado', 0)
+    vazio = entrada.pop('furnishingstatus_vazio', 0)
+    entrada['furnishingstatus'] = 'semi-mobiliado' if semi else 'vazio' if vazio else 'mobiliado'
+    return entrada
+
+
+def carregar_registros(caminho, rotas=None, limite=None):
+    """Lista de `(ts, corpo, preco_registrado)`; `ts` e `preco_registrado` podem ser None."""
+    abrir = gzip.open if caminho.endswith('.gz') else open
+    registros = []
+    with abrir(caminho, 'rt', encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            if rotas and registro.get('rota', '/predict') not in rotas:
+                continue
+            registros.append((registro.get('ts'), _corpo_predict(registro), registro.get('preco_predito')))
+            if limite and len(registros) >= limite:
+                break
+    return registros
+
+
+def agenda(registros, ritmo, taxa=None, velocidade=1.0):
+    """Instante de envio (s desde o início) de cada registro, ou None em malha fechada."""
+    if ritmo == 'maximo':
+        return None
+    if ritmo == 'fixo':
+        return np.arange(len(registros)) / taxa
+    ts = np.array([r[0] if r[0] is not None else np.nan for r in registros], dtype=np.float64)
+    if np.isnan(ts).any():
+        raise ValueError("O ritmo 'original' requer o campo 'ts' em todos os registros")
+    return (ts - ts[0]) / velocidade
+
+
+class Resultado:
+    def __init__(self, n):
+        self.latencias = np.full(n, np.nan)
+        self.servico = np.full(n, np.nan)
+        self.status = Counter()
+        self.precos = np.full(n, np.nan)
+        self.precos_b = np.full(n, np.nan)
+
+
+async def _enviar(cliente, cliente_b, corpo, i, resultado, loop, agendado):
+    inicio = loop.time()
+    try:
+        resposta = await cliente.post('/predict', json=corpo)
+        fim = loop.time()
+        resultado.status[resposta.status_code] += 1
+        if resposta.status_code == 200:
+            resultado.precos[i] = resposta.json()['preco_predito']
+    except httpx.HTTPError as e:
+        fim = loop.time()
+        resultado.status[type(e).__name__] += 1
+    resultado.servico[i] = fim - inicio
+    resultado.latencias[i] = fim - (agendado if agendado is not None else inicio)
+    if cliente_b is not None:
+        try:
+            resposta_b = await cliente_b.post('/predict', json=corpo)
+            if resposta_b.status_code == 200:
+                resultado.precos_b[i] = resposta_b.json()['preco_predito']
+        except httpx.HTTPError:
+            pass
+
+
+async def executar(cliente, registros, instantes, concorrencia, cliente_b=None):
+    loop = asyncio.get_running_loop()
+    resultado = Resultado(len(registros))
+    semaforo = asyncio.Semaphore(concorrencia)
+    inicio = loop.time()
+
+    if instantes is None:
+        proximo = iter(range(len(registros)))
+
+        async def cliente_fechado():
+            for i in proximo:
+                await _enviar(cliente, cliente_b, registros[i][1], i, resultado, loop, None)
+
+        await asyncio.gather(*(cliente_fechado() for _ in range(concorrencia)))
+    else:
+        async def agendado(i, instante):
+            async with semaforo:
+                await _enviar(cliente, cliente_b, registros[i][1], i, resultado, loop, instante)
+
+        tarefas = []
+        for i, deslocamento in enumerate(instantes.tolist()):
+            espera = inicio + deslocamento - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            tarefas.append(asyncio.create_task(agendado(i, inicio + deslocamento)))
+        await asyncio.gather(*tarefas)
+
+    return resultado, loop.time() - inicio
+
+
+def _percentis(valores):
+    valores = valores[~np.isnan(valores)] * 1000
+    if not len(valores):
+        return "—"
+    p50, p90, p99 = np.percentile(valores, [50, 90, 99])
+    return f"p50={p50:.2f} p90={p90:.2f} p99={p99:.2f} max={valores.max():.2f}"
+
+
+def _diferencas(nome, a, b):
+    validos = ~np.isnan(a) & ~np.isnan(b)
+    if not validos.any():
+        return
+    delta = a[validos] - b[validos]
+    relativo = np.abs(delta) / np.maximum(np.abs(b[validos]), 1e-9)
+    diferentes = int((relativo > TOLERANCIA_RELATIVA).sum())
+    marcador = "✓" if diferentes == 0 else "⚠"
+    print(f"{marcador} {nome}: {diferentes:,} de {validos.sum():,} preços diferentes "
+          f"(|Δ| médio R$ {np.abs(delta).mean():,.2f}, Δ relativo máx. {relativo.max():.2%})")
+
+
+def _cliente(url, concorrencia):
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limites, timeout=30)
+    import api
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url='http://asgi',
+                             limits=limites, timeout=30)
+
+
+async def _principal(args, registros, instantes):
+    cliente = _cliente(args.url, args.concorrencia)
+    cliente_b = _cliente(args.url_b, args.concorrencia) if args.url_b else None
+    try:
+        return await executar(cliente, registros, instantes, args.concorrencia, cliente_b)
+    finally:
+        await cliente.aclose()
+        if cliente_b is not None:
+            await cliente_b.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='log de predições (.jsonl ou .jsonl.gz)')
+    parser.add_argument('--url', help='API em execução (padrão: app ASGI em processo)')
+    parser.add_argument('--url-b', help='segunda API para comparar as respostas')
+    parser.add_argument('--ritmo', choices=['original', 'fixo', 'maximo'], default='original')
+    parser.add_argument('--taxa', type=float, default=100, help='req/s no ritmo fixo')
+    parser.add_argument('--velocidade', type=float, default=1.0, help='aceleração do ritmo original')
+    parser.add_argument('--concorrencia', type=int, default=8, help='requisições simultâneas')
+    parser.add_argument('--rotas', nargs='*', default=['/predict'],
+                        help="rotas do log reenviadas (ex.: /predict /predict/batch); '*' para todas")
+    parser.add_argument('--limite', type=int, help='número máximo de registros')
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("✗ Este benchmark requer o pacote httpx (pip install httpx)")
+        return 1
+
+    rotas = None if '*' in args.rotas else set(args.rotas)
+    registros = carregar_registros(args.log, rotas, args.limite)
+    if not registros:
+        print(f"✗ Nenhum registro em '{args.log}'")
+        return 1
+    try:
+        instantes = agenda(registros, args.ritmo, args.taxa, args.velocidade)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+
+    if not args.url:
+        # Importa (e carrega o modelo) antes de iniciar a contagem do tempo; o
+        # tráfego reproduzido não deve ser gravado de novo no log de predições
+        os.environ.setdefault('PREDICTION_LOG_PATH', '')
+        os.chdir(RAIZ)
+        import api  # noqa: F401
+
+    print("=" * 70)
+    print(f"REPRODUÇÃO DE TRÁFEGO: {len(registros):,} requisições, ritmo {args.ritmo}, "
+          f"concorrência {args.concorrencia}")
+    print(f"Alvo: {args.url or 'app ASGI em processo'}" + (f" | comparação: {args.url_b}" if args.url_b else ""))
+    print("=" * 70)
+
+    resultado, duracao = asyncio.run(_principal(args, registros, instantes))
+
+    total = len(registros)
+    sucesso = resultado.status.get(200, 0)
+    print(f"\n✓ Vazão: {total / duracao:,.1f} req/s ({total:,} em {duracao:.2f}s)")
+    print(f"  Latência (ms):        {_percentis(resultado.latencias)}")
+    if instantes is not None:
+        print(f"  Tempo de serviço (ms): {_percentis(resultado.servico)}")
+    erros = total - sucesso
+    marcador = "✓" if erros == 0 else "⚠"
+    print(f"{marcador} Erros: {erros:,} ({erros / total:.2%})"
+          + (f" - {dict((k, v) for k, v in resultado.status.items() if k != 200)}" if erros else ""))
+
+    registrados = np.array([r[2] if r[2] is not None else np.nan for r in registros], dtype=np.float64)
+    _diferencas("Atual vs. registrado no log", resultado.precos, registrados)
+    if args.url_b:
+        _diferencas("A vs. B", resultado.precos, resultado.precos_b)
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
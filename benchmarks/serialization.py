@@ -0,0 +1,113 @@
+"""
+Benchmark da serialização da resposta de /predict.
+
+Compara, em bytes e CPU por requisição:
+  • antes     - PredictionResponse revalidado pelo response_model + jsonable_encoder + json
+  • completo  - dicionário serializado direto (orjson quando instalado)
+  • compacto  - apenas preco_predito e confianca (?compacto=true)
+
+Mede a etapa de serialização isolada e a requisição completa pelo app ASGI
+em processo (TestClient, sem rede).
+
+Uso:
+    python benchmarks/serialization.py [--n 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+warnings.filterwarnings('ignore')
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+import inference  # noqa: E402
+
+EXEMPLO = api.HouseFeatures.model_config['json_schema_extra']['example']
+
+
+def _cpu_por_chamada(funcao, n):
+    funcao()
+    inicio = time.process_time()
+    for _ in range(n):
+        funcao()
+    return (time.process_time() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=2000, help='repetições por cenário')
+    args = parser.parse_args()
+
+    # Rota com o comportamento anterior: retorna o modelo pydantic e deixa o
+    # FastAPI revalidar e serializar pelo response_model
+    @api.app.post("/_bench/predict_antes", response_model=api.PredictionResponse)
+    async def predict_antes(house: api.HouseFeatures):
+        input_data = inference.encode_house(house)
+        predicoes = inference.predict_distribution(api.model, inference.to_matrix([input_data]))
+        preco = predicoes.preco[0]
+        return api.PredictionResponse(
+            preco_predito=float(preco),
+            preco_formatado=f"R$ {preco:,.2f}",
+            features_utilizadas=input_data,
+            confianca=str(inference.confidence(inference.to_matrix([input_data]))[0]),
+            intervalo=api._intervalos(predicoes)[0],
+        )
+
+    house = api.HouseFeatures(**EXEMPLO)
+    input_data = inference.encode_house(house)
+    predicoes = inference.predict_distribution(api.model, inference.to_matrix([input_data]))
+    preco = predicoes.preco[0]
+    intervalo = api._intervalos(predicoes)[0]
+
+    def serializar_antes():
+        resposta = api.PredictionResponse(
+            preco_predito=float(preco), preco_formatado=f"R$ {preco:,.2f}",
+            features_utilizadas=input_data, confianca="Alta", intervalo=intervalo)
+        dados = api.PredictionResponse.model_validate(resposta.model_dump()).model_dump()
+        return JSONResponse(jsonable_encoder(dados)).body
+
+    def serializar_completo():
+        return api.FastJSONResponse({
+            "preco_predito": float(preco), "preco_formatado": f"R$ {preco:,.2f}",
+            "features_utilizadas": input_data, "confianca": "Alta", "intervalo": intervalo}).body
+
+    def serializar_compacto():
+        return api.FastJSONResponse({"preco_predito": float(preco), "confianca": "Alta"}).body
+
+    print("=" * 70)
+    print(f"SERIALIZAÇÃO DE /predict (n={args.n}, orjson={'sim' if api.orjson else 'não'})")
+    print("=" * 70)
+
+    print("\n📦 Etapa de serialização isolada:")
+    print(f"{'Cenário':<12} {'Bytes':>8} {'CPU (µs)':>12}")
+    print("-" * 34)
+    for nome, funcao in [("antes", serializar_antes), ("completo", serializar_completo),
+                         ("compacto", serializar_compacto)]:
+        print(f"{nome:<12} {len(funcao()):>8} {_cpu_por_chamada(funcao, args.n) * 1e6:>12.1f}")
+
+    cliente = TestClient(api.app)
+    cenarios = [
+        ("antes", "/_bench/predict_antes"),
+        ("completo", "/predict"),
+        ("compacto", "/predict?compacto=true"),
+    ]
+    print("\n🌐 Requisição completa (app ASGI em processo):")
+    print(f"{'Cenário':<12} {'Bytes':>8} {'CPU (µs)':>12}")
+    print("-" * 34)
+    for nome, url in cenarios:
+        tamanho = len(cliente.post(url, json=EXEMPLO).content)
+        cpu = _cpu_por_chamada(lambda: cliente.post(url, json=EXEMPLO), args.n)
+        print(f"{nome:<12} {tamanho:>8} {cpu * 1e6:>12.1f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
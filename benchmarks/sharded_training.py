@@ -0,0 +1,96 @@
+"""
+Benchmark do treino em shards (sharded_forest.py) contra o fit em um processo.
+
+Gera um conjunto sintético com as features do modelo (houses.csv sorteado
+com reposição e ruído na área e no preço) e treina a Random Forest do motor
+`random_forest`:
+  • fit       - RandomForestRegressor.fit com n_jobs=1
+  • shards N  - sharded_forest.train com N workers locais
+
+Mede o tempo de parede (preparação dos shards, workers e união) e confere que
+as árvores e as predições são as mesmas do fit. O ganho depende de haver
+núcleos livres: com 1 CPU, mais workers só somam o custo de iniciar processos.
+
+Uso:
+    python benchmarks/sharded_training.py [--linhas 200000] [--arvores 100] [--workers 1 2 4]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+warnings.filterwarnings('ignore')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import engines  # noqa: E402
+import inference  # noqa: E402
+import sharded_forest  # noqa: E402
+
+
+def _dados(n, semente=0):
+    """`(X, y)` com `n` casas sintéticas derivadas do houses.csv."""
+    casas = pd.read_csv('houses.csv')
+    rng = np.random.RandomState(semente)
+    amostra = casas.iloc[rng.randint(0, len(casas), n)].reset_index(drop=True)
+    minimo, maximo = inference.FEATURE_BOUNDS['area']
+    amostra['area'] = np.clip(amostra['area'] * rng.uniform(0.8, 1.2, n), minimo, maximo).round().astype(int)
+    X, erros = inference.encode_raw({nome: amostra[nome].astype(str).tolist() for nome in inference.RAW_COLUMNS})
+    assert not any(erros)
+    y = amostra['price'].to_numpy(dtype=np.float64) * rng.lognormal(0, 0.1, n)
+    return pd.DataFrame(X, columns=inference.FEATURE_NAMES), y
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=200000, help='casas sintéticas no treino')
+    parser.add_argument('--arvores', type=int, default=100, help='árvores da floresta')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='workers por cenário')
+    parser.add_argument('--linhas-por-shard', type=int, default=50000)
+    args = parser.parse_args()
+
+    X, y = _dados(args.linhas)
+    params = dict(engines.get('random_forest').criar().get_params(), n_estimators=args.arvores, n_jobs=1)
+    amostra = X.iloc[:2000]
+
+    print("=" * 70)
+    print(f"TREINO EM SHARDS ({args.linhas} linhas, {args.arvores} árvores, {os.cpu_count()} CPU(s))")
+    print("=" * 70)
+    print(f"{'Cenário':<12} {'Tempo (s)':>10} {'Aceleração':>11}  Resultado")
+    print("-" * 56)
+
+    from sklearn.ensemble import RandomForestRegressor
+    inicio = time.perf_counter()
+    referencia = RandomForestRegressor(**params).fit(X, y)
+    tempo_fit = time.perf_counter() - inicio
+    esperado = referencia.predict(amostra)
+    print(f"{'fit':<12} {tempo_fit:>10.2f} {1.0:>10.2f}x")
+
+    for workers in args.workers:
+        diretorio = tempfile.mkdtemp(prefix='shards-')
+        try:
+            inicio = time.perf_counter()
+            floresta = sharded_forest.train(X, y, params, os.path.join(diretorio, 'treino'), workers,
+                                            linhas_por_shard=args.linhas_por_shard, stdout=subprocess.DEVNULL)
+            tempo = time.perf_counter() - inicio
+        finally:
+            shutil.rmtree(diretorio)
+        identicas = all(np.array_equal(a.tree_.threshold, b.tree_.threshold)
+                        and np.array_equal(a.tree_.value, b.tree_.value)
+                        for a, b in zip(referencia.estimators_, floresta.estimators_))
+        mesmas = identicas and np.array_equal(floresta.predict(amostra), esperado)
+        print(f"{f'shards {workers}':<12} {tempo:>10.2f} {tempo_fit / tempo:>10.2f}x  "
+              f"{'✓ idêntica ao fit' if mesmas else '✗ predições diferentes do fit'}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Monitoramento de drift das features de entrada em relação ao treino.
+
+`model_training.py` salva em `drift_reference.pkl` um histograma de cada
+feature do conjunto de treino: um bin por valor para features discretas
+(binárias, quartos, banheiros...) e bins por decis para `area`. A API
+acumula as mesmas contagens para as requisições recebidas e compara as duas
+distribuições com PSI (Population Stability Index) e com a distância de
+Kolmogorov-Smirnov entre os histogramas.
+
+Os limites de todas as features ficam concatenados em um único vetor, com
+cada feature deslocada por `_ESPACAMENTO`, de modo que classificar uma
+linha inteira custa uma busca binária vetorizada e um `bincount`,
+independente da quantidade de requisições já observadas.
+"""
+import threading
+
+import numpy as np
+
+# PSI abaixo de 0.1: estável; até 0.25: drift moderado; acima: drift significativo
+PSI_THRESHOLDS = (0.1, 0.25)
+
+# Abaixo disso as proporções observadas ainda são ruidosas demais
+MIN_OBSERVATIONS = 100
+
+# Proporção mínima usada no PSI para bins vazios (evita log(0))
+_EPSILON = 1e-4
+
+# Deslocamento entre features no vetor concatenado de limites; maior que
+# qualquer valor aceito pela API (área até 16200)
+_ESPACAMENTO = 1e6
+
+
+def build_reference(X, feature_names, max_discretos=10, n_quantis=10):
+    """
+    Perfil de referência a partir da matriz de treino `X` (n, n_features).
+
+    Features com até `max_discretos` valores distintos ganham um bin por
+    valor (limites nos pontos médios); as demais, bins pelos quantis.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    features = {}
+    for j, nome in enumerate(feature_names):
+        valores = X[:, j]
+        distintos = np.unique(valores)
+        if len(distintos) <= max_discretos:
+            limites = (distintos[:-1] + distintos[1:]) / 2
+        else:
+            limites = np.unique(np.quantile(valores, np.linspace(0, 1, n_quantis + 1)[1:-1]))
+        contagens = np.bincount(np.searchsorted(limites, valores, side='right'), minlength=len(limites) + 1)
+        features[nome] = {'limites': limites.tolist(), 'contagens': contagens.tolist()}
+    return {'feature_names': list(feature_names), 'observacoes': len(X), 'features': features}
+
+
+class DriftMonitor:
+    """Histogramas incrementais das features recebidas pela API."""
+
+    def __init__(self, referencia):
+        self.feature_names = list(referencia['feature_names'])
+        self.observacoes_referencia = referencia['observacoes']
+        limites = [np.asarray(referencia['features'][nome]['limites'], dtype=np.float64)
+                   for nome in self.feature_names]
+        self._limites = np.concatenate([l + j * _ESPACAMENTO for j, l in enumerate(limites)])
+        self._deslocamentos = np.arange(len(limites)) * _ESPACAMENTO
+        # Posição do primeiro bin de cada feature no vetor de contagens
+        tamanhos = [len(l) + 1 for l in limites]
+        self._inicios = np.concatenate(([0], np.cumsum(tamanhos)))
+        self._referencia = [
+            np.asarray(referencia['features'][nome]['contagens'], dtype=np.float64) / referencia['observacoes']
+            for nome in self.feature_names
+        ]
+        self._contagens = np.zeros(self._inicios[-1], dtype=np.int64)
+        self.observacoes = 0
+        self._lock = threading.Lock()
+
+    def observe(self, X):
+        """Acumula as linhas de `X` (já na ordem de `feature_names`)."""
+        chaves = np.clip(np.asarray(X, dtype=np.float64), 0, _ESPACAMENTO / 2) + self._deslocamentos
+        # Posição no vetor concatenado de limites + índice da feature = bin global
+        bins = np.searchsorted(self._limites, chaves, side='right') + np.arange(X.shape[1])
+        contagens = np.bincount(bins.ravel(), minlength=len(self._contagens))
+        with self._lock:
+            self._contagens += contagens
+            self.observacoes += X.shape[0]
+
+    def reset(self):
+        with self._lock:
+            self._contagens[:] = 0
+            self.observacoes = 0
+
+    def scores(self):
+        """PSI e distância KS de cada feature em relação à referência."""
+        with self._lock:
+            contagens = self._contagens.copy()
+            n = self.observacoes
+        features = {}
+        for j, nome in enumerate(self.feature_names):
+            referencia = self._referencia[j]
+            atual = contagens[self._inicios[j]:self._inicios[j + 1]] / max(n, 1)
+            p = np.maximum(atual, _EPSILON)
+            q = np.maximum(referencia, _EPSILON)
+            psi = float(np.sum((p - q) * np.log(p / q))) if n else 0.0
+            ks = float(np.max(np.abs(np.cumsum(atual) - np.cumsum(referencia)))) if n else 0.0
+            estavel, moderado = PSI_THRESHOLDS
+            nivel = "estavel" if psi < estavel else "moderado" if psi < moderado else "significativo"
+            features[nome] = {
+                "psi": psi,
+                "ks": ks,
+                "nivel": nivel,
+                "proporcoes": atual.tolist(),
+                "proporcoes_referencia": referencia.tolist(),
+            }
+        return {
+            "observacoes": n,
+            "observacoes_referencia": self.observacoes_referencia,
+            "amostra_suficiente": n >= MIN_OBSERVATIONS,
+            "features": features,
+        }
@@ -0,0 +1,83 @@
+"""
+Motores de modelo intercambiáveis para o treinamento e a API.
+
+Cada motor sabe criar um estimador do scikit-learn ainda não treinado. O
+treinamento escolhe o motor pela variável `MODEL_ENGINE` e registra o nome
+em `feature_info['engine']`; a API lê esse nome para expor qual motor está
+em produção. A inferência (`inference.py`) não depende do motor: florestas
+são avaliadas árvore a árvore (com intervalo, explicação e sweep pelos
+limiares) e os demais estimadores pelo próprio `predict`.
+
+Os imports do scikit-learn ficam dentro das fábricas para não pesar na
+inicialização da API, que só precisa dos nomes.
+"""
+from collections import namedtuple
+
+Engine = namedtuple('Engine', ['nome', 'descricao', 'criar'])
+
+DEFAULT_ENGINE = 'random_forest'
+
+
+def _random_forest():
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1
+    )
+
+
+def _floresta_rasa():
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(
+        n_estimators=30,
+        max_depth=6,
+        min_samples_leaf=3,
+        random_state=42,
+        n_jobs=-1
+    )
+
+
+def _hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(
+        max_iter=300,
+        learning_rate=0.05,
+        max_leaf_nodes=15,
+        min_samples_leaf=10,
+        random_state=42
+    )
+
+
+def _linear():
+    import numpy as np
+    from sklearn.linear_model import RidgeCV
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(StandardScaler(), RidgeCV(alphas=np.logspace(-3, 3, 13)))
+
+
+ENGINES = {
+    engine.nome: engine for engine in [
+        Engine('random_forest', 'Random Forest (100 árvores, profundidade 10)', _random_forest),
+        Engine('floresta_rasa', 'Random Forest rasa (30 árvores, profundidade 6)', _floresta_rasa),
+        Engine('hist_gradient_boosting', 'Histogram Gradient Boosting', _hist_gradient_boosting),
+        Engine('linear', 'Regressão linear Ridge (baseline)', _linear),
+    ]
+}
+
+
+def get(nome):
+    """Motor registrado com o nome `nome`."""
+    try:
+        return ENGINES[nome]
+    except KeyError:
+        raise ValueError(f"Motor desconhecido '{nome}'. Disponíveis: {', '.join(ENGINES)}") from None
+
+
+def create(nome=DEFAULT_ENGINE):
+    """Estimador não treinado do motor `nome`."""
+    return get(nome).criar()
@@ -0,0 +1,460 @@
+"""
+Codificação de features e inferência do modelo sem pandas.
+
+O caminho de serviço da API monta diretamente um array NumPy na ordem de
+`feature_info['feature_names']` e, para florestas, percorre as árvores em
+sequência em vez de passar pela validação do scikit-learn e pelo pool de
+threads do joblib, que dominam o tempo de uma predição unitária.
+"""
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+# Mesma ordem das colunas usadas no treinamento (model_training.py)
+FEATURE_NAMES = [
+    'area', 'bedrooms', 'bathrooms', 'stories', 'mainroad', 'guestroom',
+    'basement', 'hotwaterheating', 'airconditioning', 'parking', 'prefarea',
+    'furnishingstatus_semi-mobiliado', 'furnishingstatus_vazio',
+]
+
+# Dtype usado internamente pelas árvores do scikit-learn
+DTYPE = np.float32
+
+_AREA, _BATHROOMS, _AIRCONDITIONING, _PARKING = (
+    FEATURE_NAMES.index(nome) for nome in ('area', 'bathrooms', 'airconditioning', 'parking'))
+
+# Quantis das predições das árvores usados como intervalo da predição
+INTERVAL_QUANTILES = (0.1, 0.9)
+
+# Limites do coeficiente de variação entre árvores para o nível de confiança
+# baseado na dispersão da floresta (método "arvores")
+SPREAD_CONFIDENCE_THRESHOLDS = (0.10, 0.20)
+
+# Faixas válidas de cada feature (as mesmas de HouseFeatures em api.py)
+FEATURE_BOUNDS = {
+    'area': (1650, 16200),
+    'bedrooms': (1, 6),
+    'bathrooms': (1, 4),
+    'stories': (1, 4),
+    'mainroad': (0, 1),
+    'guestroom': (0, 1),
+    'basement': (0, 1),
+    'hotwaterheating': (0, 1),
+    'airconditioning': (0, 1),
+    'parking': (0, 3),
+    'prefarea': (0, 1),
+    'furnishingstatus_semi-mobiliado': (0, 1),
+    'furnishingstatus_vazio': (0, 1),
+}
+
+# Colunas no formato bruto do houses.csv (sem price)
+RAW_COLUMNS = [
+    'area', 'bedrooms', 'bathrooms', 'stories', 'mainroad', 'guestroom',
+    'basement', 'hotwaterheating', 'airconditioning', 'parking', 'prefarea',
+    'furnishingstatus',
+]
+_NUMERICAS = ('area', 'bedrooms', 'bathrooms', 'stories', 'parking')
+_BINARIAS = ('mainroad', 'guestroom', 'basement', 'hotwaterheating', 'airconditioning', 'prefarea')
+
+# Aceita tanto o formato do houses.csv (yes/no, inglês) quanto o da API (0/1, português)
+_VALORES_BINARIOS = {'yes': 1, 'no': 0, '1': 1, '0': 0, 'true': 1, 'false': 0}
+_MOBILIA = {
+    'furnished': 'mobiliado', 'semi-furnished': 'semi-mobiliado', 'unfurnished': 'vazio',
+    'mobiliado': 'mobiliado', 'semi-mobiliado': 'semi-mobiliado', 'vazio': 'vazio',
+}
+
+Predictions = namedtuple(
+    'Predictions', ['preco', 'desvio_padrao', 'inferior', 'superior', 'contribuicoes', 'valor_base'],
+    defaults=(None, None))
+
+# Pontos de corte das árvores por feature (ver `split_thresholds`)
+_LIMIARES = weakref.WeakKeyDictionary()
+
+# Features numéricas com até este número de valores percorrem a faixa inteira
+# em `sweep_values`; acima dele, é o número de pontos amostrados quando o
+# modelo não é uma floresta
+MAX_SWEEP_POINTS = 200
+
+MOBILIA_API = ['mobiliado', 'semi-mobiliado', 'vazio']
+
+# Bytes das estruturas auxiliares (contribuições e limiares) já calculadas para
+# cada modelo, somados quando são criadas (ver `auxiliary_bytes`)
+_BYTES_AUXILIARES = weakref.WeakKeyDictionary()
+
+# Contribuições acumuladas por nó de cada árvore (ver `_contribuicoes_por_no`),
+# calculadas na primeira explicação pedida para o modelo (ou no aquecimento,
+# com `warmup(..., explicacao=True)`)
+_CONTRIBUICOES = weakref.WeakKeyDictionary()
+
+
+def encode_house(house):
+    """Dicionário de features codificadas (one-hot de mobília) de um `HouseFeatures`."""
+    return {
+        'area': house.area,
+        'bedrooms': house.bedrooms,
+        'bathrooms': house.bathrooms,
+        'stories': house.stories,
+        'mainroad': house.mainroad,
+        'guestroom': house.guestroom,
+        'basement': house.basement,
+        'hotwaterheating': house.hotwaterheating,
+        'airconditioning': house.airconditioning,
+        'parking': house.parking,
+        'prefarea': house.prefarea,
+        'furnishingstatus_semi-mobiliado': 1 if house.furnishingstatus == 'semi-mobiliado' else 0,
+        'furnishingstatus_vazio': 1 if house.furnishingstatus == 'vazio' else 0,
+    }
+
+
+def to_matrix(encoded_rows):
+    """Matriz (n, n_features) a partir de dicionários produzidos por `encode_house`."""
+    return np.array([[row[nome] for nome in FEATURE_NAMES] for row in encoded_rows], dtype=DTYPE)
+
+
+def _normalizar(coluna):
+    return np.char.lower(np.char.strip(np.asarray(coluna, dtype=str)))
+
+
+def _numerica(coluna):
+    try:
+        return np.asarray(coluna, dtype=np.float64)
+    except ValueError:
+        valores = np.full(len(coluna), np.nan)
+        for i, valor in enumerate(coluna):
+            try:
+                valores[i] = float(valor)
+            except (TypeError, ValueError):
+                pass
+        return valores
+
+
+def encode_raw(colunas):
+    """
+    Codifica colunas no formato bruto (`RAW_COLUMNS`) de forma vetorizada.
+
+    `colunas` mapeia o nome da coluna para uma sequência de valores (strings
+    lidas de CSV ou valores de JSON). Retorna `(X, erros)`: a matriz na ordem
+    de `FEATURE_NAMES` e uma lista com a mensagem de erro de cada linha
+    inválida (None para linhas válidas). Linhas inválidas ficam zeradas em `X`.
+    """
+    faltando = [nome for nome in RAW_COLUMNS if nome not in colunas]
+    if faltando:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+
+    n = len(colunas['area'])
+    X = np.zeros((n, len(FEATURE_NAMES)), dtype=DTYPE)
+    invalidas = {}
+
+    for nome in _NUMERICAS:
+        valores = _numerica(colunas[nome])
+        X[:, FEATURE_NAMES.index(nome)] = np.nan_to_num(valores)
+        minimo, maximo = FEATURE_BOUNDS[nome]
+        invalidas[nome] = ~((valores >= minimo) & (valores <= maximo) & (valores == np.round(valores)))
+
+    for nome in _BINARIAS:
+        valores = _normalizar(colunas[nome])
+        sim = (valores == 'yes') | (valores == '1') | (valores == 'true')
+        nao = (valores == 'no') | (valores == '0') | (valores == 'false')
+        X[:, FEATURE_NAMES.index(nome)] = sim
+        invalidas[nome] = ~(sim | nao)
+
+    mobilia = _normalizar(colunas['furnishingstatus'])
+    semi = (mobilia == 'semi-furnished') | (mobilia == 'semi-mobiliado')
+    vazio = (mobilia == 'unfurnished') | (mobilia == 'vazio')
+    X[:, FEATURE_NAMES.index('furnishingstatus_semi-mobiliado')] = semi
+    X[:, FEATURE_NAMES.index('furnishingstatus_vazio')] = vazio
+    invalidas['furnishingstatus'] = ~(semi | vazio | (mobilia == 'furnished') | (mobilia == 'mobiliado'))
+
+    erros = [None] * n
+    alguma_invalida = np.zeros(n, dtype=bool)
+    for mascara in invalidas.values():
+        alguma_invalida |= mascara
+    for i in np.flatnonzero(alguma_invalida).tolist():
+        colunas_invalidas = [nome for nome, mascara in invalidas.items() if mascara[i]]
+        erros[i] = f"Valores inválidos em: {', '.join(colunas_invalidas)}"
+        X[i] = 0
+    return X, erros
+
+
+_MINIMOS = np.array([FEATURE_BOUNDS[nome][0] for nome in FEATURE_NAMES], dtype=np.float64)
+_MAXIMOS = np.array([FEATURE_BOUNDS[nome][1] for nome in FEATURE_NAMES], dtype=np.float64)
+
+
+def validate_matrix(X):
+    """
+    Valida coluna a coluna uma matriz já codificada (na ordem de `FEATURE_NAMES`):
+    valores inteiros dentro de `FEATURE_BOUNDS` e no máximo uma coluna de
+    mobília por linha. Retorna a lista de erros (vazia se a matriz é válida).
+    """
+    erros = []
+    for j, nome in enumerate(FEATURE_NAMES):
+        coluna = X[:, j]
+        # NaN falha em todas as comparações e é contado como inválido
+        invalidas = ~((coluna >= _MINIMOS[j]) & (coluna <= _MAXIMOS[j]) & (coluna == np.round(coluna)))
+        quantidade = int(np.count_nonzero(invalidas))
+        if quantidade:
+            erros.append(f"{nome}: {quantidade} valor(es) não inteiro(s) ou fora de "
+                         f"[{FEATURE_BOUNDS[nome][0]}, {FEATURE_BOUNDS[nome][1]}] "
+                         f"(primeira linha {int(np.argmax(invalidas))})")
+    ambas = (X[:, FEATURE_NAMES.index('furnishingstatus_semi-mobiliado')] == 1) & \
+        (X[:, FEATURE_NAMES.index('furnishingstatus_vazio')] == 1)
+    if ambas.any():
+        erros.append(f"furnishingstatus: {int(np.count_nonzero(ambas))} linha(s) com semi-mobiliado "
+                     f"e vazio ao mesmo tempo (primeira linha {int(np.argmax(ambas))})")
+    return erros
+
+
+def is_forest(model):
+    """True para florestas de árvores de regressão (ex.: RandomForestRegressor), avaliadas árvore a árvore."""
+    estimators = getattr(model, 'estimators_', None)
+    return isinstance(estimators, list) and bool(estimators) and hasattr(estimators[0], 'tree_')
+
+
+def predict(model, X):
+    """
+    Predições do modelo para a matriz `X` (já na ordem de `FEATURE_NAMES`).
+
+    Para florestas, soma as predições das árvores na mesma ordem que
+    `RandomForestRegressor.predict`, produzindo o mesmo resultado.
+    """
+    if not is_forest(model):
+        return model.predict(X)
+
+    estimators = model.estimators_
+    X = np.ascontiguousarray(X, dtype=DTYPE)
+    soma = np.zeros(X.shape[0], dtype=np.float64)
+    for estimator in estimators:
+        soma += estimator.predict(X, check_input=False)
+    soma /= len(estimators)
+    return soma
+
+
+def tree_predictions(model, X):
+    """Matriz (n_arvores, n) com a predição de cada árvore, ou None se o modelo não for uma floresta."""
+    if not is_forest(model):
+        return None
+    estimators = model.estimators_
+    X = np.ascontiguousarray(X, dtype=DTYPE)
+    saida = np.empty((len(estimators), X.shape[0]), dtype=np.float64)
+    for i, estimator in enumerate(estimators):
+        saida[i] = estimator.predict(X, check_input=False)
+    return saida
+
+
+def _contribuicoes_por_no(model):
+    """
+    Para cada árvore, matriz densa (n_nos, n_features) com a contribuição
+    acumulada de cada feature no caminho da raiz até o nó: a cada divisão, a
+    variação do valor predito entre o nó pai e o filho é atribuída à feature
+    que dividiu o pai (decomposição de Saabas).
+
+    Para uma folha, a linha somada ao valor da raiz é a predição da árvore;
+    assim, explicar uma amostra custa só a busca da folha, como a predição.
+    """
+    acumuladas = _CONTRIBUICOES.get(model)
+    if acumuladas is None:
+        acumuladas = []
+        for estimator in model.estimators_:
+            arvore = estimator.tree_
+            valores = arvore.value[:, 0, 0]
+            acumulada = np.zeros((arvore.node_count, arvore.n_features), dtype=np.float64)
+            nivel = np.array([0])
+            # Desce a árvore nível a nível, propagando a contribuição do pai aos filhos
+            while nivel.size:
+                internos = nivel[arvore.children_left[nivel] >= 0]
+                for filhos in (arvore.children_left[internos], arvore.children_right[internos]):
+                    acumulada[filhos] = acumulada[internos]
+                    acumulada[filhos, arvore.feature[internos]] += valores[filhos] - valores[internos]
+                nivel = np.concatenate((arvore.children_left[internos], arvore.children_right[internos]))
+            acumuladas.append(acumulada)
+        _CONTRIBUICOES[model] = acumuladas
+        _BYTES_AUXILIARES[model] = _BYTES_AUXILIARES.get(model, 0) + sum(m.nbytes for m in acumuladas)
+    return acumuladas
+
+
+def _distribuicao_explicada(model, X):
+    """Predições por árvore e contribuições médias por feature, na mesma passada pela floresta."""
+    X = np.ascontiguousarray(X, dtype=DTYPE)
+    estimators = model.estimators_
+    por_arvore = np.empty((len(estimators), X.shape[0]), dtype=np.float64)
+    contribuicoes = np.zeros((X.shape[0], X.shape[1]), dtype=np.float64)
+    valor_base = 0.0
+    for i, (estimator, acumulada) in enumerate(zip(estimators, _contribuicoes_por_no(model))):
+        folhas = estimator.apply(X, check_input=False)
+        valores = estimator.tree_.value[:, 0, 0]
+        # Mesmo valor que estimator.predict devolve para a folha
+        por_arvore[i] = valores[folhas]
+        contribuicoes += acumulada[folhas]
+        valor_base += valores[0]
+    contribuicoes /= len(estimators)
+    return por_arvore, contribuicoes, float(valor_base / len(estimators))
+
+
+def predict_distribution(model, X, explicar=False):
+    """
+    Predição média e dispersão entre as árvores, calculadas em uma única passada pela floresta.
+
+    Com `explicar=True`, a mesma passada pela floresta também
+    devolve `contribuicoes` (n, n_features), a contribuição aditiva de cada
+    feature, e `valor_base`, a média dos valores das raízes: para cada linha,
+    `valor_base + contribuicoes.sum(axis=1)` é o preço predito.
+
+    Para modelos que não são florestas, `desvio_padrao`, `inferior`,
+    `superior` e as contribuições são None.
+    """
+    contribuicoes = valor_base = None
+    if explicar and is_forest(model):
+        por_arvore, contribuicoes, valor_base = _distribuicao_explicada(model, X)
+    else:
+        por_arvore = tree_predictions(model, X)
+    if por_arvore is None:
+        return Predictions(np.asarray(model.predict(X), dtype=np.float64), None, None, None)
+    # Acumula árvore a árvore, na mesma ordem do RandomForestRegressor
+    # (np.sum usaria soma pareada e poderia diferir no último bit)
+    preco = np.zeros(por_arvore.shape[1], dtype=np.float64)
+    for linha in por_arvore:
+        preco += linha
+    preco /= por_arvore.shape[0]
+    inferior, superior = np.quantile(por_arvore, INTERVAL_QUANTILES, axis=0)
+    return Predictions(preco, por_arvore.std(axis=0), inferior, superior, contribuicoes, valor_base)
+
+
+def group_contributions(contribuicoes):
+    """
+    Lista (uma por linha) de dicionários com a contribuição de cada coluna de
+    entrada (`RAW_COLUMNS`); as colunas one-hot de mobília são somadas em
+    `furnishingstatus`.
+    """
+    agrupadas = np.zeros((contribuicoes.shape[0], len(RAW_COLUMNS)), dtype=np.float64)
+    for j, nome in enumerate(FEATURE_NAMES):
+        coluna = 'furnishingstatus' if nome.startswith('furnishingstatus_') else nome
+        agrupadas[:, RAW_COLUMNS.index(coluna)] += contribuicoes[:, j]
+    return [dict(zip(RAW_COLUMNS, linha)) for linha in agrupadas.tolist()]
+
+
+def confidence(X, predictions=None):
+    """
+    Nível de confiança ("Alta", "Média", "Baixa") de cada linha de `X`.
+
+    Sem `predictions`, usa a heurística baseada em área, banheiros,
+    ar-condicionado e garagem. Com `predictions` vindas de uma floresta, usa o
+    coeficiente de variação das predições das árvores.
+    """
+    if predictions is not None and predictions.desvio_padrao is not None:
+        variacao = predictions.desvio_padrao / np.maximum(np.abs(predictions.preco), 1e-9)
+        alta, media = SPREAD_CONFIDENCE_THRESHOLDS
+        return np.where(variacao <= alta, "Alta", np.where(variacao <= media, "Média", "Baixa"))
+
+    area = X[:, _AREA]
+    score = np.where((area >= 3000) & (area <= 8000), 40, np.where(area > 1650, 20, 0))
+    score += np.where(X[:, _BATHROOMS] >= 2, 30, 15)
+    score += np.where(X[:, _AIRCONDITIONING] == 1, 15, 0)
+    score += np.where(X[:, _PARKING] >= 1, 15, 0)
+    return np.where(score >= 80, "Alta", np.where(score >= 60, "Média", "Baixa"))
+
+
+def split_thresholds(model, nome):
+    """Limiares distintos (ordenados) usados pelas árvores da floresta para dividir a feature `nome`."""
+    por_feature = _LIMIARES.get(model)
+    if por_feature is None:
+        por_feature = {}
+        arvores = [estimator.tree_ for estimator in model.estimators_]
+        for j, feature in enumerate(FEATURE_NAMES):
+            por_feature[feature] = np.unique(np.concatenate(
+                [arvore.threshold[arvore.feature == j] for arvore in arvores]))
+        _LIMIARES[model] = por_feature
+        _BYTES_AUXILIARES[model] = _BYTES_AUXILIARES.get(model, 0) + sum(
+            limiares.nbytes for limiares in por_feature.values())
+    return por_feature[nome]
+
+
+def sweep_values(model, nome):
+    """
+    Valores de entrada (formato da API) a avaliar ao variar a coluna `nome` de `RAW_COLUMNS`.
+
+    Features com até `MAX_SWEEP_POINTS` valores (quartos, banheiros, andares,
+    vagas) percorrem a faixa inteira. Nas maiores (`area`), a predição de uma
+    floresta só muda quando o valor cruza um limiar de alguma árvore (as
+    árvores seguem à esquerda com `valor <= limiar`); basta então avaliar o
+    mínimo da faixa e o primeiro inteiro acima de cada limiar, e cada ponto
+    vale até o próximo. Para os demais modelos, a faixa é amostrada.
+    """
+    if nome == 'furnishingstatus':
+        return list(MOBILIA_API)
+    minimo, maximo = FEATURE_BOUNDS[nome]
+    if nome in _BINARIAS:
+        return [0, 1]
+    if maximo - minimo + 1 <= MAX_SWEEP_POINTS:
+        return list(range(minimo, maximo + 1))
+    if not is_forest(model):
+        return np.unique(np.linspace(minimo, maximo, MAX_SWEEP_POINTS).round().astype(int)).tolist()
+    limiares = split_thresholds(model, nome)
+    limiares = limiares[(limiares >= minimo) & (limiares < maximo)]
+    return np.unique(np.concatenate(([minimo], np.floor(limiares).astype(int) + 1))).tolist()
+
+
+def sweep_matrix(base, grades):
+    """
+    Matriz com uma linha por combinação dos valores de `grades` (dicionário
+    coluna bruta -> valores, na ordem de `itertools.product`), a partir da
+    linha codificada `base`.
+    """
+    nomes = list(grades)
+    indices = np.meshgrid(*[np.arange(len(grades[nome])) for nome in nomes], indexing='ij')
+    X = np.repeat(np.asarray(base, dtype=DTYPE).reshape(1, -1), indices[0].size, axis=0)
+    for nome, indice in zip(nomes, indices):
+        indice = indice.ravel()
+        if nome == 'furnishingstatus':
+            mobilia = np.array(grades[nome])[indice]
+            X[:, FEATURE_NAMES.index('furnishingstatus_semi-mobiliado')] = mobilia == 'semi-mobiliado'
+            X[:, FEATURE_NAMES.index('furnishingstatus_vazio')] = mobilia == 'vazio'
+        else:
+            X[:, FEATURE_NAMES.index(nome)] = np.asarray(grades[nome])[indice]
+    return X
+
+
+def warmup(model, n_linhas=64, explicacao=False):
+    """
+    Executa o modelo sobre um lote fictício para pagar custos únicos antes do
+    tráfego real. As matrizes de explicação ocupam uma matriz densa
+    (nós x features) por árvore; por padrão ficam para a primeira requisição
+    com explicar=True, e `explicacao=True` as calcula aqui.
+    """
+    X = np.zeros((n_linhas, len(FEATURE_NAMES)), dtype=DTYPE)
+    X[:, FEATURE_NAMES.index('area')] = 5000
+    X[:, FEATURE_NAMES.index('bedrooms')] = 3
+    X[:, FEATURE_NAMES.index('bathrooms')] = 1
+    X[:, FEATURE_NAMES.index('stories')] = 2
+    predict_distribution(model, X)
+    predict_distribution(model, X[:1])
+    if is_forest(model):
+        # Pré-calcula os limiares de sweep_values (pequenos: um vetor por feature)
+        split_thresholds(model, 'area')
+        if explicacao:
+            _contribuicoes_por_no(model)
+
+
+def model_bytes(model):
+    """
+    Memória aproximada ocupada pelo modelo em si: nós e valores das árvores
+    ou, para modelos que não são florestas, o tamanho serializado. Percorre o
+    modelo inteiro: calcule uma vez, na carga.
+    """
+    if not is_forest(model):
+        import pickle
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    from sklearn.tree._tree import NODE_DTYPE
+
+    return int(sum(estimator.tree_.node_count * NODE_DTYPE.itemsize + estimator.tree_.value.nbytes
+                   for estimator in model.estimators_))
+
+
+def auxiliary_bytes(model):
+    """Bytes das matrizes de explicação e dos limiares de sweep já calculados para o modelo."""
+    return _BYTES_AUXILIARES.get(model, 0)
+
+
+def resident_bytes(model):
+    """Memória aproximada do modelo mais as estruturas auxiliares já calculadas."""
+    return model_bytes(model) + auxiliary_bytes(model)
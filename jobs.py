@@ -0,0 +1,206 @@
+"""
+Jobs assíncronos de predição em massa com armazenamento local.
+
+Cada job vive em `<JOBS_DIR>/<id>/`:
+
+- `entrada.csv` ou `entrada.jsonl`: arquivo enviado, no esquema do houses.csv
+  (yes/no e mobília em inglês; o formato da API, 0/1 e português, também é aceito)
+- `resultado.csv`: uma linha por linha de entrada, gravada incrementalmente
+- `estado.json`: status e checkpoint (bytes lidos da entrada, bytes gravados
+  na saída, linhas processadas)
+
+Os workers leem a entrada em blocos de linhas, codificam e avaliam cada bloco
+de forma vetorizada e, só depois de gravar o resultado com `fsync`, atualizam
+o checkpoint de forma atômica. Se o processo cair, os jobs pendentes são
+retomados a partir do último checkpoint na próxima inicialização.
+"""
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import inference
+
+FORMATOS = ('csv', 'jsonl')
+CABECALHO_RESULTADO = 'linha,preco_predito,intervalo_inferior,intervalo_superior,confianca,erro\n'
+
+
+class JobStore:
+    """Persistência dos jobs em disco."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def caminho(self, job_id, nome=''):
+        return os.path.join(self.diretorio, job_id, nome)
+
+    def entrada(self, estado):
+        return self.caminho(estado['id'], f"entrada.{estado['formato']}")
+
+    def resultado(self, job_id):
+        return self.caminho(job_id, 'resultado.csv')
+
+    def ler(self, job_id):
+        try:
+            with open(self.caminho(job_id, 'estado.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def salvar(self, estado):
+        estado['atualizado_em'] = time.time()
+        destino = self.caminho(estado['id'], 'estado.json')
+        temporario = destino + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, destino)
+
+    def listar(self):
+        for job_id in sorted(os.listdir(self.diretorio)):
+            estado = self.ler(job_id)
+            if estado is not None:
+                yield estado
+
+
+class JobManager:
+    """Fila de jobs executada por um pool local de workers."""
+
+    def __init__(self, store, model, n_workers=2, linhas_por_bloco=50000):
+        self.store = store
+        self.model = model
+        self.linhas_por_bloco = linhas_por_bloco
+        self._pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="job-worker")
+
+    def criar(self, formato):
+        """Reserva um novo job e devolve seu estado inicial (status 'recebendo')."""
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato deve ser um dos seguintes: {', '.join(FORMATOS)}")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.store.caminho(job_id))
+        estado = {
+            'id': job_id,
+            'status': 'recebendo',
+            'formato': formato,
+            'criado_em': time.time(),
+            'bytes_total': 0,
+            'bytes_processados': 0,
+            'bytes_saida': 0,
+            'linhas_processadas': 0,
+            'linhas_com_erro': 0,
+            'colunas': None,
+            'erro': None,
+        }
+        self.store.salvar(estado)
+        return estado
+
+    def falhar_recebimento(self, estado, erro):
+        """Marca como 'falhou' um job cujo envio foi interrompido e apaga a entrada parcial."""
+        try:
+            os.remove(self.store.entrada(estado))
+        except FileNotFoundError:
+            pass
+        estado['status'] = 'falhou'
+        estado['erro'] = erro
+        self.store.salvar(estado)
+
+    def enfileirar(self, estado):
+        estado['status'] = 'na_fila'
+        estado['bytes_total'] = os.path.getsize(self.store.entrada(estado))
+        self.store.salvar(estado)
+        self._pool.submit(self._executar, estado['id'])
+
+    def retomar_pendentes(self):
+        """Reenfileira jobs interrompidos (na fila ou em execução) por uma queda do processo."""
+        retomados = 0
+        for estado in self.store.listar():
+            if estado['status'] in ('na_fila', 'executando'):
+                self._pool.submit(self._executar, estado['id'])
+                retomados += 1
+        return retomados
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _ler_bloco(self, entrada):
+        linhas = []
+        while len(linhas) < self.linhas_por_bloco:
+            linha = entrada.readline()
+            if not linha:
+                break
+            if linha.strip():
+                linhas.append(linha.decode('utf-8'))
+        return linhas
+
+    def _colunas_do_bloco(self, linhas, estado):
+        if estado['formato'] == 'csv':
+            registros = list(csv.reader(io.StringIO(''.join(linhas))))
+            nomes = estado['colunas']
+            return {nome: [r[i] if i < len(r) else '' for r in registros] for i, nome in enumerate(nomes)}
+        registros = []
+        for linha in linhas:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                registro = None
+            # Linhas que não são objetos JSON viram linhas inválidas no resultado
+            registros.append(registro if isinstance(registro, dict) else {})
+        return {nome: [r.get(nome, '') for r in registros] for nome in inference.RAW_COLUMNS}
+
+    def _executar(self, job_id):
+        estado = self.store.ler(job_id)
+        try:
+            estado['status'] = 'executando'
+            self.store.salvar(estado)
+            with open(self.store.entrada(estado), 'rb') as entrada, \
+                    open(self.store.resultado(job_id), 'a+b') as saida:
+                # Descarta o que foi gravado depois do último checkpoint
+                saida.truncate(estado['bytes_saida'])
+                if estado['bytes_saida'] == 0:
+                    saida.write(CABECALHO_RESULTADO.encode('utf-8'))
+                entrada.seek(estado['bytes_processados'])
+                if estado['formato'] == 'csv' and estado['colunas'] is None:
+                    estado['colunas'] = next(csv.reader([entrada.readline().decode('utf-8-sig')]))
+
+                while True:
+                    linhas = self._ler_bloco(entrada)
+                    if not linhas:
+                        break
+                    saida.write(self._avaliar_bloco(linhas, estado).encode('utf-8'))
+                    saida.flush()
+                    os.fsync(saida.fileno())
+                    estado['bytes_processados'] = entrada.tell()
+                    estado['bytes_saida'] = saida.tell()
+                    estado['linhas_processadas'] += len(linhas)
+                    self.store.salvar(estado)
+
+            estado['status'] = 'concluido'
+            self.store.salvar(estado)
+        except Exception as e:
+            estado['status'] = 'falhou'
+            estado['erro'] = str(e)
+            self.store.salvar(estado)
+
+    def _avaliar_bloco(self, linhas, estado):
+        X, erros = inference.encode_raw(self._colunas_do_bloco(linhas, estado))
+        predicoes = inference.predict_distribution(self.model, X)
+        confiancas = inference.confidence(X).tolist()
+        inferiores = predicoes.inferior.tolist() if predicoes.inferior is not None else [None] * len(X)
+        superiores = predicoes.superior.tolist() if predicoes.superior is not None else [None] * len(X)
+
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator='\n')
+        primeira = estado['linhas_processadas']
+        for i, (preco, inferior, superior, confianca, erro) in enumerate(
+                zip(predicoes.preco.tolist(), inferiores, superiores, confiancas, erros)):
+            if erro is not None:
+                escritor.writerow([primeira + i, '', '', '', '', erro])
+                estado['linhas_com_erro'] += 1
+            else:
+                escritor.writerow([primeira + i, preco, inferior, superior, confianca, ''])
+        return buffer.getvalue()
@@ -0,0 +1,249 @@
+"""
+Contabilidade de memória por etapa, para dimensionar containers com medições
+em vez de estimativas.
+
+Cada etapa registra o RSS no início e no fim e o pico de RSS durante a etapa.
+O pico é o VmHWM de /proc/self/status, zerado no início da etapa ao escrever
+"5" em /proc/self/clear_refs. O crescimento da etapa (pico - RSS no início)
+é comparado ao seu orçamento.
+
+Com MEMORY_TRACEMALLOC=1, cada etapa registra também o pico de memória
+alocada pelo Python (tracemalloc) e as linhas de código que mais alocaram, e
+`allocation()` mede as alocações de cada requisição. O tracemalloc deixa
+todas as alocações mais lentas, por isso é opcional.
+
+Orçamentos em MB por etapa ficam em MEMORY_BUDGETS, por exemplo
+"model_load=300,treino=1500". A chave "*" vale para as etapas sem orçamento
+próprio. Com MEMORY_BUDGET_MODE=avisar (padrão), as etapas acima do orçamento
+são apenas relatadas. Com "falhar", o fim da etapa levanta
+MemoryBudgetExceeded.
+
+Nos scripts, `start(nome)` encerra a etapa anterior e abre a próxima, sem
+reindentar o código de cada seção. Em blocos com escopo, use
+`with stage(nome):`.
+"""
+import os
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+from metrics import process_rss_bytes
+
+MB = 1024 * 1024
+MODOS = ('avisar', 'falhar')
+# Linhas que alocaram menos que isso na etapa não entram no relatório
+MIN_ALOCACAO_RELATADA = 64 * 1024
+
+EtapaMemoria = namedtuple('EtapaMemoria', [
+    'nome', 'rss_inicio', 'rss_fim', 'pico_rss', 'crescimento', 'orcamento',
+    'pico_python', 'maiores_alocacoes',
+])
+
+# Alocações do próprio tracemalloc e do mecanismo de importação não interessam no relatório
+_FILTROS_TRACEMALLOC = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Etapa cujo crescimento de memória passou do orçamento (modo "falhar")."""
+
+
+def peak_rss_bytes():
+    """Pico de RSS (VmHWM) desde o início do processo ou desde o último `reset_peak_rss`."""
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Zera o pico de RSS do processo (Linux 4.0+). Retorna False se não for possível."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def parse_budgets(texto):
+    """Orçamentos em bytes a partir de "etapa=MB,...", como em MEMORY_BUDGETS."""
+    orcamentos = {}
+    for item in texto.split(','):
+        if not item.strip():
+            continue
+        nome, separador, valor = item.partition('=')
+        if not separador or not nome.strip():
+            raise ValueError(f"Orçamento de memória inválido: '{item.strip()}' (use etapa=MB)")
+        orcamentos[nome.strip()] = int(float(valor) * MB)
+    return orcamentos
+
+
+class _Alocacao:
+    __slots__ = ('bytes',)
+
+    def __init__(self):
+        self.bytes = None
+
+
+@contextmanager
+def allocation():
+    """
+    Pico de memória alocada pelo Python dentro do bloco, em `.bytes` (None sem
+    tracemalloc). O pico do tracemalloc é global: use só em trechos síncronos.
+    """
+    alocacao = _Alocacao()
+    if not tracemalloc.is_tracing():
+        yield alocacao
+        return
+    inicio, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        yield alocacao
+    finally:
+        _, pico = tracemalloc.get_traced_memory()
+        alocacao.bytes = max(pico - inicio, 0)
+
+
+def top_allocations(n=20):
+    """
+    Linhas de código com mais memória alocada pelo Python no momento:
+    `[(local, bytes, blocos)]`, ou None se o tracemalloc não estiver ativo.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    estatisticas = tracemalloc.take_snapshot().filter_traces(_FILTROS_TRACEMALLOC).statistics('lineno')
+    return [(str(estatistica.traceback[0]), estatistica.size, estatistica.count)
+            for estatistica in estatisticas[:n]]
+
+
+class MemoryTracker:
+    """RSS, pico de RSS e (opcionalmente) alocações do Python por etapa, com orçamentos."""
+
+    def __init__(self, orcamentos=None, modo='avisar', rastrear_python=False, n_alocacoes=5):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de orçamento inválido: '{modo}' (use {' ou '.join(MODOS)})")
+        self.orcamentos = orcamentos or {}
+        self.modo = modo
+        self.n_alocacoes = n_alocacoes
+        self.etapas = []
+        self._atual = None
+        if rastrear_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls, modo=None):
+        """
+        Configuração a partir de MEMORY_BUDGETS, MEMORY_BUDGET_MODE e
+        MEMORY_TRACEMALLOC; `modo` substitui MEMORY_BUDGET_MODE.
+        """
+        return cls(parse_budgets(os.environ.get('MEMORY_BUDGETS', '')),
+                   modo or os.environ.get('MEMORY_BUDGET_MODE', 'avisar'),
+                   os.environ.get('MEMORY_TRACEMALLOC') == '1')
+
+    def budget(self, nome):
+        return self.orcamentos.get(nome, self.orcamentos.get('*'))
+
+    def exceeded(self):
+        """Etapas registradas cujo crescimento passou do orçamento."""
+        return [etapa for etapa in self.etapas
+                if etapa.orcamento is not None and etapa.crescimento > etapa.orcamento]
+
+    def record_since_start(self, nome):
+        """
+        Registra como etapa tudo o que o processo ocupou até agora (ex.: os
+        imports, que acontecem antes de o rastreador existir).
+        """
+        rss = process_rss_bytes() or 0
+        pico = max(peak_rss_bytes() or 0, rss)
+        return self._registrar(EtapaMemoria(nome, 0, rss, pico, pico, self.budget(nome), None, None))
+
+    def start(self, nome):
+        """Abre a etapa `nome`, encerrando a anterior se ainda estiver aberta."""
+        if self._atual is not None:
+            self.stop()
+        reset_peak_rss()
+        python_inicio = snapshot = None
+        if tracemalloc.is_tracing():
+            python_inicio, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            if self.n_alocacoes:
+                snapshot = tracemalloc.take_snapshot().filter_traces(_FILTROS_TRACEMALLOC)
+        self._atual = (nome, process_rss_bytes() or 0, python_inicio, snapshot)
+
+    def stop(self):
+        """Encerra a etapa aberta e confere o orçamento; retorna o `EtapaMemoria`."""
+        nome, rss_inicio, python_inicio, snapshot = self._atual
+        self._atual = None
+        rss_fim = process_rss_bytes() or 0
+        # Sem clear_refs o VmHWM é o pico desde o início do processo: superestima a etapa
+        pico = max(peak_rss_bytes() or 0, rss_fim, rss_inicio)
+        pico_python = maiores = None
+        if python_inicio is not None and tracemalloc.is_tracing():
+            _, pico_traced = tracemalloc.get_traced_memory()
+            pico_python = max(pico_traced - python_inicio, 0)
+            if snapshot is not None:
+                diferencas = tracemalloc.take_snapshot().filter_traces(_FILTROS_TRACEMALLOC) \
+                    .compare_to(snapshot, 'lineno')
+                maiores = [(str(estatistica.traceback[0]), estatistica.size_diff)
+                           for estatistica in diferencas[:self.n_alocacoes]
+                           if estatistica.size_diff >= MIN_ALOCACAO_RELATADA]
+        return self._registrar(EtapaMemoria(nome, rss_inicio, rss_fim, pico, pico - rss_inicio,
+                                            self.budget(nome), pico_python, maiores))
+
+    def _registrar(self, etapa):
+        self.etapas.append(etapa)
+        reset_peak_rss()
+        if etapa.orcamento is not None and etapa.crescimento > etapa.orcamento:
+            mensagem = (f"Etapa '{etapa.nome}' cresceu {etapa.crescimento / MB:.1f} MB de RSS "
+                        f"(orçamento: {etapa.orcamento / MB:.1f} MB)")
+            if self.modo == 'falhar':
+                raise MemoryBudgetExceeded(mensagem)
+            print(f"⚠ {mensagem}")
+        return etapa
+
+    @contextmanager
+    def stage(self, nome):
+        """Etapa com escopo: `with tracker.stage('model_load'): ...`."""
+        self.start(nome)
+        try:
+            yield
+        finally:
+            if self._atual is not None and self._atual[0] == nome:
+                self.stop()
+
+    def finish(self):
+        """Encerra a etapa aberta e imprime o relatório."""
+        if self._atual is not None:
+            self.stop()
+        print(self.report())
+        return self.etapas
+
+    def report(self):
+        """Tabela com o RSS de cada etapa (MB) e, com tracemalloc, as maiores alocações."""
+        linhas = [
+            "💾 MEMÓRIA POR ETAPA (MB)",
+            "-" * 70,
+            f"{'Etapa':<22} {'RSS início':>10} {'RSS fim':>9} {'Pico':>9} {'Cresc.':>9} {'Orçam.':>8}",
+            "-" * 70,
+        ]
+        for etapa in self.etapas:
+            orcamento = f"{etapa.orcamento / MB:>8.1f}" if etapa.orcamento is not None else f"{'-':>8}"
+            excedeu = etapa.orcamento is not None and etapa.crescimento > etapa.orcamento
+            linhas.append(f"{etapa.nome:<22} {etapa.rss_inicio / MB:>10.1f} {etapa.rss_fim / MB:>9.1f} "
+                          f"{etapa.pico_rss / MB:>9.1f} {etapa.crescimento / MB:>9.1f} {orcamento}"
+                          f"{'  ⚠' if excedeu else ''}")
+            if etapa.pico_python is not None:
+                linhas.append(f"  ↳ pico alocado pelo Python: {etapa.pico_python / MB:.1f} MB")
+            for local, tamanho in etapa.maiores_alocacoes or ():
+                linhas.append(f"      +{tamanho / MB:8.2f} MB  {local}")
+        linhas.append("-" * 70)
+        return "\n".join(linhas)
@@ -0,0 +1,165 @@
+"""
+Métricas no formato de exposição de texto do Prometheus, sem dependências externas.
+
+Os contadores e histogramas não usam locks: todas as atualizações acontecem na
+thread do event loop (os endpoints da API são `async`), portanto não existe
+disputa entre threads e o custo de cada observação é um `bisect` e duas somas.
+"""
+import bisect
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Buckets em segundos: de 100µs até 2.5s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _formatar_valor(valor):
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_labels(nomes, valores, extra=()):
+    pares = list(zip(nomes, valores)) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class Counter:
+    """Contador monotônico, opcionalmente com labels ou lido de uma função."""
+
+    tipo = "counter"
+
+    def __init__(self, nome, descricao, labels=(), funcao=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self.funcao = funcao
+        self._valores = {}
+
+    def inc(self, *valores_labels, quantidade=1):
+        self._valores[valores_labels] = self._valores.get(valores_labels, 0) + quantidade
+
+    def valor(self, *valores_labels):
+        return self._valores.get(valores_labels, 0)
+
+    def amostras(self):
+        if self.funcao is not None:
+            yield self.nome, "", self.funcao()
+            return
+        for valores_labels, valor in self._valores.items():
+            yield self.nome, _formatar_labels(self.labels, valores_labels), valor
+
+
+class Gauge:
+    """Valor instantâneo; pode ser definido diretamente ou lido de uma função."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome, descricao, labels=(), funcao=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self.funcao = funcao
+        self._valores = {}
+
+    def set(self, valor, *valores_labels):
+        self._valores[valores_labels] = valor
+
+    def clear(self):
+        """Remove todas as séries (para gauges cujo conjunto de labels muda)."""
+        self._valores.clear()
+
+    def amostras(self):
+        if self.funcao is not None:
+            valor = self.funcao()
+            if valor is not None:
+                yield self.nome, "", valor
+            return
+        for valores_labels, valor in self._valores.items():
+            yield self.nome, _formatar_labels(self.labels, valores_labels), valor
+
+
+class Histogram:
+    """Histograma com buckets fixos, compatível com `histogram_quantile`."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome, descricao, labels=(), buckets=LATENCY_BUCKETS):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [contagens por bucket (+Inf no final), soma]
+        self._series = {}
+
+    def observe(self, valor, *valores_labels):
+        serie = self._series.get(valores_labels)
+        if serie is None:
+            serie = self._series[valores_labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect.bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+
+    def amostras(self):
+        for valores_labels, (contagens, soma) in self._series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                labels = _formatar_labels(self.labels, valores_labels,
+                                          extra=[("le", _formatar_valor(limite))])
+                yield f"{self.nome}_bucket", labels, acumulado
+            labels = _formatar_labels(self.labels, valores_labels)
+            yield f"{self.nome}_sum", labels, soma
+            yield f"{self.nome}_count", labels, acumulado
+
+
+class Registry:
+    """Coleção de métricas renderizada no endpoint `/metrics`."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, nome, descricao, labels=(), funcao=None):
+        return self._registrar(Counter(nome, descricao, labels, funcao))
+
+    def gauge(self, nome, descricao, labels=(), funcao=None):
+        return self._registrar(Gauge(nome, descricao, labels, funcao))
+
+    def histogram(self, nome, descricao, labels=(), buckets=LATENCY_BUCKETS):
+        return self._registrar(Histogram(nome, descricao, labels, buckets))
+
+    def render(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.descricao}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            for nome, labels, valor in metrica.amostras():
+                linhas.append(f"{nome}{labels} {_formatar_valor(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+def process_rss_bytes():
+    """Memória residente (RSS) atual do processo, em bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # Fora do Linux só temos o pico (ru_maxrss em KB no Linux, bytes no macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
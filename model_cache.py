@@ -0,0 +1,154 @@
+"""
+Cache LRU de modelos carregados sob demanda, limitado por memória.
+
+Cada mercado tem o seu modelo no registro (model_registry.py), publicado
+com um alias com o nome do mercado (`python model_registry.py promote <id> sp`).
+A API pede o modelo pelo nome: se já está carregado, é usado na hora; senão
+a carga (joblib.load + aquecimento) roda em um pool de threads e a
+requisição espera só por ela, sem bloquear o event loop. Requisições
+simultâneas para o mesmo mercado aguardam a mesma carga.
+
+Ao inserir um modelo, os menos usados recentemente são descartados até o
+total estimado caber em `orcamento_bytes`. O tamanho de cada modelo é o do
+próprio modelo (`inference.model_bytes`, medido uma vez na carga) mais o das
+estruturas auxiliares já calculadas (`inference.auxiliary_bytes`), que
+crescem quando o modelo passa a ser explicado com explain=true. O
+modelo recém-carregado nunca é descartado, mesmo que sozinho exceda o
+orçamento. Requisições em andamento continuam com a referência ao modelo
+descartado até terminar.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import inference
+
+ModeloCarregado = namedtuple('ModeloCarregado', ['nome', 'versao', 'modelo', 'feature_info',
+                                                 'bytes', 'segundos_carga'])
+
+
+class ModelCache:
+    """LRU de modelos por nome, com carga concorrente e orçamento de memória."""
+
+    def __init__(self, carregar, orcamento_bytes, processos_carga=2):
+        """`carregar(nome)` retorna `(modelo, versao, feature_info)`; KeyError para nomes desconhecidos."""
+        self._carregar = carregar
+        self.orcamento_bytes = orcamento_bytes
+        self._modelos = OrderedDict()
+        self._carregando = {}
+        self._estatisticas = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=processos_carga, thread_name_prefix="model-load")
+        self.descartes = 0
+
+    def _estatistica(self, nome):
+        estatistica = self._estatisticas.get(nome)
+        if estatistica is None:
+            estatistica = self._estatisticas[nome] = {
+                "acertos": 0, "faltas": 0, "cargas": 0, "erros": 0, "descartes": 0,
+                "segundos_carga_total": 0.0,
+            }
+        return estatistica
+
+    def submit(self, nome):
+        """
+        `(future, acerto)`: future resolvido com o `ModeloCarregado`; `acerto`
+        indica se o modelo já estava em memória.
+        """
+        with self._lock:
+            estatistica = self._estatistica(nome)
+            entrada = self._modelos.get(nome)
+            if entrada is not None:
+                self._modelos.move_to_end(nome)
+                estatistica["acertos"] += 1
+                future = Future()
+                future.set_result(entrada)
+                return future, True
+            estatistica["faltas"] += 1
+            future = self._carregando.get(nome)
+            if future is None:
+                future = self._carregando[nome] = self._executor.submit(self._carregar_e_inserir, nome)
+            return future, False
+
+    async def get(self, nome):
+        """Versão assíncrona de `submit`: `(ModeloCarregado, acerto)`."""
+        future, acerto = self.submit(nome)
+        return await asyncio.wrap_future(future), acerto
+
+    def _carregar_e_inserir(self, nome):
+        inicio = time.perf_counter()
+        try:
+            modelo, versao, feature_info = self._carregar(nome)
+            inference.warmup(modelo)
+            # Só o modelo; as estruturas auxiliares são somadas a cada conferência
+            tamanho = inference.model_bytes(modelo)
+        except KeyError:
+            # Nome desconhecido: não guarda estatísticas, que cresceriam com qualquer nome pedido
+            with self._lock:
+                self._carregando.pop(nome, None)
+                if nome not in self._modelos:
+                    self._estatisticas.pop(nome, None)
+            raise
+        except BaseException:
+            with self._lock:
+                self._carregando.pop(nome, None)
+                self._estatistica(nome)["erros"] += 1
+            raise
+        entrada = ModeloCarregado(nome, versao, modelo, feature_info, tamanho, time.perf_counter() - inicio)
+        with self._lock:
+            self._carregando.pop(nome, None)
+            self._modelos[nome] = entrada
+            estatistica = self._estatistica(nome)
+            estatistica["cargas"] += 1
+            estatistica["segundos_carga_total"] += entrada.segundos_carga
+            self._liberar()
+        return entrada
+
+    def _liberar(self):
+        # O último inserido fica no fim da ordem e nunca é o primeiro descartado
+        while len(self._modelos) > 1 and self.bytes_residentes() > self.orcamento_bytes:
+            nome, _ = self._modelos.popitem(last=False)
+            self._estatistica(nome)["descartes"] += 1
+            self.descartes += 1
+
+    @staticmethod
+    def _bytes(entrada):
+        return entrada.bytes + inference.auxiliary_bytes(entrada.modelo)
+
+    def bytes_residentes(self):
+        return sum(self._bytes(entrada) for entrada in self._modelos.values())
+
+    def evict(self, nome):
+        """Remove o modelo do cache; retorna False se ele não estava carregado."""
+        with self._lock:
+            if self._modelos.pop(nome, None) is None:
+                return False
+            self._estatistica(nome)["descartes"] += 1
+            self.descartes += 1
+            return True
+
+    def stats(self):
+        """Estado do cache e estatísticas por modelo (inclusive os já descartados)."""
+        with self._lock:
+            modelos = {}
+            for nome, estatistica in self._estatisticas.items():
+                entrada = self._modelos.get(nome)
+                pedidos = estatistica["acertos"] + estatistica["faltas"]
+                modelos[nome] = dict(
+                    estatistica,
+                    carregado=entrada is not None,
+                    carregando=nome in self._carregando,
+                    versao=entrada.versao if entrada else None,
+                    bytes=self._bytes(entrada) if entrada else 0,
+                    segundos_ultima_carga=entrada.segundos_carga if entrada else None,
+                    taxa_acerto=estatistica["acertos"] / pedidos if pedidos else None,
+                )
+            return {
+                "orcamento_bytes": self.orcamento_bytes,
+                "bytes_residentes": self.bytes_residentes(),
+                "carregados": list(self._modelos),
+                "descartes": self.descartes,
+                "modelos": modelos,
+            }
@@ -0,0 +1,221 @@
+"""
+Registro local de modelos endereçado pelo conteúdo.
+
+Cada versão é identificada pela impressão digital (`fingerprint`) dos dados
+já pré-processados, do motor, dos seus parâmetros e da configuração do
+treino. Se nada disso mudou, `model_training.py` reaproveita a versão
+registrada em vez de treinar de novo.
+
+Estrutura em disco (`models/` por padrão):
+
+    models/
+    ├── aliases.json              # {"latest": "3f2a9c...", "production": "..."}
+    └── 3f2a9c0d41b7/
+        ├── manifest.json         # motor, parâmetros, dados, métricas e hash dos arquivos
+        ├── model.pkl
+        ├── feature_info.pkl
+        ├── comparables_index.pkl
+        └── drift_reference.pkl
+
+As versões são imutáveis: são escritas em um diretório temporário e
+renomeadas de uma vez, e uma versão existente nunca é sobrescrita. Apenas
+os aliases mudam. A API escolhe a versão pela variável `MODEL_VERSION`
+(id, prefixo do id ou alias).
+
+Uso:
+    python model_registry.py list
+    python model_registry.py show latest
+    python model_registry.py promote 3f2a9c production
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+
+REGISTRY_DIR = 'models'
+MODEL_FILE = 'model.pkl'
+FEATURE_INFO_FILE = 'feature_info.pkl'
+COMPARABLES_INDEX_FILE = 'comparables_index.pkl'
+DRIFT_REFERENCE_FILE = 'drift_reference.pkl'
+MANIFEST_FILE = 'manifest.json'
+ALIASES_FILE = 'aliases.json'
+
+# Tamanho do id (prefixo do SHA-256), o mesmo das versões exibidas pela API
+_TAMANHO_ID = 12
+
+
+def fingerprint(X, y, engine, params, **config):
+    """
+    Id da versão: SHA-256 das features já codificadas (`X`, DataFrame), do
+    alvo, do nome do motor, dos parâmetros do estimador e de `config`
+    (divisão treino/teste, folds, repetições...).
+
+    Como o hash cobre a matriz pré-processada, mudanças no CSV ou na
+    codificação mudam o id; a versão do scikit-learn também entra, já que
+    artefatos serializados não são portáveis entre versões.
+    """
+    import sklearn
+
+    descricao = {
+        'engine': engine,
+        'params': {nome: repr(valor) for nome, valor in sorted(params.items())},
+        'config': config,
+        'colunas': [str(coluna) for coluna in X.columns],
+        'dtypes': [str(dtype) for dtype in X.dtypes],
+        'sklearn': sklearn.__version__,
+    }
+    h = hashlib.sha256(json.dumps(descricao, sort_keys=True, default=str).encode('utf-8'))
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    return h.hexdigest()[:_TAMANHO_ID]
+
+
+def _sha256_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """Versões imutáveis de modelos e seus artefatos, com aliases mutáveis."""
+
+    def __init__(self, raiz=REGISTRY_DIR):
+        self.raiz = raiz
+
+    def path(self, versao, arquivo=None):
+        caminho = os.path.join(self.raiz, versao)
+        return os.path.join(caminho, arquivo) if arquivo else caminho
+
+    def exists(self, versao):
+        return os.path.isfile(self.path(versao, MANIFEST_FILE))
+
+    def versions(self):
+        """Manifestos de todas as versões, da mais antiga para a mais recente."""
+        if not os.path.isdir(self.raiz):
+            return []
+        manifestos = [self.manifest(nome) for nome in os.listdir(self.raiz) if self.exists(nome)]
+        return sorted(manifestos, key=lambda m: m['criado_em'])
+
+    def aliases(self):
+        try:
+            with open(os.path.join(self.raiz, ALIASES_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def resolve(self, ref):
+        """Id da versão a partir de um alias, de um id ou de um prefixo único de id."""
+        aliases = self.aliases()
+        if ref in aliases:
+            return aliases[ref]
+        if self.exists(ref):
+            return ref
+        candidatos = [m['id'] for m in self.versions() if m['id'].startswith(ref)] if ref else []
+        if len(candidatos) == 1:
+            return candidatos[0]
+        if candidatos:
+            raise KeyError(f"Prefixo '{ref}' ambíguo: {', '.join(candidatos)}")
+        raise KeyError(f"Versão ou alias '{ref}' não encontrado em '{self.raiz}'")
+
+    def manifest(self, ref):
+        with open(self.path(self.resolve(ref), MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, ref, arquivo=MODEL_FILE):
+        return joblib.load(self.path(self.resolve(ref), arquivo))
+
+    def register(self, versao, artefatos, manifesto):
+        """
+        Grava uma nova versão com os `artefatos` ({nome do arquivo: objeto})
+        e o `manifesto`, acrescido de id, data e hash de cada arquivo.
+
+        Se a versão já existe, nada é sobrescrito e o manifesto registrado é
+        retornado.
+        """
+        if self.exists(versao):
+            return self.manifest(versao)
+        os.makedirs(self.raiz, exist_ok=True)
+        temporario = self.path(f".{versao}-{os.getpid()}")
+        shutil.rmtree(temporario, ignore_errors=True)
+        os.makedirs(temporario)
+        try:
+            arquivos = {}
+            for nome, objeto in artefatos.items():
+                caminho = os.path.join(temporario, nome)
+                joblib.dump(objeto, caminho)
+                arquivos[nome] = {'bytes': os.path.getsize(caminho), 'sha256': _sha256_arquivo(caminho)}
+            manifesto = dict(manifesto, id=versao,
+                             criado_em=time.strftime('%Y-%m-%dT%H:%M:%S%z'), arquivos=arquivos)
+            with open(os.path.join(temporario, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+            for nome in os.listdir(temporario):
+                os.chmod(os.path.join(temporario, nome), 0o444)
+            os.rename(temporario, self.path(versao))
+        except OSError:
+            shutil.rmtree(temporario, ignore_errors=True)
+            # Outro processo registrou a mesma versão primeiro
+            if self.exists(versao):
+                return self.manifest(versao)
+            raise
+        return manifesto
+
+    def set_alias(self, alias, ref):
+        """Aponta `alias` para a versão `ref` (gravação atômica de aliases.json)."""
+        versao = self.resolve(ref)
+        aliases = self.aliases()
+        aliases[alias] = versao
+        temporario = os.path.join(self.raiz, f".{ALIASES_FILE}-{os.getpid()}")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(aliases, f, indent=2, sort_keys=True)
+        os.replace(temporario, os.path.join(self.raiz, ALIASES_FILE))
+        return versao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registro', default=os.environ.get('MODEL_REGISTRY_DIR', REGISTRY_DIR),
+                        help='diretório do registro')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('list', help='lista as versões registradas')
+    mostrar = comandos.add_parser('show', help='exibe o manifesto de uma versão')
+    mostrar.add_argument('ref', help='id, prefixo do id ou alias')
+    promover = comandos.add_parser('promote', help='aponta um alias para uma versão')
+    promover.add_argument('ref', help='id, prefixo do id ou alias')
+    promover.add_argument('alias', nargs='?', default='production')
+    args = parser.parse_args()
+
+    registro = ModelRegistry(args.registro)
+    try:
+        if args.comando == 'list':
+            por_versao = {}
+            for alias, versao in registro.aliases().items():
+                por_versao.setdefault(versao, []).append(alias)
+            versoes = registro.versions()
+            if not versoes:
+                print(f"⚠ Nenhuma versão em '{registro.raiz}'")
+            for m in versoes:
+                metricas = m.get('metricas', {})
+                aliases = f" [{', '.join(sorted(por_versao.get(m['id'], [])))}]" if m['id'] in por_versao else ""
+                print(f"{m['id']}  {m['criado_em']}  {m.get('engine', '—'):<24} "
+                      f"R² teste {metricas.get('r2_teste', float('nan')):.4f}{aliases}")
+        elif args.comando == 'show':
+            print(json.dumps(registro.manifest(args.ref), ensure_ascii=False, indent=2))
+        else:
+            versao = registro.set_alias(args.alias, args.ref)
+            print(f"✓ Alias '{args.alias}' → {versao}")
+    except KeyError as e:
+        print(f"✗ {e.args[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Log de predições para auditoria e retreinamento, fora do caminho crítico.
+
+Os endpoints apenas enfileiram a matriz de features, os preços e a latência
+(`put_nowait`, sem bloquear). Uma thread em segundo plano agrupa a fila,
+serializa uma linha JSON por predição e grava em lote no arquivo, que é
+apenas anexado. A fila é limitada pelo total de predições (`capacidade`),
+não pelo número de requisições: um /predict/batch de 10000 casas ocupa 10000
+posições. Com a fila cheia, as predições são descartadas (e contadas) em vez
+de atrasar a resposta. Cada gravação junta no máximo `linhas_por_lote`
+predições (ou uma requisição, se for maior).
+
+O arquivo é rotacionado ao atingir `max_bytes` ou `max_segundos` de idade:
+o atual é renomeado com o horário da rotação (`requests-20250101T120000.jsonl`)
+e, com `comprimir=True`, compactado com gzip em uma thread separada. A
+rotação fica em `RotatingLog`, usado também pelo log do modelo sombra.
+"""
+import atexit
+import gzip
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+
+import numpy as np
+
+import inference
+
+
+class PredictionLogger:
+    """Grava as predições em JSONL em segundo plano, com rotação e fila limitada."""
+
+    def __init__(self, caminho, versao_modelo, max_bytes=100 * 1024 * 1024, max_segundos=24 * 3600,
+                 comprimir=True, taxa=1.0, capacidade=100_000, linhas_por_lote=10_000, intervalo=1.0):
+        self.caminho = caminho
+        self.versao_modelo = versao_modelo
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.linhas_por_lote = linhas_por_lote
+        self.intervalo = intervalo
+        self.gravados = 0
+        self.descartados = 0
+        self._log = RotatingLog(caminho, max_bytes, max_segundos, comprimir)
+        self._fila = queue.Queue()
+        # Predições na fila; o limite vale para elas, não para o número de itens
+        self._na_fila = 0
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="prediction-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, rota, X, precos, confiancas, latencia, versao=None):
+        """
+        Enfileira as predições de uma requisição (uma linha de `X` por predição).
+
+        `latencia` é o tempo (s) da requisição até a predição; `versao`, a do
+        modelo que respondeu, quando não é o principal. Retorna False se o
+        lote não foi amostrado ou foi descartado com a fila cheia.
+        """
+        if self.taxa < 1.0 and random.random() >= self.taxa:
+            return False
+        n = len(precos)
+        with self._lock:
+            if self._na_fila + n > self.capacidade:
+                self.descartados += n
+                return False
+            self._na_fila += n
+        self._fila.put_nowait((time.time(), rota, X, precos, confiancas, latencia,
+                              versao or self.versao_modelo))
+        return True
+
+    def close(self, timeout=5.0):
+        """Grava o que ainda está na fila e encerra a thread, aguardando as compressões pendentes."""
+        self._parar.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._log.close()
+
+    @property
+    def rotacoes(self):
+        return self._log.rotacoes
+
+    def _linhas(self, itens):
+        linhas = []
+        for ts, rota, X, precos, confiancas, latencia, versao in itens:
+            latencia_ms = latencia * 1000
+            # Todas as features são inteiras; o float32 da matriz é só o dtype das árvores
+            entradas = X.astype(np.int64).tolist()
+            for entrada, preco, confianca in zip(entradas, precos.tolist(), confiancas.tolist()):
+                linhas.append(json.dumps({
+                    "ts": ts,
+                    "rota": rota,
+                    "versao_modelo": versao,
+                    "entrada": dict(zip(inference.FEATURE_NAMES, entrada)),
+                    "preco_predito": preco,
+                    "confianca": confianca,
+                    "latencia_ms": latencia_ms,
+                }, ensure_ascii=False))
+        return linhas
+
+    def _proximo_lote(self):
+        itens = [self._fila.get(timeout=self.intervalo)]
+        linhas = len(itens[0][3])
+        while linhas < self.linhas_por_lote:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            itens.append(item)
+            linhas += len(item[3])
+        with self._lock:
+            self._na_fila -= linhas
+        return itens
+
+    def _executar(self):
+        try:
+            while not (self._parar.is_set() and self._fila.empty()):
+                try:
+                    itens = self._proximo_lote()
+                except queue.Empty:
+                    itens = []
+                if itens:
+                    linhas = self._linhas(itens)
+                    self._log.write(linhas)
+                    self.gravados += len(linhas)
+                else:
+                    self._log.rotate_if_due()
+        finally:
+            self._log.close_file()
+
+
+class RotatingLog:
+    """Arquivo JSONL apenas anexado, rotacionado por tamanho ou idade e compactado com gzip."""
+
+    def __init__(self, caminho, max_bytes=100 * 1024 * 1024, max_segundos=24 * 3600, comprimir=True):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.max_segundos = max_segundos
+        self.comprimir = comprimir
+        self.rotacoes = 0
+        self._compressoes = []
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self._arquivo, self._criado_em = self._abrir()
+
+    def write(self, linhas):
+        """Anexa as linhas (sem quebra de linha) e rotaciona se o arquivo passou do limite."""
+        self._arquivo.write("\n".join(linhas) + "\n")
+        self._arquivo.flush()
+        self.rotate_if_due()
+
+    def rotate_if_due(self):
+        tamanho = self._arquivo.tell()
+        if tamanho and (tamanho >= self.max_bytes or time.time() - self._criado_em >= self.max_segundos):
+            self._rotacionar()
+
+    def close_file(self):
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+    def close(self):
+        """Fecha o arquivo e aguarda as compressões pendentes."""
+        self.close_file()
+        for compressao in self._compressoes:
+            compressao.join()
+
+    def _abrir(self):
+        arquivo = open(self.caminho, 'a', encoding='utf-8')
+        # Um arquivo já existente (reinício da API) conta a idade desde a criação
+        criado_em = os.path.getmtime(self.caminho) if arquivo.tell() else time.time()
+        return arquivo, criado_em
+
+    def _rotacionar(self):
+        self._arquivo.close()
+        base, extensao = os.path.splitext(self.caminho)
+        destino = f"{base}-{time.strftime('%Y%m%dT%H%M%S')}{extensao}"
+        sufixo = 1
+        while os.path.exists(destino) or os.path.exists(destino + '.gz'):
+            destino = f"{base}-{time.strftime('%Y%m%dT%H%M%S')}-{sufixo}{extensao}"
+            sufixo += 1
+        os.replace(self.caminho, destino)
+        self.rotacoes += 1
+        if self.comprimir:
+            self._compressoes = [c for c in self._compressoes if c.is_alive()]
+            compressao = threading.Thread(target=_comprimir, args=(destino,), name="log-gzip")
+            compressao.start()
+            self._compressoes.append(compressao)
+        self._arquivo, self._criado_em = self._abrir()
+
+
+def _comprimir(caminho):
+    with open(caminho, 'rb') as origem, gzip.open(caminho + '.gz', 'wb') as destino:
+        shutil.copyfileobj(origem, destino)
+    os.remove(caminho)
@@ -0,0 +1,94 @@
+"""
+Perfilamento sob demanda da API em produção.
+
+Dois modos, ambos sem custo quando desligados:
+
+- Amostragem estatística: uma thread lê a pilha da thread do event loop em
+  intervalos fixos (`sys._current_frames`) e acumula pilhas no formato
+  "collapsed" (uma linha `f1;f2;f3 contagem`), aceito por flamegraph.pl,
+  speedscope e inferno. Nenhum código do caminho da requisição é alterado.
+- cProfile: uma fração das requisições de `/predict` roda com `cProfile`
+  ativo; o resultado é um arquivo `.prof` (formato do `pstats`), aceito por
+  snakeviz, flameprof e speedscope. Desligado, o custo é um `is None`.
+"""
+import cProfile
+import functools
+import marshal
+import os
+import random
+import sys
+import threading
+from collections import Counter
+
+# Sessão cProfile ativa (ou None); consultada pelo endpoint /predict
+sessao_cprofile = None
+
+
+# Rótulos por objeto de código, limitados para não crescer enquanto o amostrador roda
+@functools.lru_cache(maxsize=4096)
+def _rotulo(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _pilha(frame):
+    rotulos = []
+    while frame is not None:
+        rotulos.append(_rotulo(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(rotulos))
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de uma thread em uma thread separada."""
+
+    def __init__(self, thread_id, intervalo=0.005):
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.contagens = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="stack-sampler", daemon=True)
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.contagens[_pilha(frame)] += 1
+                self.amostras += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._parar.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Pilhas no formato collapsed (entrada do flamegraph.pl)."""
+        return "".join(f"{pilha} {contagem}\n" for pilha, contagem in self.contagens.most_common())
+
+
+class CProfileSession:
+    """Perfil cProfile acumulado sobre uma amostra das requisições."""
+
+    def __init__(self, taxa=1.0):
+        self.taxa = taxa
+        self.perfil = cProfile.Profile()
+        self.requisicoes = 0
+
+    def amostrar(self):
+        return self.taxa >= 1.0 or random.random() < self.taxa
+
+    def __enter__(self):
+        self.requisicoes += 1
+        self.perfil.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.perfil.disable()
+        return False
+
+    def dump(self):
+        """Conteúdo de um arquivo `.prof` (o mesmo que `pstats.Stats.dump_stats` gravaria)."""
+        self.perfil.create_stats()
+        return marshal.dumps(self.perfil.stats)
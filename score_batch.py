@@ -0,0 +1,247 @@
+"""
+Precificação offline de um catálogo de imóveis, sem o servidor HTTP.
+
+Lê um CSV no esquema do houses.csv (yes/no e mobília em inglês; a coluna
+price, se existir, é ignorada) em blocos de linhas e avalia os blocos em
+um pool de processos. O modelo é carregado uma única vez no processo
+principal; com o método de início `fork` os workers o herdam por cópia
+sob demanda, sem reler nem copiar o arquivo do modelo.
+
+A saída tem uma linha por linha de entrada, na mesma ordem, com as colunas
+`linha,preco_predito,intervalo_inferior,intervalo_superior,confianca,erro`
+(precedidas da coluna de `--coluna-id`, se informada). O formato segue a
+extensão do arquivo de saída: `.csv` ou `.parquet` (requer pyarrow).
+
+Uso:
+    python score_batch.py catalogo.csv precos.csv
+    python score_batch.py catalogo.csv precos.parquet --processos 8 --coluna-id codigo
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+import inference
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional; sem ele apenas a saída CSV fica disponível
+    pa = None
+    pq = None
+
+COLUNAS_SAIDA = ['linha', 'preco_predito', 'intervalo_inferior', 'intervalo_superior', 'confianca', 'erro']
+
+# Modelo usado por avaliar_bloco; nos workers criados com fork já vem carregado
+_modelo = None
+
+
+def _iniciar_worker(caminho_modelo):
+    global _modelo
+    if _modelo is None:
+        # Métodos de início sem fork (spawn) não herdam o modelo do processo principal
+        _modelo = joblib.load(caminho_modelo)
+
+
+def avaliar_bloco(primeira, colunas, metodo_confianca):
+    """
+    Avalia um bloco de colunas brutas (`inference.RAW_COLUMNS`).
+
+    Retorna um dicionário de colunas de saída; linhas inválidas têm NaN nos
+    preços, None na confiança e a mensagem em `erro`.
+    """
+    X, erros = inference.encode_raw(colunas)
+    predicoes = inference.predict_distribution(_modelo, X)
+    confiancas = inference.confidence(X, predicoes if metodo_confianca == 'arvores' else None).tolist()
+    n = len(X)
+    invalidas = np.array([erro is not None for erro in erros], dtype=bool)
+
+    def _com_nan(valores):
+        if valores is None:
+            return np.full(n, np.nan)
+        return np.where(invalidas, np.nan, valores)
+
+    return {
+        'linha': np.arange(primeira, primeira + n, dtype=np.int64),
+        'preco_predito': _com_nan(predicoes.preco),
+        'intervalo_inferior': _com_nan(predicoes.inferior),
+        'intervalo_superior': _com_nan(predicoes.superior),
+        'confianca': [None if erro is not None else c for c, erro in zip(confiancas, erros)],
+        'erro': erros,
+    }
+
+
+def ler_blocos(caminho, linhas_por_bloco, coluna_id=None):
+    """Gera `(primeira_linha, colunas, ids)` percorrendo o CSV de entrada em blocos."""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        leitor = csv.reader(f)
+        cabecalho = [nome.strip() for nome in next(leitor)]
+        faltando = [nome for nome in inference.RAW_COLUMNS if nome not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas ausentes na entrada: {', '.join(faltando)}")
+        if coluna_id is not None and coluna_id not in cabecalho:
+            raise ValueError(f"Coluna de identificação '{coluna_id}' não encontrada na entrada")
+        indices = {nome: cabecalho.index(nome) for nome in inference.RAW_COLUMNS}
+        indice_id = cabecalho.index(coluna_id) if coluna_id is not None else None
+
+        primeira = 0
+        while True:
+            registros = list(itertools.islice(leitor, linhas_por_bloco))
+            if not registros:
+                break
+            colunas = {nome: [r[i] if i < len(r) else '' for r in registros] for nome, i in indices.items()}
+            ids = [r[indice_id] if indice_id < len(r) else '' for r in registros] if indice_id is not None else None
+            yield primeira, colunas, ids
+            primeira += len(registros)
+
+
+class SaidaCSV:
+    def __init__(self, caminho, coluna_id=None):
+        self._arquivo = open(caminho, 'w', newline='', encoding='utf-8')
+        self._escritor = csv.writer(self._arquivo, lineterminator='\n')
+        self._coluna_id = coluna_id
+        self._escritor.writerow(([coluna_id] if coluna_id else []) + COLUNAS_SAIDA)
+
+    def escrever(self, resultado, ids=None):
+        valores = [resultado[nome].tolist() if isinstance(resultado[nome], np.ndarray) else resultado[nome]
+                   for nome in COLUNAS_SAIDA]
+        if ids is not None:
+            valores.insert(0, ids)
+        for linha in zip(*valores):
+            self._escritor.writerow(['' if v is None or v != v else v for v in linha])
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class SaidaParquet:
+    """Grava cada bloco como um row group do arquivo Parquet."""
+
+    def __init__(self, caminho, coluna_id=None):
+        if pq is None:
+            raise RuntimeError("Saída Parquet requer o pacote pyarrow (pip install pyarrow)")
+        campos = [pa.field(coluna_id, pa.string())] if coluna_id else []
+        campos += [
+            pa.field('linha', pa.int64()),
+            pa.field('preco_predito', pa.float64()),
+            pa.field('intervalo_inferior', pa.float64()),
+            pa.field('intervalo_superior', pa.float64()),
+            pa.field('confianca', pa.string()),
+            pa.field('erro', pa.string()),
+        ]
+        self._schema = pa.schema(campos)
+        self._escritor = pq.ParquetWriter(caminho, self._schema)
+        self._coluna_id = coluna_id
+
+    def escrever(self, resultado, ids=None):
+        colunas = {nome: resultado[nome] for nome in COLUNAS_SAIDA}
+        if ids is not None:
+            colunas = {self._coluna_id: ids, **colunas}
+        # NaN vira nulo nas colunas de preço (linhas inválidas)
+        tabela = pa.table({nome: pa.array(valores, from_pandas=True) for nome, valores in colunas.items()},
+                          schema=self._schema)
+        self._escritor.write_table(tabela)
+
+    def fechar(self):
+        self._escritor.close()
+
+
+def _contexto_multiprocessing():
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def main():
+    global _modelo
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('entrada', help='CSV de entrada no esquema do houses.csv')
+    parser.add_argument('saida', help='arquivo de saída (.csv ou .parquet)')
+    parser.add_argument('--modelo', default='random_forest_model.pkl', help='modelo serializado')
+    parser.add_argument('--feature-info', default='feature_info.pkl', help='informações das features')
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                        help='processos de avaliação (1 = no próprio processo)')
+    parser.add_argument('--linhas-por-bloco', type=int, default=50000, help='linhas por bloco')
+    parser.add_argument('--metodo-confianca', choices=['heuristica', 'arvores'], default='heuristica',
+                        help='heurística das features ou dispersão entre as árvores')
+    parser.add_argument('--coluna-id', help='coluna da entrada copiada para a saída (ex.: código do imóvel)')
+    parser.add_argument('--formato', choices=['csv', 'parquet'],
+                        help='formato de saída (padrão: pela extensão do arquivo)')
+    args = parser.parse_args()
+
+    formato = args.formato or ('parquet' if args.saida.lower().endswith('.parquet') else 'csv')
+    inicio = time.perf_counter()
+
+    print("=" * 70)
+    print("PRECIFICAÇÃO EM LOTE")
+    print("=" * 70)
+    try:
+        _modelo = joblib.load(args.modelo)
+        feature_info = joblib.load(args.feature_info)
+    except Exception as e:
+        print(f"✗ Erro ao carregar modelo: {e}")
+        return 1
+    if list(feature_info['feature_names']) != inference.FEATURE_NAMES:
+        print("✗ As features do modelo não correspondem às esperadas por inference.py")
+        return 1
+    inference.warmup(_modelo)
+    print(f"✓ Modelo carregado ({args.modelo})")
+
+    try:
+        saida = SaidaParquet(args.saida, args.coluna_id) if formato == 'parquet' else SaidaCSV(args.saida, args.coluna_id)
+    except (RuntimeError, OSError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    total = com_erro = 0
+
+    def gravar(resultado, ids):
+        nonlocal total, com_erro
+        saida.escrever(resultado, ids)
+        total += len(resultado['linha'])
+        com_erro += sum(erro is not None for erro in resultado['erro'])
+        print(f"  {total:,} linhas avaliadas")
+
+    try:
+        blocos = ler_blocos(args.entrada, args.linhas_por_bloco, args.coluna_id)
+        if args.processos <= 1:
+            for primeira, colunas, ids in blocos:
+                gravar(avaliar_bloco(primeira, colunas, args.metodo_confianca), ids)
+        else:
+            with ProcessPoolExecutor(max_workers=args.processos, mp_context=_contexto_multiprocessing(),
+                                     initializer=_iniciar_worker, initargs=(args.modelo,)) as pool:
+                # Limita os blocos em voo para não carregar o arquivo inteiro na memória;
+                # os resultados são gravados na ordem de entrada
+                em_voo = deque()
+                for primeira, colunas, ids in blocos:
+                    em_voo.append((pool.submit(avaliar_bloco, primeira, colunas, args.metodo_confianca), ids))
+                    if len(em_voo) >= 2 * args.processos:
+                        futuro, ids_bloco = em_voo.popleft()
+                        gravar(futuro.result(), ids_bloco)
+                while em_voo:
+                    futuro, ids_bloco = em_voo.popleft()
+                    gravar(futuro.result(), ids_bloco)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        saida.fechar()
+
+    duracao = time.perf_counter() - inicio
+    print(f"✓ {total:,} linhas avaliadas em {duracao:.1f}s ({total / max(duracao, 1e-9):,.0f} linhas/s)")
+    if com_erro:
+        print(f"⚠ {com_erro:,} linhas com valores inválidos (coluna 'erro')")
+    print(f"✓ Resultado salvo em '{args.saida}' ({formato})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
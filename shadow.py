@@ -0,0 +1,132 @@
+"""
+Avaliação em sombra de um modelo candidato com tráfego real.
+
+As requisições de /predict apenas enfileiram a matriz de features e o
+resultado do modelo principal (`put_nowait`, sem bloquear). Uma thread em
+segundo plano agrupa a fila em lotes, executa o modelo sombra e grava uma
+linha JSON por predição com a diferença entre os modelos e o tempo de cada um.
+Com a fila cheia, as amostras são descartadas em vez de atrasar a resposta.
+Um lote que falha (no modelo sombra ou na gravação) é contado em `erros` e a
+thread segue com os próximos. O log é rotacionado como o log de predições
+(`prediction_log.RotatingLog`).
+"""
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+import inference
+from prediction_log import RotatingLog
+
+
+class ShadowEvaluator:
+    """Executa um modelo sombra fora do caminho crítico e registra as diferenças."""
+
+    def __init__(self, model, versao, versao_primaria, log_path, taxa=1.0,
+                 tamanho_lote=256, capacidade=10000, max_bytes=100 * 1024 * 1024,
+                 max_segundos=24 * 3600, comprimir=True):
+        self.model = model
+        self.versao = versao
+        self.versao_primaria = versao_primaria
+        self.log_path = log_path
+        self.taxa = taxa
+        self.tamanho_lote = tamanho_lote
+        self.avaliados = 0
+        self.descartados = 0
+        self.erros = 0
+        self.soma_delta_absoluto = 0.0
+        self._log = RotatingLog(log_path, max_bytes, max_segundos, comprimir)
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="shadow-evaluator", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, X, precos, latencia_primaria):
+        """
+        Enfileira um lote já avaliado pelo modelo principal.
+
+        `latencia_primaria` é o tempo (s) que o modelo principal levou para o lote inteiro.
+        Retorna False se o lote não foi amostrado ou foi descartado.
+        """
+        if self.taxa < 1.0 and random.random() >= self.taxa:
+            return False
+        try:
+            self._fila.put_nowait((X, precos, latencia_primaria / len(precos)))
+            return True
+        except queue.Full:
+            self.descartados += len(precos)
+            return False
+
+    def close(self, timeout=5.0):
+        """Avalia o que ainda está na fila e encerra a thread, fechando o log e aguardando as compressões."""
+        self._parar.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._log.close()
+
+    def _proximo_lote(self):
+        itens = [self._fila.get(timeout=0.5)]
+        linhas = len(itens[0][1])
+        while linhas < self.tamanho_lote:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            itens.append(item)
+            linhas += len(item[1])
+        return itens
+
+    def _executar(self):
+        try:
+            while not (self._parar.is_set() and self._fila.empty()):
+                try:
+                    itens = self._proximo_lote()
+                except queue.Empty:
+                    self._log.rotate_if_due()
+                    continue
+                try:
+                    self._avaliar(itens)
+                except Exception as e:
+                    # Sem a thread, a fila enche e todas as comparações seguintes seriam descartadas
+                    self.erros += sum(len(item[1]) for item in itens)
+                    print(f"✗ Erro no modelo sombra ({type(e).__name__}): {e}")
+        finally:
+            self._log.close_file()
+
+    def _avaliar(self, itens):
+        X = np.concatenate([item[0] for item in itens])
+        inicio = time.perf_counter()
+        precos_sombra = inference.predict(self.model, X)
+        latencia_sombra = (time.perf_counter() - inicio) / len(X)
+
+        linhas = []
+        deltas = []
+        posicao = 0
+        agora = time.time()
+        for _, precos, latencia_primaria in itens:
+            for preco in precos:
+                preco = float(preco)
+                preco_sombra = float(precos_sombra[posicao])
+                delta = preco_sombra - preco
+                deltas.append(abs(delta))
+                linhas.append(json.dumps({
+                    "ts": agora,
+                    "versao_primaria": self.versao_primaria,
+                    "versao_sombra": self.versao,
+                    "preco_primario": preco,
+                    "preco_sombra": preco_sombra,
+                    "delta": delta,
+                    "delta_relativo": delta / preco if preco else None,
+                    "latencia_primaria_ms": latencia_primaria * 1000,
+                    "latencia_sombra_ms": latencia_sombra * 1000,
+                }))
+                posicao += 1
+        self._log.write(linhas)
+        # Contadores só depois da gravação: um lote que falha conta apenas em `erros`
+        self.soma_delta_absoluto += sum(deltas)
+        self.avaliados += len(X)
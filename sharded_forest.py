@@ -0,0 +1,344 @@
+"""
+Treino de Random Forest em shards, por vários processos ou várias máquinas
+coordenadas por um diretório compartilhado (ex.: NFS) no lugar de um cluster.
+
+O coordenador (`prepare`) grava no diretório de trabalho:
+
+    manifest.json             features, linhas por shard, parâmetros e sementes das árvores
+    shards/<i>/<j>.npy        coluna j do shard i (float32), lida com mmap
+    shards/<i>/y.npy          alvo do shard i (float64)
+    tarefas/<t>.json          árvores da tarefa t
+
+Cada worker (`work`) reivindica tarefas criando `tarefas/<t>.claim` com
+O_EXCL, treina as árvores da tarefa e grava `arvores/<t>.pkl` com
+renomeação atômica. Uma árvore lê dos shards mapeados em memória só as
+linhas da sua amostra bootstrap: nenhum worker carrega o `X_train` inteiro.
+`merge` junta as árvores, na ordem, em um único RandomForestRegressor com
+os mesmos `feature_names`, servível pela API.
+
+Cada árvore usa a semente e a amostra bootstrap que
+`RandomForestRegressor(random_state=...)` sortearia para ela, e a amostra
+entra no treino como pesos, como no próprio scikit-learn. Por isso a
+floresta unida é idêntica à treinada em um só processo, com qualquer número
+de workers ou shards.
+
+Uso em várias máquinas (o mesmo diretório montado em todas):
+    python sharded_forest.py work <diretorio>     # em cada máquina
+    python sharded_forest.py status <diretorio>
+    python sharded_forest.py remove <diretorio>   # apaga só o que `prepare` gravou
+"""
+import glob
+import json
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MANIFEST_FILE = 'manifest.json'
+# Uma tarefa reivindicada há mais tempo que isso sem resultado é considerada
+# abandonada (worker morto) e pode ser reivindicada de novo
+CLAIM_TIMEOUT_SECONDS = float(os.environ.get('SHARD_CLAIM_TIMEOUT', '600'))
+
+
+def _gravar_atomico(caminho, gravar):
+    temporario = f"{caminho}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        gravar(f)
+    os.replace(temporario, caminho)
+
+
+def _n_amostras_bootstrap(n, max_samples):
+    # Mesma regra de RandomForestRegressor(max_samples=...)
+    if max_samples is None:
+        return n
+    if isinstance(max_samples, int):
+        return max_samples
+    return max(round(n * max_samples), 1)
+
+
+def prepare(diretorio, X, y, params, n_tarefas, linhas_por_shard=100_000):
+    """
+    Grava os shards colunares de `X` (DataFrame) e `y`, o manifesto e as
+    tarefas para uma floresta com os `params` de RandomForestRegressor.
+    """
+    if os.path.exists(os.path.join(diretorio, MANIFEST_FILE)):
+        raise FileExistsError(f"'{diretorio}' já contém um treino em shards")
+    if os.path.isdir(diretorio) and os.listdir(diretorio):
+        raise FileExistsError(f"'{diretorio}' não está vazio e não contém um treino em shards")
+    feature_names = [str(coluna) for coluna in X.columns]
+    valores = X.to_numpy(dtype=np.float32)
+    alvo = np.asarray(y, dtype=np.float64)
+    n = len(valores)
+
+    shards = []
+    for i, inicio in enumerate(range(0, n, linhas_por_shard)):
+        pasta = os.path.join(diretorio, 'shards', str(i))
+        os.makedirs(pasta)
+        bloco = slice(inicio, min(inicio + linhas_por_shard, n))
+        for j in range(len(feature_names)):
+            np.save(os.path.join(pasta, f"{j}.npy"), np.ascontiguousarray(valores[bloco, j]))
+        np.save(os.path.join(pasta, "y.npy"), alvo[bloco])
+        shards.append(bloco.stop - bloco.start)
+
+    # Sementes das árvores na mesma sequência que RandomForestRegressor.fit sorteia
+    estado = np.random.RandomState(params.get('random_state'))
+    n_arvores = params.get('n_estimators', 100)
+    sementes = [int(estado.randint(np.iinfo(np.int32).max)) for _ in range(n_arvores)]
+
+    os.makedirs(os.path.join(diretorio, 'tarefas'))
+    os.makedirs(os.path.join(diretorio, 'arvores'))
+    tarefas = [indices.tolist() for indices in np.array_split(np.arange(n_arvores), n_tarefas) if len(indices)]
+    for t, indices in enumerate(tarefas):
+        _gravar_atomico(os.path.join(diretorio, 'tarefas', f"{t}.json"),
+                        lambda f, indices=indices: f.write(json.dumps(indices).encode('utf-8')))
+
+    manifesto = {
+        'feature_names': feature_names,
+        'linhas': n,
+        'shards': shards,
+        'params': params,
+        'sementes': sementes,
+        'n_tarefas': len(tarefas),
+    }
+    # O manifesto por último: os workers só começam com os shards completos
+    _gravar_atomico(os.path.join(diretorio, MANIFEST_FILE),
+                    lambda f: f.write(json.dumps(manifesto, indent=2).encode('utf-8')))
+    return manifesto
+
+
+def _manifesto(diretorio):
+    with open(os.path.join(diretorio, MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _reivindicar(diretorio, t):
+    """True se este worker ficou com a tarefa `t`."""
+    if os.path.exists(os.path.join(diretorio, 'arvores', f"{t}.pkl")):
+        return False
+    caminho = os.path.join(diretorio, 'tarefas', f"{t}.claim")
+    dono = f"{socket.gethostname()}:{os.getpid()}\n".encode('utf-8')
+    try:
+        descritor = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            abandonada = time.time() - os.path.getmtime(caminho) > CLAIM_TIMEOUT_SECONDS
+        except FileNotFoundError:
+            return False
+        if not abandonada:
+            return False
+        # Dois workers podem retomar a mesma tarefa abandonada: ambos gravam
+        # as mesmas árvores, e a renomeação atômica mantém uma delas
+        _gravar_atomico(caminho, lambda f: f.write(dono))
+        return True
+    with os.fdopen(descritor, 'wb') as f:
+        f.write(dono)
+    return True
+
+
+class _Shards:
+    """Colunas de todos os shards mapeadas em memória; lê apenas as linhas pedidas."""
+
+    def __init__(self, diretorio, manifesto):
+        self.n_features = len(manifesto['feature_names'])
+        self.limites = np.cumsum([0] + manifesto['shards'])
+        self.colunas = []
+        self.alvos = []
+        for i in range(len(manifesto['shards'])):
+            pasta = os.path.join(diretorio, 'shards', str(i))
+            self.colunas.append([np.load(os.path.join(pasta, f"{j}.npy"), mmap_mode='r')
+                                 for j in range(self.n_features)])
+            self.alvos.append(np.load(os.path.join(pasta, "y.npy"), mmap_mode='r'))
+
+    def linhas(self, indices):
+        """`(X, y)` das linhas `indices` (ordenados) de todo o conjunto."""
+        X = np.empty((len(indices), self.n_features), dtype=np.float32)
+        y = np.empty(len(indices), dtype=np.float64)
+        cortes = np.searchsorted(indices, self.limites)
+        for i, colunas in enumerate(self.colunas):
+            inicio, fim = cortes[i], cortes[i + 1]
+            if inicio == fim:
+                continue
+            locais = indices[inicio:fim] - self.limites[i]
+            for j, coluna in enumerate(colunas):
+                X[inicio:fim, j] = coluna[locais]
+            y[inicio:fim] = self.alvos[i][locais]
+        return X, y
+
+
+def _treinar_arvore(shards, manifesto, semente):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    params = manifesto['params']
+    floresta = RandomForestRegressor(**params)
+    arvore = DecisionTreeRegressor(**{nome: getattr(floresta, nome) for nome in floresta.estimator_params})
+    arvore.set_params(random_state=semente)
+
+    n = manifesto['linhas']
+    if params.get('bootstrap', True):
+        # Mesma amostra de RandomForestRegressor: linhas sorteadas com reposição,
+        # usadas uma vez cada com peso igual ao número de sorteios
+        indices = np.random.RandomState(semente).randint(
+            0, n, _n_amostras_bootstrap(n, params.get('max_samples')))
+        contagens = np.bincount(indices, minlength=n)
+        unicos = np.flatnonzero(contagens)
+        X, y = shards.linhas(unicos)
+        arvore.fit(X, y, sample_weight=contagens[unicos].astype(np.float64))
+    else:
+        X, y = shards.linhas(np.arange(n))
+        arvore.fit(X, y)
+    return arvore
+
+
+def work(diretorio, max_tarefas=None):
+    """Treina tarefas pendentes até não restar nenhuma; retorna quantas treinou."""
+    manifesto = _manifesto(diretorio)
+    shards = _Shards(diretorio, manifesto)
+    concluidas = 0
+    for t in range(manifesto['n_tarefas']):
+        if max_tarefas is not None and concluidas >= max_tarefas:
+            break
+        if not _reivindicar(diretorio, t):
+            continue
+        with open(os.path.join(diretorio, 'tarefas', f"{t}.json"), encoding='utf-8') as f:
+            indices = json.load(f)
+        arvores = [_treinar_arvore(shards, manifesto, manifesto['sementes'][i]) for i in indices]
+        _gravar_atomico(os.path.join(diretorio, 'arvores', f"{t}.pkl"),
+                        lambda f: pickle.dump(arvores, f, protocol=pickle.HIGHEST_PROTOCOL))
+        concluidas += 1
+    return concluidas
+
+
+def pending(diretorio):
+    """Tarefas ainda sem árvores gravadas."""
+    manifesto = _manifesto(diretorio)
+    return [t for t in range(manifesto['n_tarefas'])
+            if not os.path.exists(os.path.join(diretorio, 'arvores', f"{t}.pkl"))]
+
+
+def wait(diretorio, timeout=None, intervalo=1.0):
+    """Aguarda os workers (de qualquer máquina) concluírem todas as tarefas."""
+    inicio = time.monotonic()
+    while True:
+        pendentes = pending(diretorio)
+        if not pendentes:
+            return
+        if timeout is not None and time.monotonic() - inicio > timeout:
+            raise TimeoutError(f"{len(pendentes)} tarefa(s) sem resultado após {timeout:.0f}s: {pendentes}")
+        time.sleep(intervalo)
+
+
+def merge(diretorio):
+    """RandomForestRegressor com as árvores de todas as tarefas, na ordem das sementes."""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    pendentes = pending(diretorio)
+    if pendentes:
+        raise RuntimeError(f"Tarefas sem resultado em '{diretorio}': {pendentes}")
+    manifesto = _manifesto(diretorio)
+    arvores = []
+    for t in range(manifesto['n_tarefas']):
+        with open(os.path.join(diretorio, 'arvores', f"{t}.pkl"), 'rb') as f:
+            arvores.extend(pickle.load(f))
+
+    floresta = RandomForestRegressor(**manifesto['params'])
+    floresta.estimator_ = DecisionTreeRegressor()
+    floresta.estimators_ = arvores
+    floresta.n_features_in_ = len(manifesto['feature_names'])
+    floresta.feature_names_in_ = np.asarray(manifesto['feature_names'], dtype=object)
+    floresta.n_outputs_ = 1
+    floresta._n_samples = manifesto['linhas']
+    floresta._sample_weight = None
+    floresta._n_samples_bootstrap = _n_amostras_bootstrap(manifesto['linhas'], manifesto['params'].get('max_samples'))
+    return floresta
+
+
+def _remover_arquivo(caminho):
+    # Também os temporários de gravações interrompidas (`_gravar_atomico`)
+    for arquivo in [caminho] + glob.glob(f"{glob.escape(caminho)}.*.tmp"):
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
+
+
+def _remover_pasta_vazia(caminho):
+    try:
+        os.rmdir(caminho)
+    except OSError:
+        pass
+
+
+def remove(diretorio):
+    """
+    Apaga apenas os arquivos listados no manifesto de `diretorio` (shards,
+    tarefas, árvores e o próprio manifesto) e as pastas que ficarem vazias.
+    Qualquer outro arquivo no diretório é preservado.
+    """
+    manifesto = _manifesto(diretorio)
+    for i in range(len(manifesto['shards'])):
+        pasta = os.path.join(diretorio, 'shards', str(i))
+        for nome in [f"{j}.npy" for j in range(len(manifesto['feature_names']))] + ["y.npy"]:
+            _remover_arquivo(os.path.join(pasta, nome))
+        _remover_pasta_vazia(pasta)
+    for t in range(manifesto['n_tarefas']):
+        _remover_arquivo(os.path.join(diretorio, 'tarefas', f"{t}.json"))
+        _remover_arquivo(os.path.join(diretorio, 'tarefas', f"{t}.claim"))
+        _remover_arquivo(os.path.join(diretorio, 'arvores', f"{t}.pkl"))
+    for pasta in ('shards', 'tarefas', 'arvores'):
+        _remover_pasta_vazia(os.path.join(diretorio, pasta))
+    _remover_arquivo(os.path.join(diretorio, MANIFEST_FILE))
+    _remover_pasta_vazia(diretorio)
+
+
+def train(X, y, params, diretorio, processos, n_tarefas=None, linhas_por_shard=100_000, timeout=None,
+          stdout=None):
+    """
+    Prepara os shards, treina com `processos` workers locais (0: apenas
+    aguarda workers externos lendo o mesmo `diretorio`) e retorna a floresta unida.
+    `stdout` é repassado aos workers (ex.: subprocess.DEVNULL).
+    """
+    prepare(diretorio, X, y, params, n_tarefas or max(processos, 1) * 4, linhas_por_shard)
+    # Workers locais são o mesmo comando usado nas outras máquinas, em processos
+    # novos: não reexecutam o script que chamou `train` nem herdam a sua memória
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'work', diretorio],
+                                stdout=stdout)
+               for _ in range(processos)]
+    falhas = [worker.args for worker in workers if worker.wait() != 0]
+    if falhas and pending(diretorio):
+        raise RuntimeError(f"{len(falhas)} worker(s) terminaram com erro e há tarefas pendentes")
+    wait(diretorio, timeout)
+    return merge(diretorio)
+
+
+def main(argv):
+    if len(argv) != 3 or argv[1] not in ('work', 'status', 'remove'):
+        print(__doc__)
+        return 1
+    comando, diretorio = argv[1], argv[2]
+    if comando == 'work':
+        inicio = time.perf_counter()
+        concluidas = work(diretorio)
+        print(f"✓ {concluidas} tarefa(s) treinada(s) em {time.perf_counter() - inicio:.1f}s "
+              f"({socket.gethostname()}:{os.getpid()})")
+        return 0
+    if comando == 'remove':
+        remove(diretorio)
+        print(f"✓ Treino em shards removido de '{diretorio}'")
+        return 0
+    manifesto = _manifesto(diretorio)
+    pendentes = pending(diretorio)
+    print(f"{manifesto['linhas']} linhas em {len(manifesto['shards'])} shard(s), "
+          f"{len(manifesto['sementes'])} árvores em {manifesto['n_tarefas']} tarefa(s)")
+    print(f"{'✓' if not pendentes else '…'} {manifesto['n_tarefas'] - len(pendentes)}/{manifesto['n_tarefas']} "
+          f"tarefa(s) concluída(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,85 @@
+"""
+Fixtures compartilhadas dos testes.
+
+Os testes rodam a partir da raiz do repositório (`python -m pytest -q`) e
+treinam uma floresta pequena com o houses.csv em vez de depender dos
+artefatos .pkl, para que a suíte seja rápida e determinística.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import inference  # noqa: E402
+
+# Casa de exemplo no formato de POST /predict
+CASA = {
+    'area': 7420, 'bedrooms': 4, 'bathrooms': 2, 'stories': 3, 'mainroad': 1, 'guestroom': 0,
+    'basement': 0, 'hotwaterheating': 0, 'airconditioning': 1, 'parking': 2, 'prefarea': 1,
+    'furnishingstatus': 'mobiliado',
+}
+
+# Parâmetros da floresta dos testes (poucas árvores rasas)
+PARAMS_FLORESTA = dict(n_estimators=12, max_depth=8, random_state=0, n_jobs=1)
+
+
+@pytest.fixture(scope='session')
+def dados():
+    """`(X, y)` do houses.csv, com X na ordem de `inference.FEATURE_NAMES`."""
+    casas = pd.read_csv(os.path.join(RAIZ, 'houses.csv'))
+    X, erros = inference.encode_raw({nome: casas[nome].astype(str).tolist() for nome in inference.RAW_COLUMNS})
+    assert not any(erros)
+    return pd.DataFrame(X, columns=inference.FEATURE_NAMES), casas['price'].to_numpy(dtype=np.float64)
+
+
+@pytest.fixture(scope='session')
+def floresta(dados):
+    from sklearn.ensemble import RandomForestRegressor
+    X, y = dados
+    return RandomForestRegressor(**PARAMS_FLORESTA).fit(X, y)
+
+
+@pytest.fixture
+def X_aleatorio():
+    """Matriz válida de 500 casas sorteadas dentro de `FEATURE_BOUNDS`."""
+    rng = np.random.RandomState(1)
+    colunas = [rng.randint(minimo, maximo + 1, 500) for minimo, maximo in inference.FEATURE_BOUNDS.values()]
+    X = np.column_stack(colunas).astype(inference.DTYPE)
+    # No máximo uma coluna de mobília por linha
+    X[:, inference.FEATURE_NAMES.index('furnishingstatus_vazio')] *= \
+        1 - X[:, inference.FEATURE_NAMES.index('furnishingstatus_semi-mobiliado')]
+    return X
+
+
+@pytest.fixture(scope='session')
+def api(floresta, dados, tmp_path_factory):
+    """Módulo api carregado com a floresta dos testes e logs/jobs em um diretório temporário."""
+    import joblib
+    import drift
+
+    diretorio = tmp_path_factory.mktemp('api')
+    X, _ = dados
+    joblib.dump(floresta, diretorio / 'random_forest_model.pkl')
+    joblib.dump({'feature_names': list(inference.FEATURE_NAMES)}, diretorio / 'feature_info.pkl')
+    joblib.dump(drift.build_reference(X.to_numpy(), inference.FEATURE_NAMES), diretorio / 'drift_reference.pkl')
+    os.environ.update(PREDICTION_LOG_PATH=str(diretorio / 'logs' / 'requests.jsonl'),
+                      JOBS_DIR=str(diretorio / 'jobs'))
+    anterior = os.getcwd()
+    os.chdir(diretorio)
+    try:
+        import api
+    finally:
+        os.chdir(anterior)
+    assert api.model is not None
+    return api
+
+
+@pytest.fixture(scope='session')
+def cliente(api):
+    from fastapi.testclient import TestClient
+    return TestClient(api.app)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import inference
+from conftest import CASA
+
+
+def _matriz(casa):
+    X, _ = inference.encode_raw({nome: [valor] for nome, valor in casa.items()})
+    return pd.DataFrame(X, columns=inference.FEATURE_NAMES)
+
+
+def test_predict_igual_ao_sklearn(cliente, floresta):
+    resposta = cliente.post('/predict', json=CASA)
+    assert resposta.status_code == 200
+    assert resposta.json()['preco_predito'] == floresta.predict(_matriz(CASA))[0]
+
+
+def test_predict_batch_igual_ao_sklearn(cliente, floresta):
+    casas = [dict(CASA, area=area, parking=parking) for area in (1650, 5000, 16200) for parking in (0, 3)]
+    resposta = cliente.post('/predict/batch', json=casas)
+    assert resposta.status_code == 200
+    precos = [p['preco_predito'] for p in resposta.json()['predicoes']]
+    esperado = np.concatenate([floresta.predict(_matriz(casa)) for casa in casas])
+    assert precos == esperado.tolist()
+
+
+def test_predict_rejeita_feature_fora_da_faixa(cliente):
+    assert cliente.post('/predict', json=dict(CASA, area=100)).status_code == 422
+
+
+def test_explain_soma_o_preco(cliente):
+    corpo = cliente.post('/predict?explain=true', json=CASA).json()
+    assert set(corpo['contribuicoes']) == set(inference.RAW_COLUMNS)
+    assert np.isclose(corpo['valor_base'] + sum(corpo['contribuicoes'].values()), corpo['preco_predito'],
+                      rtol=1e-9, atol=1e-3)
+    assert corpo['preco_predito'] == cliente.post('/predict', json=CASA).json()['preco_predito']
+
+
+def test_predict_binary_igual_ao_sklearn(cliente, floresta, X_aleatorio):
+    resposta = cliente.post('/predict/binary', content=X_aleatorio.astype('<f4').tobytes(),
+                            headers={'Content-Type': 'application/octet-stream',
+                                     'X-Feature-Schema': ','.join(inference.FEATURE_NAMES)})
+    assert resposta.status_code == 200
+    assert int(resposta.headers['X-Rows']) == len(X_aleatorio)
+    precos = np.frombuffer(resposta.content, dtype='<f8')
+    assert np.array_equal(precos, floresta.predict(pd.DataFrame(X_aleatorio, columns=inference.FEATURE_NAMES)))
+
+
+def test_predict_binary_rejeita_matriz_invalida(cliente, X_aleatorio):
+    X = X_aleatorio.copy()
+    X[4, 0] = 100
+    resposta = cliente.post('/predict/binary', content=X.tobytes(),
+                            headers={'Content-Type': 'application/octet-stream',
+                                     'X-Feature-Schema': ','.join(inference.FEATURE_NAMES)})
+    assert resposta.status_code == 422
+    # Features em outra ordem que a do modelo
+    resposta = cliente.post('/predict/binary', content=X_aleatorio.tobytes(),
+                            headers={'Content-Type': 'application/octet-stream',
+                                     'X-Feature-Schema': ','.join(reversed(inference.FEATURE_NAMES))})
+    assert resposta.status_code == 422
+
+
+def test_get_predict_etag_canonico_e_304(cliente):
+    consulta = '&'.join(f'{nome}={valor}' for nome, valor in CASA.items())
+    resposta = cliente.get(f'/predict?{consulta}')
+    assert resposta.status_code == 200
+    assert resposta.json() == cliente.post('/predict', json=CASA).json()
+    etag = resposta.headers['ETag']
+    assert etag.startswith('"') and resposta.headers['Cache-Control'].startswith('public, max-age=')
+
+    # Ordem dos parâmetros e zeros à esquerda não mudam o ETag
+    reordenada = '&'.join(f'{nome}={valor}' for nome, valor in reversed(list(CASA.items())))
+    assert cliente.get(f'/predict?{reordenada}').headers['ETag'] == etag
+    assert cliente.get(f'/predict?{consulta.replace("area=7420", "area=007420")}').headers['ETag'] == etag
+    # Outra casa ou outras opções da resposta mudam
+    assert cliente.get(f'/predict?{consulta.replace("area=7420", "area=7421")}').headers['ETag'] != etag
+    assert cliente.get(f'/predict?{consulta}&compacto=true').headers['ETag'] != etag
+    assert cliente.get(f'/predict?{consulta}&metodo_confianca=arvores').headers['ETag'] != etag
+
+    for if_none_match in (etag, f'W/{etag}', f'"outro", {etag}', '*'):
+        nao_modificada = cliente.get(f'/predict?{consulta}', headers={'If-None-Match': if_none_match})
+        assert nao_modificada.status_code == 304 and nao_modificada.content == b''
+        assert nao_modificada.headers['ETag'] == etag
+    assert cliente.get(f'/predict?{consulta}', headers={'If-None-Match': '"outro"'}).status_code == 200
+
+
+def test_get_predict_rejeita_parametros_desconhecidos(cliente):
+    consulta = '&'.join(f'{nome}={valor}' for nome, valor in CASA.items())
+    assert cliente.get(f'/predict?{consulta}&garagem=2').status_code == 422
@@ -0,0 +1,54 @@
+import numpy as np
+
+import inference
+from drift import DriftMonitor, build_reference
+
+
+def test_contagens_por_bin_iguais_ao_histograma_de_cada_feature(dados, X_aleatorio):
+    X, _ = dados
+    referencia = build_reference(X.to_numpy(), inference.FEATURE_NAMES)
+    monitor = DriftMonitor(referencia)
+    # Observado em duas partes, como em requisições separadas
+    monitor.observe(X_aleatorio[:123])
+    monitor.observe(X_aleatorio[123:])
+    scores = monitor.scores()
+    assert scores['observacoes'] == len(X_aleatorio)
+    for j, nome in enumerate(inference.FEATURE_NAMES):
+        limites = np.asarray(referencia['features'][nome]['limites'])
+        esperado = np.bincount(np.searchsorted(limites, X_aleatorio[:, j].astype(np.float64), side='right'),
+                               minlength=len(limites) + 1)
+        proporcoes = np.asarray(scores['features'][nome]['proporcoes'])
+        assert np.array_equal(np.rint(proporcoes * len(X_aleatorio)).astype(int), esperado), nome
+
+
+def test_referencia_discreta_e_por_quantis(dados):
+    X, _ = dados
+    referencia = build_reference(X.to_numpy(), inference.FEATURE_NAMES)
+    # Binárias: um limite entre 0 e 1; área: bins pelos decis
+    assert referencia['features']['mainroad']['limites'] == [0.5]
+    assert len(referencia['features']['area']['limites']) == 9
+    for nome in inference.FEATURE_NAMES:
+        assert sum(referencia['features'][nome]['contagens']) == len(X)
+
+
+def test_sem_drift_contra_o_proprio_treino(dados):
+    X, _ = dados
+    monitor = DriftMonitor(build_reference(X.to_numpy(), inference.FEATURE_NAMES))
+    monitor.observe(X.to_numpy())
+    scores = monitor.scores()
+    assert scores['amostra_suficiente']
+    for nome, feature in scores['features'].items():
+        assert feature['psi'] < 1e-9 and feature['ks'] < 1e-9 and feature['nivel'] == "estavel", nome
+    monitor.reset()
+    assert monitor.scores()['observacoes'] == 0
+
+
+def test_drift_significativo_em_area_deslocada(dados):
+    X, _ = dados
+    monitor = DriftMonitor(build_reference(X.to_numpy(), inference.FEATURE_NAMES))
+    deslocado = X.to_numpy().copy()
+    deslocado[:, 0] = 16200
+    monitor.observe(deslocado)
+    features = monitor.scores()['features']
+    assert features['area']['nivel'] == "significativo"
+    assert features['bedrooms']['nivel'] == "estavel"
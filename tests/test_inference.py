@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import inference
+
+
+def test_predict_igual_ao_sklearn(floresta, X_aleatorio):
+    esperado = floresta.predict(pd.DataFrame(X_aleatorio, columns=inference.FEATURE_NAMES))
+    assert np.array_equal(inference.predict(floresta, X_aleatorio), esperado)
+    assert np.array_equal(inference.predict_distribution(floresta, X_aleatorio).preco, esperado)
+
+
+def test_predict_modelo_que_nao_e_floresta(dados, X_aleatorio):
+    from sklearn.linear_model import LinearRegression
+    X, y = dados
+    linear = LinearRegression().fit(X.to_numpy(), y)
+    predicoes = inference.predict_distribution(linear, X_aleatorio)
+    assert np.allclose(predicoes.preco, linear.predict(X_aleatorio))
+    assert predicoes.desvio_padrao is None and predicoes.inferior is None
+
+
+def _confianca_escalar(area, bathrooms, airconditioning, parking):
+    """Regras originais de /predict, avaliadas casa a casa."""
+    score = 0
+    if 3000 <= area <= 8000:
+        score += 40
+    elif area > 1650:
+        score += 20
+    score += 30 if bathrooms >= 2 else 15
+    if airconditioning == 1:
+        score += 15
+    if parking >= 1:
+        score += 15
+    return "Alta" if score >= 80 else "Média" if score >= 60 else "Baixa"
+
+
+def test_confianca_vetorizada_igual_as_regras_escalares(X_aleatorio):
+    # Inclui as bordas das faixas de área
+    X = np.vstack([X_aleatorio, X_aleatorio[:6]])
+    X[-6:, 0] = [1650, 1651, 2999, 3000, 8000, 8001]
+    colunas = [inference.FEATURE_NAMES.index(nome) for nome in ('area', 'bathrooms', 'airconditioning', 'parking')]
+    esperado = [_confianca_escalar(*linha) for linha in X[:, colunas].tolist()]
+    assert inference.confidence(X).tolist() == esperado
+
+
+def test_intervalo_entre_as_arvores(floresta, X_aleatorio):
+    predicoes = inference.predict_distribution(floresta, X_aleatorio)
+    por_arvore = np.array([arvore.predict(X_aleatorio) for arvore in floresta.estimators_])
+    assert np.allclose(predicoes.desvio_padrao, por_arvore.std(axis=0))
+    assert np.allclose(predicoes.inferior, np.quantile(por_arvore, 0.1, axis=0))
+    assert np.allclose(predicoes.superior, np.quantile(por_arvore, 0.9, axis=0))
+    variacao = predicoes.desvio_padrao / predicoes.preco
+    niveis = inference.confidence(X_aleatorio, predicoes)
+    assert np.all(niveis[variacao <= 0.10] == "Alta")
+    assert np.all(niveis[variacao > 0.20] == "Baixa")
+
+
+def test_encode_raw_aceita_formatos_do_csv_e_da_api():
+    colunas = {
+        'area': ['7420', 7420], 'bedrooms': ['4', 4], 'bathrooms': ['2', 2], 'stories': ['3', 3],
+        'mainroad': ['yes', 1], 'guestroom': [' No ', 0], 'basement': ['no', 0], 'hotwaterheating': ['no', 0],
+        'airconditioning': ['YES', 1], 'parking': ['2', 2], 'prefarea': ['yes', 1],
+        'furnishingstatus': ['semi-furnished', 'semi-mobiliado'],
+    }
+    X, erros = inference.encode_raw(colunas)
+    assert erros == [None, None]
+    assert np.array_equal(X[0], X[1])
+    assert X[0].tolist() == [7420, 4, 2, 3, 1, 0, 0, 0, 1, 2, 1, 1, 0]
+
+
+def test_encode_raw_rejeita_linhas_invalidas():
+    validas = {'area': '7420', 'bedrooms': '4', 'bathrooms': '2', 'stories': '3', 'mainroad': 'yes',
+               'guestroom': 'no', 'basement': 'no', 'hotwaterheating': 'no', 'airconditioning': 'yes',
+               'parking': '2', 'prefarea': 'yes', 'furnishingstatus': 'furnished'}
+    invalidas = [
+        {'area': '100'},             # abaixo da faixa
+        {'bedrooms': '2.5'},         # não inteiro
+        {'parking': 'muitas'},       # não numérico
+        {'stories': ''},             # vazio
+        {'mainroad': 'talvez'},      # binária desconhecida
+        {'furnishingstatus': 'x'},   # mobília desconhecida
+        {'area': 'nan', 'prefarea': '2'},
+    ]
+    linhas = [validas] + [dict(validas, **alteracao) for alteracao in invalidas]
+    X, erros = inference.encode_raw({nome: [linha[nome] for linha in linhas] for nome in inference.RAW_COLUMNS})
+    assert erros[0] is None
+    assert erros[1:] == [
+        "Valores inválidos em: area", "Valores inválidos em: bedrooms", "Valores inválidos em: parking",
+        "Valores inválidos em: stories", "Valores inválidos em: mainroad",
+        "Valores inválidos em: furnishingstatus", "Valores inválidos em: area, prefarea",
+    ]
+    # Linhas inválidas ficam zeradas
+    assert not X[1:].any()
+
+
+def test_encode_raw_exige_todas_as_colunas():
+    with pytest.raises(ValueError, match="furnishingstatus"):
+        inference.encode_raw({nome: [] for nome in inference.RAW_COLUMNS if nome != 'furnishingstatus'})
+
+
+def test_explicacao_soma_o_preco(floresta, X_aleatorio):
+    predicoes = inference.predict_distribution(floresta, X_aleatorio, explicar=True)
+    assert np.array_equal(predicoes.preco, inference.predict(floresta, X_aleatorio))
+    assert predicoes.contribuicoes.shape == X_aleatorio.shape
+    assert np.allclose(predicoes.valor_base + predicoes.contribuicoes.sum(axis=1), predicoes.preco,
+                       rtol=1e-9, atol=1e-3)
+    agrupadas = inference.group_contributions(predicoes.contribuicoes)
+    assert list(agrupadas[0]) == inference.RAW_COLUMNS
+    assert np.allclose([sum(linha.values()) for linha in agrupadas], predicoes.contribuicoes.sum(axis=1))
+
+
+def test_validate_matrix_aceita_matriz_valida(X_aleatorio):
+    assert inference.validate_matrix(X_aleatorio) == []
+
+
+def test_validate_matrix_rejeita_valores_invalidos(X_aleatorio):
+    X = X_aleatorio.astype(np.float64)
+    X[3, 0] = 1649                                                  # área abaixo da faixa
+    X[7, 0] = np.nan
+    X[5, 1] = 2.5                                                   # quartos não inteiro
+    X[2, inference.FEATURE_NAMES.index('mainroad')] = 2
+    X[9, -2:] = 1                                                   # semi-mobiliado e vazio
+    erros = inference.validate_matrix(X)
+    assert erros == [
+        "area: 2 valor(es) não inteiro(s) ou fora de [1650, 16200] (primeira linha 3)",
+        "bedrooms: 1 valor(es) não inteiro(s) ou fora de [1, 6] (primeira linha 5)",
+        "mainroad: 1 valor(es) não inteiro(s) ou fora de [0, 1] (primeira linha 2)",
+        "furnishingstatus: 1 linha(s) com semi-mobiliado e vazio ao mesmo tempo (primeira linha 9)",
+    ]
@@ -0,0 +1,113 @@
+import csv
+import os
+import time
+
+import pytest
+
+import inference
+from jobs import JobManager, JobStore
+
+
+class _ModeloInstavel:
+    """Modelo linear que falha a partir da chamada `falhar_em` (simula a queda do processo no meio do job)."""
+
+    def __init__(self, modelo, falhar_em=None):
+        self.modelo = modelo
+        self.falhar_em = falhar_em
+        self.chamadas = 0
+
+    def predict(self, X):
+        self.chamadas += 1
+        if self.falhar_em is not None and self.chamadas >= self.falhar_em:
+            raise RuntimeError("queda simulada")
+        return self.modelo.predict(X)
+
+
+@pytest.fixture(scope='module')
+def linear(dados):
+    from sklearn.linear_model import LinearRegression
+    X, y = dados
+    return LinearRegression().fit(X.to_numpy(), y)
+
+
+def _entrada_csv(n=250):
+    linhas = [','.join(inference.RAW_COLUMNS)]
+    for i in range(n):
+        linhas.append(f"{1650 + 37 * i},3,{1 + i % 4},2,yes,no,{'yes' if i % 3 else 'no'},no,yes,{i % 4},no,"
+                      f"{('furnished', 'semi-furnished', 'unfurnished')[i % 3]}")
+    # Linha inválida: área fora da faixa e mobília desconhecida
+    linhas.insert(10, "10,3,2,2,yes,no,no,no,yes,1,no,palacio")
+    return ('\n'.join(linhas) + '\n').encode('utf-8')
+
+
+def _executar_job(manager, conteudo):
+    estado = manager.criar('csv')
+    with open(manager.store.entrada(estado), 'wb') as f:
+        f.write(conteudo)
+    manager.enfileirar(estado)
+    return _aguardar(manager.store, estado['id'])
+
+
+def _aguardar(store, job_id, timeout=30):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        estado = store.ler(job_id)
+        if estado['status'] in ('concluido', 'falhou'):
+            return estado
+        time.sleep(0.02)
+    raise TimeoutError(job_id)
+
+
+def test_job_retoma_do_checkpoint(tmp_path, linear):
+    conteudo = _entrada_csv()
+    referencia = JobManager(JobStore(tmp_path / 'referencia'), _ModeloInstavel(linear), 1, linhas_por_bloco=40)
+    esperado = _executar_job(referencia, conteudo)
+    assert esperado['status'] == 'concluido'
+    with open(referencia.store.resultado(esperado['id']), 'rb') as f:
+        resultado_esperado = f.read()
+
+    # O terceiro bloco falha: o checkpoint fica depois do segundo
+    store = JobStore(tmp_path / 'jobs')
+    estado = _executar_job(JobManager(store, _ModeloInstavel(linear, falhar_em=3), 1, linhas_por_bloco=40), conteudo)
+    assert estado['status'] == 'falhou'
+    assert estado['linhas_processadas'] == 80
+    # Como se o processo tivesse caído durante a gravação do terceiro bloco
+    estado['status'] = 'executando'
+    store.salvar(estado)
+    with open(store.resultado(estado['id']), 'ab') as f:
+        f.write(b'9999,lixo parcial')
+
+    manager = JobManager(store, _ModeloInstavel(linear), 1, linhas_por_bloco=40)
+    assert manager.retomar_pendentes() == 1
+    final = _aguardar(store, estado['id'])
+    assert final['status'] == 'concluido'
+    assert final['linhas_processadas'] == esperado['linhas_processadas'] == 251
+    assert final['linhas_com_erro'] == 1
+    with open(store.resultado(estado['id']), 'rb') as f:
+        assert f.read() == resultado_esperado
+
+    linhas = list(csv.DictReader(resultado_esperado.decode('utf-8').splitlines()))
+    assert [int(linha['linha']) for linha in linhas] == list(range(251))
+    assert linhas[9]['erro'].startswith("Valores inválidos em: area") and 'furnishingstatus' in linhas[9]['erro']
+
+
+def test_falhar_recebimento_apaga_a_entrada_parcial(tmp_path, linear):
+    store = JobStore(tmp_path)
+    manager = JobManager(store, linear, 1)
+    estado = manager.criar('jsonl')
+    with open(store.entrada(estado), 'wb') as f:
+        f.write(b'{"area": 7420, "bedr')
+    manager.falhar_recebimento(estado, "envio interrompido")
+    assert not os.path.exists(store.entrada(estado))
+    salvo = store.ler(estado['id'])
+    assert salvo['status'] == 'falhou' and salvo['erro'] == "envio interrompido"
+    # Sem entrada (o envio caiu antes do primeiro byte) também funciona
+    outro = manager.criar('csv')
+    manager.falhar_recebimento(outro, "desconectado")
+    assert store.ler(outro['id'])['status'] == 'falhou'
+    assert manager.retomar_pendentes() == 0
+
+
+def test_criar_rejeita_formato_desconhecido(tmp_path, linear):
+    with pytest.raises(ValueError):
+        JobManager(JobStore(tmp_path), linear, 1).criar('xlsx')
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pytest
+
+import inference
+from model_cache import ModelCache
+
+
+@pytest.fixture
+def cache(floresta):
+    """Cache com três mercados (cópias da floresta) e orçamento para dois deles."""
+    modelos = {nome: copy.deepcopy(floresta) for nome in ('sp', 'rj', 'bh')}
+    cargas = []
+
+    def carregar(nome):
+        cargas.append(nome)
+        return modelos[nome], f"v-{nome}", {'feature_names': inference.FEATURE_NAMES}
+
+    tamanho = inference.resident_bytes(modelos['sp']) + 4096
+    cache = ModelCache(carregar, orcamento_bytes=int(2.5 * tamanho), processos_carga=1)
+    cache.cargas = cargas
+    return cache
+
+
+def _obter(cache, nome):
+    future, acerto = cache.submit(nome)
+    return future.result(timeout=30), acerto
+
+
+def test_descarta_o_menos_usado_recentemente(cache):
+    assert not _obter(cache, 'sp')[1]
+    assert not _obter(cache, 'rj')[1]
+    entrada, acerto = _obter(cache, 'sp')
+    assert acerto and entrada.versao == 'v-sp'
+    # rj é o menos usado recentemente: sai para bh caber no orçamento
+    _obter(cache, 'bh')
+    stats = cache.stats()
+    assert stats['carregados'] == ['sp', 'bh']
+    assert stats['bytes_residentes'] <= cache.orcamento_bytes
+    assert stats['modelos']['rj']['descartes'] == 1 and not stats['modelos']['rj']['carregado']
+    assert stats['modelos']['sp']['acertos'] == 1 and stats['modelos']['sp']['taxa_acerto'] == 0.5
+
+    # Pedir rj de novo carrega outra vez e descarta sp
+    assert not _obter(cache, 'rj')[1]
+    assert cache.stats()['carregados'] == ['bh', 'rj']
+    assert cache.cargas == ['sp', 'rj', 'bh', 'rj']
+    assert cache.descartes == 2
+
+
+def test_explicacao_conta_no_orcamento(cache):
+    entrada, _ = _obter(cache, 'sp')
+    antes = cache.bytes_residentes()
+    assert antes == entrada.bytes + inference.auxiliary_bytes(entrada.modelo)
+    inference.predict_distribution(entrada.modelo, np.zeros((1, len(inference.FEATURE_NAMES)),
+                                                            dtype=inference.DTYPE), explicar=True)
+    assert cache.bytes_residentes() > antes
+    assert cache.stats()['modelos']['sp']['bytes'] == cache.bytes_residentes()
+
+
+def test_nome_desconhecido_e_evict(cache):
+    future, _ = cache.submit('poa')
+    with pytest.raises(KeyError):
+        future.result(timeout=30)
+    assert 'poa' not in cache.stats()['modelos']
+    _obter(cache, 'sp')
+    assert cache.evict('sp') and not cache.evict('sp')
+    assert cache.stats()['carregados'] == []
@@ -0,0 +1,83 @@
+import gzip
+import json
+import threading
+import time
+
+import numpy as np
+
+import inference
+from prediction_log import PredictionLogger
+
+
+def _lote(n):
+    X = np.tile(np.array([[7420, 4, 2, 3, 1, 0, 0, 0, 1, 2, 1, 0, 0]], dtype=inference.DTYPE), (n, 1))
+    return X, np.full(n, 1000.0), np.array(["Alta"] * n)
+
+
+def _ler(diretorio):
+    linhas = []
+    for caminho in sorted(diretorio.iterdir()):
+        abrir = gzip.open if caminho.suffix == '.gz' else open
+        with abrir(caminho, 'rt', encoding='utf-8') as f:
+            linhas.extend(json.loads(linha) for linha in f)
+    return linhas
+
+
+def test_capacidade_conta_predicoes_e_nao_requisicoes(tmp_path):
+    logger = PredictionLogger(str(tmp_path / 'requests.jsonl'), 'v1', comprimir=False,
+                              capacidade=100, linhas_por_lote=50, intervalo=0.05)
+    # Segura a thread de gravação para que a fila só encha
+    liberar = threading.Event()
+    lotes = []
+    gravar = logger._log.write
+
+    def gravar_devagar(linhas):
+        liberar.wait(10)
+        lotes.append(len(linhas))
+        gravar(linhas)
+
+    logger._log.write = gravar_devagar
+    assert logger.submit('/predict', *_lote(1), 0.001)
+    while logger._na_fila:
+        time.sleep(0.001)
+
+    assert not logger.submit('/predict/batch', *_lote(101), 0.01)   # sozinho já excede a capacidade
+    assert logger.submit('/predict/batch', *_lote(60), 0.01)
+    assert not logger.submit('/predict/batch', *_lote(41), 0.01)    # 60 + 41 > 100
+    for _ in range(40):
+        assert logger.submit('/predict', *_lote(1), 0.001)
+    assert not logger.submit('/predict', *_lote(1), 0.001)
+    assert logger.descartados == 101 + 41 + 1
+
+    liberar.set()
+    logger.close()
+    assert logger.gravados == 101
+    # 1, depois o lote de 60 (maior que linhas_por_lote, vai inteiro) e as 40 unitárias
+    assert lotes[0] == 1 and sum(lotes) == 101
+    assert all(n <= 60 for n in lotes)
+    linhas = _ler(tmp_path)
+    assert len(linhas) == 101
+    assert linhas[0]['entrada'] == dict(zip(inference.FEATURE_NAMES, [7420, 4, 2, 3, 1, 0, 0, 0, 1, 2, 1, 0, 0]))
+    assert linhas[1]['rota'] == '/predict/batch' and linhas[1]['versao_modelo'] == 'v1'
+
+
+def test_rotacao_por_tamanho_com_gzip(tmp_path):
+    logger = PredictionLogger(str(tmp_path / 'requests.jsonl'), 'v1', max_bytes=20_000, comprimir=True, linhas_por_lote=20,
+                              intervalo=0.05)
+    for _ in range(30):
+        assert logger.submit('/predict/batch', *_lote(20), 0.01, versao='mercado')
+    logger.close()
+    assert logger.rotacoes >= 2
+    arquivos = sorted(caminho.name for caminho in tmp_path.iterdir())
+    assert 'requests.jsonl' in arquivos
+    assert len([nome for nome in arquivos if nome.endswith('.jsonl.gz')]) == logger.rotacoes
+    linhas = _ler(tmp_path)
+    assert len(linhas) == logger.gravados == 600
+    assert {linha['versao_modelo'] for linha in linhas} == {'mercado'}
+
+
+def test_amostragem(tmp_path):
+    logger = PredictionLogger(str(tmp_path / 'requests.jsonl'), 'v1', comprimir=False, taxa=0.0)
+    assert not logger.submit('/predict', *_lote(1), 0.001)
+    logger.close()
+    assert logger.gravados == 0 and logger.descartados == 0
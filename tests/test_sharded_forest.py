@@ -0,0 +1,61 @@
+import subprocess
+
+import numpy as np
+import pytest
+
+import inference
+import sharded_forest
+from conftest import PARAMS_FLORESTA
+
+
+def _mesmas_arvores(a, b):
+    return len(a.estimators_) == len(b.estimators_) and all(
+        np.array_equal(x.tree_.feature, y.tree_.feature)
+        and np.array_equal(x.tree_.threshold, y.tree_.threshold)
+        and np.array_equal(x.tree_.value, y.tree_.value)
+        for x, y in zip(a.estimators_, b.estimators_))
+
+
+def test_shards_em_processo_igual_ao_fit(tmp_path, dados, floresta, X_aleatorio):
+    X, y = dados
+    diretorio = str(tmp_path / 'treino')
+    # Shards menores que o conjunto e mais tarefas que workers
+    sharded_forest.prepare(diretorio, X, y, PARAMS_FLORESTA, n_tarefas=5, linhas_por_shard=100)
+    assert sharded_forest.work(diretorio, max_tarefas=2) == 2
+    assert sharded_forest.pending(diretorio) == [2, 3, 4]
+    with pytest.raises(RuntimeError):
+        sharded_forest.merge(diretorio)
+    assert sharded_forest.work(diretorio) == 3
+    unida = sharded_forest.merge(diretorio)
+    assert _mesmas_arvores(unida, floresta)
+    assert np.array_equal(inference.predict(unida, X_aleatorio), inference.predict(floresta, X_aleatorio))
+    assert list(unida.feature_names_in_) == inference.FEATURE_NAMES
+
+
+def test_train_com_workers_locais(tmp_path, dados, floresta):
+    X, y = dados
+    unida = sharded_forest.train(X, y, PARAMS_FLORESTA, str(tmp_path / 'treino'), processos=2,
+                                 linhas_por_shard=200, timeout=60, stdout=subprocess.DEVNULL)
+    assert _mesmas_arvores(unida, floresta)
+    assert np.array_equal(unida.predict(X), floresta.predict(X))
+
+
+def test_remove_preserva_arquivos_alheios(tmp_path, dados):
+    X, y = dados
+    diretorio = tmp_path / 'treino'
+    sharded_forest.prepare(str(diretorio), X, y, dict(PARAMS_FLORESTA, n_estimators=2), n_tarefas=2)
+    with pytest.raises(FileExistsError):
+        sharded_forest.prepare(str(diretorio), X, y, PARAMS_FLORESTA, n_tarefas=2)
+    sharded_forest.work(str(diretorio))
+    (diretorio / 'shards' / 'notas.txt').write_text('não é do treino')
+    sharded_forest.remove(str(diretorio))
+    assert sorted(p.relative_to(diretorio).as_posix() for p in diretorio.rglob('*')) == \
+        ['shards', 'shards/notas.txt']
+
+
+def test_prepare_recusa_diretorio_nao_vazio(tmp_path, dados):
+    X, y = dados
+    (tmp_path / 'dados.csv').write_text('x')
+    with pytest.raises(FileExistsError):
+        sharded_forest.prepare(str(tmp_path), X, y, PARAMS_FLORESTA, n_tarefas=2)
+    assert [p.name for p in tmp_path.iterdir()] == ['dados.csv']